@@ -0,0 +1,197 @@
+"""
+Aggregate cube over a capture's entries.
+
+The cube holds one cell per observed (host, status, method, duration
+category) combination, with the request count, duration sum and duration
+histograms (linear and log-scale bins) for that cell. It is built once per
+file; every chart and every filter combination is then answered by slicing
+and summing cells instead of rescanning the entries, and only bin edges and
+counts ever reach the browser.
+
+Cubes of several captures merge into one by summing matching cells; their
+histograms are re-binned onto edges spanning all of them.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Cube dimensions, in key order
+DIMENSIONS = ("host", "status", "method", "duration_category")
+
+# Number of duration histogram bins
+HISTOGRAM_BINS = 50
+
+# Histogram bin scales - "log" suits long-tail latencies
+BIN_SCALES = ("linear", "log")
+
+# Filter states whose histograms are kept per cube
+HISTOGRAM_CACHE_SIZE = 128
+
+
+class AggregateCube:
+    """Counts, duration sums and duration histograms keyed by the cube dimensions"""
+
+    def __init__(self, cells: pd.DataFrame, histograms: np.ndarray, edges: np.ndarray,
+                 log_histograms: Optional[np.ndarray] = None, log_edges: Optional[np.ndarray] = None):
+        # One row per cell: dimension columns plus count, duration_sum, duration_count
+        self.cells = cells
+        # histograms[i] is the duration histogram of cells.iloc[i] over `edges`
+        self.histograms = histograms
+        self.edges = edges
+        # Same with logarithmically spaced edges
+        self.log_histograms = log_histograms if log_histograms is not None else np.zeros_like(histograms)
+        self.log_edges = log_edges if log_edges is not None else np.geomspace(1, 10, len(edges))
+        # (filters, scale) -> (counts, edges), most recently used last
+        self._histogram_cache: "OrderedDict[Tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._histogram_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, bins: int = HISTOGRAM_BINS) -> "AggregateCube":
+        """Aggregate an entries DataFrame into a cube"""
+        keys = pd.DataFrame({dim: df[dim] if dim in df.columns else pd.Series(np.nan, index=df.index)
+                             for dim in DIMENSIONS})
+        durations = (df["duration_ms"] if "duration_ms" in df.columns
+                     else pd.Series(np.nan, index=df.index)).to_numpy(dtype="float64")
+        has_duration = ~np.isnan(durations)
+
+        # Cell id of every row
+        grouper = keys.groupby(list(DIMENSIONS), dropna=False, observed=True, sort=False)
+        cell_ids = grouper.ngroup().to_numpy()
+        n_cells = int(cell_ids.max()) + 1 if len(cell_ids) else 0
+
+        # Key values of each cell, taken from its first row so they line up with the ids
+        first_rows = np.unique(cell_ids, return_index=True)[1]
+        cells = keys.iloc[first_rows].reset_index(drop=True)
+        cells["count"] = np.bincount(cell_ids, minlength=n_cells)
+        cells["duration_sum"] = np.bincount(cell_ids[has_duration], weights=durations[has_duration],
+                                            minlength=n_cells)
+        cells["duration_count"] = np.bincount(cell_ids[has_duration], minlength=n_cells)
+
+        # Duration histograms per cell over shared linear and log-spaced edges
+        valid = durations[has_duration]
+        if has_duration.any():
+            edges = np.linspace(valid.min(), valid.max(), bins + 1)
+            if edges[0] == edges[-1]:
+                edges = np.linspace(edges[0], edges[0] + 1, bins + 1)
+            positive = valid[valid > 0]
+            low = positive.min() if len(positive) else 1.0
+            high = max(valid.max(), low * 10)
+            log_edges = np.geomspace(low, high, bins + 1)
+        else:
+            edges = np.linspace(0, 1, bins + 1)
+            log_edges = np.geomspace(1, 10, bins + 1)
+        cell_ids_with_duration = cell_ids[has_duration]
+        histograms = cls._cell_histograms(cell_ids_with_duration, valid, edges, n_cells)
+        # Durations below the first log edge (zero or negative) land in the first bin
+        log_histograms = cls._cell_histograms(cell_ids_with_duration, valid, log_edges, n_cells)
+
+        return cls(cells, histograms, edges, log_histograms, log_edges)
+
+    @staticmethod
+    def _cell_histograms(cell_ids: np.ndarray, durations: np.ndarray, edges: np.ndarray, n_cells: int) -> np.ndarray:
+        """Histogram durations per cell over shared edges in one bincount"""
+        bins = len(edges) - 1
+        bin_ids = np.clip(np.searchsorted(edges, durations, side="right") - 1, 0, bins - 1)
+        flat = np.bincount(cell_ids * bins + bin_ids, minlength=n_cells * bins)
+        return flat.reshape(n_cells, bins)
+
+    @classmethod
+    def merge(cls, cubes: Sequence["AggregateCube"]) -> "AggregateCube":
+        """Merge the cubes of several captures into one, without revisiting their entries"""
+        if len(cubes) == 1:
+            return cubes[0]
+        # Shared edges span the durations of every cube that has any
+        timed = [cube for cube in cubes if cube.cells["duration_count"].sum() > 0] or list(cubes)
+        bins = cubes[0].histograms.shape[1]
+        edges = np.linspace(min(cube.edges[0] for cube in timed), max(cube.edges[-1] for cube in timed), bins + 1)
+        log_edges = np.geomspace(min(cube.log_edges[0] for cube in timed),
+                                 max(cube.log_edges[-1] for cube in timed), bins + 1)
+        histograms = np.concatenate([cls._rebin(cube.histograms, cube.edges, edges) for cube in cubes])
+        log_histograms = np.concatenate([cls._rebin(cube.log_histograms, cube.log_edges, log_edges, log=True)
+                                         for cube in cubes])
+
+        # Cells with the same key in several cubes are summed
+        stacked = pd.concat([cube.cells for cube in cubes], ignore_index=True)
+        cell_ids = stacked.groupby(list(DIMENSIONS), dropna=False, observed=True, sort=False).ngroup().to_numpy()
+        n_cells = int(cell_ids.max()) + 1 if len(cell_ids) else 0
+        first_rows = np.unique(cell_ids, return_index=True)[1]
+        cells = stacked.loc[first_rows, list(DIMENSIONS)].reset_index(drop=True)
+        for col in ("count", "duration_sum", "duration_count"):
+            summed = np.bincount(cell_ids, weights=stacked[col].to_numpy(dtype="float64"), minlength=n_cells)
+            cells[col] = summed if col == "duration_sum" else summed.astype(np.int64)
+        merged_histograms = np.zeros((n_cells, bins), dtype=np.int64)
+        np.add.at(merged_histograms, cell_ids, histograms)
+        merged_log_histograms = np.zeros((n_cells, bins), dtype=np.int64)
+        np.add.at(merged_log_histograms, cell_ids, log_histograms)
+        return cls(cells, merged_histograms, edges, merged_log_histograms, log_edges)
+
+    @staticmethod
+    def _rebin(histograms: np.ndarray, edges: np.ndarray, new_edges: np.ndarray, log: bool = False) -> np.ndarray:
+        """Move each bin's count to the new bin containing its center (exact when the edges match)"""
+        if len(edges) == len(new_edges) and np.array_equal(edges, new_edges):
+            return histograms
+        centers = np.sqrt(edges[:-1] * edges[1:]) if log else (edges[:-1] + edges[1:]) / 2
+        bins = len(new_edges) - 1
+        targets = np.clip(np.searchsorted(new_edges, centers, side="right") - 1, 0, bins - 1)
+        moves = np.zeros((len(centers), bins), dtype=np.int64)
+        moves[np.arange(len(centers)), targets] = 1
+        return histograms.astype(np.int64) @ moves
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the cube"""
+        return (int(self.cells.memory_usage(deep=True).sum()) + self.histograms.nbytes + self.edges.nbytes
+                + self.log_histograms.nbytes + self.log_edges.nbytes)
+
+    @property
+    def empty(self) -> bool:
+        return self.cells.empty or self.total() == 0
+
+    def select(self, **filters: Optional[Any]) -> "AggregateCube":
+        """Return the sub-cube matching `dimension=value` filters (None means all)"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, value in filters.items():
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dim}")
+            if value is None:
+                continue
+            mask &= (self.cells[dim] == value).to_numpy(dtype=bool, na_value=False)
+        return AggregateCube(self.cells[mask].reset_index(drop=True), self.histograms[mask], self.edges,
+                             self.log_histograms[mask], self.log_edges)
+
+    def total(self) -> int:
+        """Number of entries in the cube"""
+        return int(self.cells["count"].sum())
+
+    def counts_by(self, *dims: str) -> pd.Series:
+        """Entry counts grouped by one or more dimensions (missing keys are skipped)"""
+        counts = self.cells.groupby(list(dims), observed=True)["count"].sum()
+        return counts[counts > 0]
+
+    def duration_histogram(self, scale: str = "linear") -> Tuple[np.ndarray, np.ndarray]:
+        """Return (counts, edges) of the duration histogram over all cells"""
+        if scale not in BIN_SCALES:
+            raise ValueError(f"Unknown bin scale: {scale}")
+        if scale == "log":
+            return self.log_histograms.sum(axis=0), self.log_edges
+        return self.histograms.sum(axis=0), self.edges
+
+    def filtered_histogram(self, filters: Dict[str, Optional[Any]],
+                           scale: str = "linear") -> Tuple[np.ndarray, np.ndarray]:
+        """Return the duration histogram of the entries matching `filters`, cached per filter state"""
+        key = (tuple(sorted(filters.items())), scale)
+        with self._histogram_lock:
+            cached = self._histogram_cache.get(key)
+            if cached is not None:
+                self._histogram_cache.move_to_end(key)
+                return cached
+        result = self.select(**filters).duration_histogram(scale)
+        with self._histogram_lock:
+            self._histogram_cache[key] = result
+            if len(self._histogram_cache) > HISTOGRAM_CACHE_SIZE:
+                self._histogram_cache.popitem(last=False)
+        return result
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare the vectorized capture statistics with the former per-entry loop.
+
+Usage: python benchmarks/bench_aggregate.py [--entries N]
+
+Builds N synthetic entries (default 1,000,000) in memory and computes status,
+host, method and timing statistics both ways. Results must agree.
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from synthetic import make_entries  # also puts the dashboard modules on sys.path
+
+import pandas as pd
+
+from capture_stats import stats_from_entries, stats_from_frame
+from entry_frame import finalize_entries_frame
+
+
+def loop_stats(entries):
+    """The per-entry loop generate_html_report used before, kept as the baseline"""
+    status_counts = Counter()
+    host_counts = Counter()
+    methods = Counter()
+    durations = []
+    for entry in entries:
+        status_counts[str(entry.get("status", "Unknown"))] += 1
+        host_counts[entry.get("host", "Unknown")] += 1
+        methods[entry.get("method", "Unknown")] += 1
+        if "duration" in entry:
+            try:
+                durations.append(float(entry["duration"]))
+            except (ValueError, TypeError):
+                pass
+    timing = (min(durations), max(durations), sum(durations) / len(durations), sum(durations))
+    return status_counts, host_counts, methods, timing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000, help="synthetic entries to aggregate")
+    args = parser.parse_args()
+
+    print(f"Generating {args.entries} synthetic entries...")
+    entries = make_entries(args.entries)
+    df = finalize_entries_frame(pd.DataFrame(entries).drop(columns=["request_body", "response_body"]))
+
+    start = time.perf_counter()
+    status_counts, host_counts, methods, timing = loop_stats(entries)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = stats_from_entries(entries)
+    entries_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame_stats = stats_from_frame(df)
+    frame_time = time.perf_counter() - start
+
+    assert stats.status_counts == dict(status_counts) and stats.host_counts == dict(host_counts)
+    assert stats.method_counts == dict(methods) and frame_stats.host_counts == stats.host_counts
+    assert (stats.duration_min, stats.duration_max) == timing[:2]
+    assert abs(stats.duration_mean - timing[2]) < 1e-6 * timing[2]
+
+    print(f"{'method':<22} {'time (s)':>9}")
+    print(f"{'per-entry loop':<22} {loop_time:>9.3f}")
+    print(f"{'columns from entries':<22} {entries_time:>9.3f}   ({loop_time / entries_time:.1f}x, "
+          f"includes percentiles)")
+    print(f"{'columns from frame':<22} {frame_time:>9.3f}   ({loop_time / frame_time:.1f}x, "
+          f"includes host and endpoint sketches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Compare the iterative nested-JSON expander with the former recursive one.
+
+Usage: python benchmarks/bench_deep_parse.py [--bodies N] [--depth D]
+
+Payloads are GraphQL-style responses (deep object trees, mostly numbers and
+short strings) and escaped-JSON responses (JSON strings nested D levels
+deep). Each is expanded both from its body text, as the dashboard does, and
+from an already decoded value. Both expanders must produce identical results.
+
+Table previews streamed by preview_json are then timed against cutting the
+full pretty output, for these bodies and for one large escaped body, and
+must equal it. Bodies holding strings that look like JSON but do not parse
+must equal it too, except where such a string is only found to be invalid
+past the part the preview decodes.
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+from typing import Any
+
+from synthetic import make_body  # also puts the dashboard modules on sys.path
+
+import json_backend
+from body_format import (
+    STREAM_PREVIEW_MIN_LENGTH,
+    _looks_like_json,
+    deep_parse_json,
+    parse_nested_json,
+    preview_json,
+    prettify_json,
+    truncate_text,
+)
+
+
+def recursive_deep_parse_json(content: Any, max_depth: int = 3, current_depth: int = 0) -> Any:
+    """The recursive expander deep_parse_json replaced, kept as the baseline"""
+    if current_depth >= max_depth:
+        return content
+    if isinstance(content, dict):
+        return {key: recursive_deep_parse_json(value, max_depth, current_depth + 1)
+                for key, value in content.items()}
+    if isinstance(content, list):
+        return [recursive_deep_parse_json(item, max_depth, current_depth + 1) for item in content]
+    if isinstance(content, str):
+        try:
+            if (content.strip().startswith('{') and content.strip().endswith('}')) or \
+               (content.strip().startswith('[') and content.strip().endswith(']')):
+                return recursive_deep_parse_json(json_backend.loads(content), max_depth, current_depth + 1)
+        except json.JSONDecodeError:
+            pass
+    return content
+
+
+def make_graphql_body(rng: random.Random, depth: int, width: int = 2) -> Any:
+    """Return a GraphQL-style response: a deep object tree with numeric leaves and short strings"""
+    def node(level: int) -> Any:
+        if level == 0:
+            return {"id": rng.randint(1, 10 ** 6), "score": rng.random(), "flags": [1, 0, 1]}
+        return {"__typename": f"Node{level}", "edges": [{"node": node(level - 1)} for _ in range(width)]}
+    return {"data": node(depth), "extensions": {"cost": rng.randint(1, 100)}}
+
+
+def make_decoy_body(rng: random.Random) -> str:
+    """Return a body whose strings look like JSON, some of them invalid and long enough to cross the preview"""
+    fields = {}
+    for i in range(rng.randint(1, 4)):
+        nested = json.dumps({f"k{j}": [rng.randint(0, 999), None, "x" * rng.randint(0, 30)]
+                             for j in range(rng.randint(1, 4))})
+        fields[f"f{i}"] = rng.choice([
+            nested,
+            nested[:-1] + ",}",  # trailing comma
+            "[" + "a" * rng.randint(0, 150) + "]",
+            "x" * rng.randint(0, 40),
+        ])
+    return json.dumps(fields)
+
+
+def stream_preview(text: str) -> str:
+    """Return the table preview of a body via the streaming printer, as prettify_and_truncate does for large bodies"""
+    preview = preview_json(text)
+    return truncate_text(text if preview is None else preview)
+
+
+def has_invalid_json_string(text: str) -> bool:
+    """Whether a decoy body holds a string that looks like JSON but does not parse"""
+    for value in json.loads(text).values():
+        if _looks_like_json(value):
+            try:
+                json.loads(value)
+            except json.JSONDecodeError:
+                return True
+    return False
+
+
+def time_call(func, repeat: int = 5) -> float:
+    """Return the best wall time of several runs, with garbage collection paused like timeit"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bodies", type=int, default=500, help="bodies per payload kind")
+    parser.add_argument("--depth", type=int, default=6, help="nesting depth of the payloads")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    payloads = {
+        "graphql": [json_backend.dumps(make_graphql_body(rng, args.depth)) for _ in range(args.bodies)],
+        "escaped": [make_body(rng, args.depth, 4) for _ in range(args.bodies)],
+    }
+    # The expander also has to recognise JSON strings padded with whitespace
+    assert _looks_like_json("  {\"a\": 1}\n") and not _looks_like_json("{ not closed")
+
+    print(f"{'payload':<10} {'input':<8} {'max depth':>9} {'recursive (s)':>14} {'iterative (s)':>14}")
+    for name, texts in payloads.items():
+        values = [json_backend.loads(text) for text in texts]
+        for max_depth in (3, 2 * args.depth + 2):
+            cases = {
+                "text": (lambda: [recursive_deep_parse_json(json_backend.loads(t), max_depth) for t in texts],
+                         lambda: [parse_nested_json(t, max_depth) for t in texts]),
+                "decoded": (lambda: [recursive_deep_parse_json(v, max_depth) for v in values],
+                            lambda: [deep_parse_json(v, max_depth) for v in values]),
+            }
+            for kind, (old_func, new_func) in cases.items():
+                if new_func() != old_func():
+                    raise SystemExit(f"Results differ for {name} {kind} payloads at max depth {max_depth}")
+                old = time_call(old_func)
+                new = time_call(new_func)
+                print(f"{name:<10} {kind:<8} {max_depth:>9} {old:>14.3f} {new:>14.3f}   ({old / new:.1f}x)")
+
+    payloads["decoy"] = [make_decoy_body(rng) for _ in range(args.bodies)]
+    payloads["large"] = [make_body(rng, 3, 30000)]
+    print()
+    print(f"{'payload':<10} {'body (KB)':>10} {'full then cut (ms)':>19} {'streamed (ms)':>14}")
+    for name, texts in payloads.items():
+        full_func = lambda: [truncate_text(prettify_json(t)) for t in texts]
+        preview_func = lambda: [stream_preview(t) for t in texts]
+        expanded_invalid = 0
+        for text, full, preview in zip(texts, full_func(), preview_func()):
+            if preview == full:
+                continue
+            if name != "decoy" or not has_invalid_json_string(text):
+                raise SystemExit(f"Preview differs from the cut full output for {name} body {text[:200]!r}")
+            expanded_invalid += 1
+        old = time_call(full_func)
+        new = time_call(preview_func)
+        size = sum(map(len, texts)) / len(texts) / 1024
+        note = f", {expanded_invalid} previews expand JSON found invalid past the preview" if expanded_invalid else ""
+        print(f"{name:<10} {size:>10.1f} {old * 1000:>19.2f} {new * 1000:>14.2f}   ({old / new:.1f}x{note})")
+    print(f"(prettify_and_truncate streams only bodies of {STREAM_PREVIEW_MIN_LENGTH // 1024} KB or more)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Time the capture-vs-capture comparison against a per-endpoint scan.
+
+Usage: python benchmarks/bench_diff.py [--entries N]
+
+Builds two synthetic captures of N entries each (default 200,000), the
+second with every fifth request slowed down and a few hosts missing, and
+compares them endpoint by endpoint both ways: by masking each capture's
+rows once per endpoint with exact percentiles, and by profiling each
+capture once and hash-joining the profiles. Percentiles must agree within
+the sketch accuracy.
+"""
+
+import argparse
+import time
+
+from synthetic import make_entries  # also puts the dashboard modules on sys.path
+
+import numpy as np
+import pandas as pd
+
+from capture_diff import EndpointProfile, diff_profiles, normalize_path
+from entry_frame import finalize_entries_frame
+from latency_sketch import DEFAULT_RELATIVE_ACCURACY, PERCENTILES, endpoint_key
+
+
+def make_frame(count, seed, slowdown=1.0, missing_hosts=0):
+    """Build an entries DataFrame, multiplying every fifth duration by `slowdown`"""
+    entries = make_entries(count, seed=seed)
+    for entry in entries[::5]:
+        entry["duration"] *= slowdown
+    for entry in entries[:missing_hosts]:
+        entry["host"] = None
+    return finalize_entries_frame(pd.DataFrame(entries).drop(columns=["request_body", "response_body"]))
+
+
+def scan_diff(before, after):
+    """Per-endpoint baseline: normalize every row, then mask both captures for each endpoint"""
+    keys = []
+    for df in (before, after):
+        hosts = df["host"].astype(object).where(df["host"].notna(), None)
+        keys.append(np.array([endpoint_key(method, host, normalize_path(str(path)))
+                              for method, host, path in zip(df["method"], hosts, df["path"])], dtype=object))
+    rows = {}
+    for endpoint in sorted(set(keys[0]) | set(keys[1])):
+        durations = [df["duration_ms"].to_numpy()[key == endpoint] for df, key in zip((before, after), keys)]
+        # Each percentile as the samples just below and above its rank
+        rows[endpoint] = [(np.percentile(d, p, method="lower"), np.percentile(d, p, method="higher"))
+                          if len(d) else None for d in durations for p in PERCENTILES]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200000, help="synthetic entries per capture")
+    args = parser.parse_args()
+
+    print(f"Generating two captures of {args.entries} synthetic entries...")
+    before = make_frame(args.entries, seed=1)
+    after = make_frame(args.entries, seed=2, slowdown=3.0, missing_hosts=20)
+
+    start = time.perf_counter()
+    exact = scan_diff(before, after)
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    profiles = EndpointProfile.build(before), EndpointProfile.build(after)
+    profile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    diff = diff_profiles(*profiles).set_index("endpoint")
+    join_time = time.perf_counter() - start
+
+    assert set(diff.index) == set(exact)
+    for endpoint, values in exact.items():
+        sketched = [diff.at[endpoint, f"p{p}_{when}"] for when in ("before", "after") for p in PERCENTILES]
+        for bounds, estimate in zip(values, sketched):
+            if bounds is None:
+                assert np.isnan(estimate), (endpoint, estimate)
+                continue
+            low, high = bounds
+            slack = 2 * DEFAULT_RELATIVE_ACCURACY
+            assert low * (1 - slack) - 1 <= estimate <= high * (1 + slack) + 1, (endpoint, bounds, estimate)
+
+    print(f"{len(diff)} endpoints")
+    print(f"{'method':<22} {'time (s)':>9}")
+    print(f"{'per-endpoint scan':<22} {scan_time:>9.3f}")
+    print(f"{'profile both':<22} {profile_time:>9.3f}")
+    print(f"{'hash join':<22} {join_time:>9.3f}   ({scan_time / (profile_time + join_time):.1f}x overall)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare ingesting Charles sessions and HAR archives directly with converting them first.
+
+Usage: python benchmarks/bench_ingest.py [--entries N]
+
+Writes a synthetic .chlsj session of N transactions (default 100,000), then
+builds the dashboard's entries DataFrame two ways: streamed straight from
+the session, and the former route through an intermediate parser JSON file
+(load the session, write the converted entries, stream that file). Both
+must yield the same rows. The same entries are also written as a HAR
+archive and streamed directly, to compare with loading parser JSON.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from synthetic import write_har, write_session  # also puts the dashboard modules on sys.path
+
+import charles_session
+import json_backend
+from entry_frame import stream_entries_frame
+
+
+def convert_session(session_path: str, json_path: str) -> None:
+    """The external conversion step: load the whole session and write parser JSON"""
+    transactions = json_backend.load_file(session_path)
+    with open(json_path, "w") as f:
+        json.dump({"entries": [charles_session.map_entry(tx) for tx in transactions]}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000, help="transactions in the synthetic session")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session_path = os.path.join(tmp, "session.chlsj")
+        json_path = os.path.join(tmp, "session.json")
+        print(f"Writing a session of {args.entries} transactions...")
+        write_session(session_path, args.entries)
+
+        start = time.perf_counter()
+        _, direct = stream_entries_frame(session_path, index_bodies=True)
+        direct_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        convert_session(session_path, json_path)
+        convert_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, converted = stream_entries_frame(json_path, index_bodies=True)
+        load_time = time.perf_counter() - start
+
+        har_path = os.path.join(tmp, "session.har")
+        write_har(har_path, args.entries)
+        start = time.perf_counter()
+        _, har = stream_entries_frame(har_path, index_bodies=True)
+        har_time = time.perf_counter() - start
+
+        columns = [col for col in direct.columns if "body" not in col]
+        assert direct[columns].equals(converted[columns]), "Direct and converted frames differ"
+        shared = ["method", "host", "path", "url", "status", "duration"]
+        assert har[shared].equals(direct[shared]), "HAR and session frames differ"
+
+        size_mb = os.path.getsize(session_path) / 2 ** 20
+        json_mb = os.path.getsize(json_path) / 2 ** 20
+        print(f"{'route':<28} {'time (s)':>9}")
+        print(f"{'direct .chlsj':<28} {direct_time:>9.3f}   (reads {size_mb:.0f} MB)")
+        print(f"{'convert + load JSON':<28} {convert_time + load_time:>9.3f}   "
+              f"(reads {size_mb + json_mb:.0f} MB, writes {json_mb:.0f} MB; "
+              f"{(convert_time + load_time) / direct_time:.1f}x slower)")
+        print(f"{'load parser JSON':<28} {load_time:>9.3f}   (reads {json_mb:.0f} MB)")
+        har_mb = os.path.getsize(har_path) / 2 ** 20
+        print(f"{'direct .har':<28} {har_time:>9.3f}   (reads {har_mb:.0f} MB; "
+              f"{har_time / load_time:.2f}x parser JSON)")
+
+
+if __name__ == "__main__":
+    main()
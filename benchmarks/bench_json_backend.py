@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare JSON backends on capture loading and body prettifying.
+
+Usage: python benchmarks/bench_json_backend.py [capture.json] [--entries N]
+
+Without a capture file a synthetic one with N entries (default 50000) is
+generated in a temporary directory and removed afterwards.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic import write_capture  # also puts the dashboard modules on sys.path
+
+import json_backend
+
+
+def time_call(func, repeat: int = 3) -> float:
+    """Return the best wall time of several runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare_backends(capture: str) -> None:
+    """Time loading the capture and prettifying its first bodies with every installed backend"""
+    size_mb = os.path.getsize(capture) / (1024 * 1024)
+    bodies = [e["response_body"] for e in json_backend.get_backend("json").load_file(capture)["entries"]][:5000]
+    print(f"Capture: {capture} ({size_mb:.1f} MB), prettifying {len(bodies)} bodies")
+    print(f"{'backend':<10} {'load (s)':>10} {'prettify (s)':>14}")
+
+    baseline = None
+    for name in reversed(json_backend.available_backends()):
+        backend = json_backend.get_backend(name)
+        load_time = time_call(lambda: backend.load_file(capture))
+        pretty_time = time_call(lambda: [backend.dumps_pretty(backend.loads(b)) for b in bodies])
+        if baseline is None:
+            baseline = (load_time, pretty_time)
+        print(f"{name:<10} {load_time:>10.3f} {pretty_time:>14.3f}"
+              f"   ({baseline[0] / load_time:.1f}x load, {baseline[1] / pretty_time:.1f}x prettify)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", nargs="?", help="capture JSON file to load")
+    parser.add_argument("--entries", type=int, default=50000, help="entries in the synthetic capture")
+    args = parser.parse_args()
+
+    if args.capture is not None:
+        compare_backends(args.capture)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = os.path.join(tmp, "capture.json")
+        print(f"Generating {args.entries} synthetic entries...")
+        write_capture(capture, args.entries)
+        compare_backends(capture)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Synthetic Charles captures for the benchmarks in this directory.
+
+Entries follow the parser's detailed format (method, host, path, status,
+duration, request/response bodies). Bodies are GraphQL-style responses whose
+inner payloads are themselves escaped JSON strings, like real captures.
+`make_transactions` wraps the same entries as Charles session (.chlsj)
+transactions and `make_har` as a HAR 1.2 archive.
+"""
+
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+# Make the dashboard modules importable when a benchmark is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HOSTS = [f"api{i}.example.com" for i in range(20)] + ["cdn.example.net", "auth.example.org"]
+METHODS = ["GET", "GET", "GET", "POST", "PUT", "DELETE"]
+STATUSES = [200] * 12 + [201, 204, 301, 304, 400, 401, 404, 500, 502, 503]
+
+
+def make_body(rng: random.Random, depth: int = 3, width: int = 4) -> str:
+    """Return a response body with `depth` levels of JSON-encoded JSON strings"""
+    payload: Any = {
+        "items": [{"id": rng.randint(1, 10 ** 6), "name": f"item-{rng.randint(1, 999)}", "tags": ["a", "b", "ü"]}
+                  for _ in range(width)],
+    }
+    for level in range(depth):
+        payload = {"data": {f"level{level}": json.dumps(payload)}, "errors": None}
+    return json.dumps(payload)
+
+
+def make_entries(count: int, seed: int = 42, body_depth: int = 3, body_width: int = 4) -> List[Dict[str, Any]]:
+    """Return `count` synthetic capture entries"""
+    rng = random.Random(seed)
+    bodies = [make_body(rng, body_depth, body_width) for _ in range(64)]
+    entries = []
+    for i in range(count):
+        host = rng.choice(HOSTS)
+        path = f"/v1/resource/{rng.randint(1, 50)}"
+        entries.append({
+            "method": rng.choice(METHODS),
+            "host": host,
+            "path": path,
+            "url": f"https://{host}{path}",
+            "status": rng.choice(STATUSES),
+            "duration": int(rng.lognormvariate(5, 1.2)),
+            "start_time": f"2025-05-22T10:{(i // 60) % 60:02d}:{i % 60:02d}",
+            "request_body": rng.choice(bodies) if i % 3 == 0 else None,
+            "response_body": rng.choice(bodies),
+        })
+    return entries
+
+
+def write_capture(file_path: str, count: int, **kwargs: Any) -> str:
+    """Write a synthetic capture in the detailed format and return its path"""
+    with open(file_path, "w") as f:
+        json.dump({"entries": make_entries(count, **kwargs)}, f)
+    return file_path
+
+
+def make_transactions(count: int, seed: int = 42, **kwargs: Any) -> List[Dict[str, Any]]:
+    """Return `count` synthetic Charles session transactions"""
+    transactions = []
+    for entry in make_entries(count, seed=seed, **kwargs):
+        total = entry["duration"]
+        sides = {}
+        for side in ("request", "response"):
+            body = entry[f"{side}_body"]
+            sides[side] = {
+                "sizes": {"headers": 320, "body": len(body) if body else 0},
+                "mimeType": "application/json" if body else None,
+                "charset": "UTF-8" if body else None,
+                "header": {"firstLine": f"{entry['method']} {entry['path']} HTTP/1.1",
+                           "headers": [{"name": "Host", "value": entry["host"]},
+                                       {"name": "Content-Type", "value": "application/json"}]},
+            }
+            if body:
+                sides[side]["body"] = {"text": body, "charset": "UTF-8", "decoded": True}
+        sides["response"]["status"] = entry["status"]
+        transactions.append({
+            "status": "COMPLETE",
+            "method": entry["method"],
+            "protocolVersion": "HTTP/1.1",
+            "scheme": "https",
+            "host": entry["host"],
+            "actualPort": 443,
+            "path": entry["path"],
+            "query": None,
+            "tunnel": False,
+            "keptAlive": True,
+            "webSocket": False,
+            "times": {"start": entry["start_time"] + ".000+00:00"},
+            "durations": {"total": total, "dns": 0, "connect": total // 10, "ssl": total // 10,
+                          "request": 1, "response": total // 5, "latency": total - 1 - total // 5 - total // 5},
+            "speeds": {"overall": 1000, "request": 1000, "response": 1000},
+            "totalSize": sum(side["sizes"]["headers"] + side["sizes"]["body"] for side in sides.values()),
+            "request": sides["request"],
+            "response": sides["response"],
+        })
+    return transactions
+
+
+def write_session(file_path: str, count: int, **kwargs: Any) -> str:
+    """Write a synthetic Charles session (.chlsj) and return its path"""
+    with open(file_path, "w") as f:
+        json.dump(make_transactions(count, **kwargs), f, indent=2)
+    return file_path
+
+
+def make_har(count: int, seed: int = 42, **kwargs: Any) -> Dict[str, Any]:
+    """Return a synthetic HAR 1.2 archive of `count` entries"""
+    har_entries = []
+    for entry in make_entries(count, seed=seed, **kwargs):
+        total = entry["duration"]
+        request: Dict[str, Any] = {
+            "method": entry["method"], "url": entry["url"], "httpVersion": "HTTP/1.1", "cookies": [],
+            "headers": [{"name": "Host", "value": entry["host"]},
+                        {"name": "Accept", "value": "application/json"}],
+            "queryString": [], "headersSize": 320,
+            "bodySize": len(entry["request_body"]) if entry["request_body"] else 0,
+        }
+        if entry["request_body"]:
+            request["postData"] = {"mimeType": "application/json", "text": entry["request_body"]}
+        har_entries.append({
+            "startedDateTime": entry["start_time"] + ".000Z",
+            "time": total,
+            "request": request,
+            "response": {
+                "status": entry["status"], "statusText": "", "httpVersion": "HTTP/1.1", "cookies": [],
+                "headers": [{"name": "Content-Type", "value": "application/json"}],
+                "content": {"size": len(entry["response_body"]), "mimeType": "application/json",
+                            "text": entry["response_body"]},
+                "redirectURL": "", "headersSize": 240, "bodySize": len(entry["response_body"]),
+            },
+            "cache": {},
+            "timings": {"blocked": 0, "dns": -1, "connect": total // 10, "ssl": total // 10, "send": 1,
+                        "wait": total - 1 - total // 5 - total // 5, "receive": total // 5},
+        })
+    return {"log": {"version": "1.2", "creator": {"name": "synthetic", "version": "1.0"},
+                    "pages": [], "entries": har_entries}}
+
+
+def write_har(file_path: str, count: int, **kwargs: Any) -> str:
+    """Write a synthetic HAR archive (.har) and return its path"""
+    with open(file_path, "w") as f:
+        json.dump(make_har(count, **kwargs), f, indent=2)
+    return file_path
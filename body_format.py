@@ -0,0 +1,677 @@
+"""
+Display formatting of request/response bodies.
+
+Bodies are pretty-printed on demand - only the ones on the visible page or
+in the detail tabs - and each result is memoized under a hash of the raw
+body, so Streamlit reruns and repeated row selections reuse the formatted
+text instead of parsing the same payload again. Table cells only show
+previews, which `preview_json` prints token by token and stops as soon as
+the preview is full, so their cost follows the preview length, not the body
+size.
+
+`format_raw_bodies` formats a whole batch - for exports or whole-capture
+searches - across a process pool. Workers receive the raw JSON bytes of
+each body, never DataFrames or decoded objects.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from json.decoder import scanstring
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+import json_backend
+
+logger = logging.getLogger(__name__)
+
+_LEADING_SPACE = re.compile(r"\s*")
+# A string value in JSON text starting (after whitespace or escapes) with "{" or "["
+_NESTED_JSON_START = re.compile(r'"(?:\s|\\[nrtfb])*(?:[{\[]|\\u)')
+_NESTED_JSON_CANDIDATE = re.compile(r'"[\s\\{\[]')
+# Numbers and the literals true, false and null
+_JSON_LITERAL = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?|true|false|null")
+
+# Memory budget for memoized formatted bodies
+DEFAULT_MEMO_BYTES = 64 * 1024 * 1024
+
+# Levels of nesting expanded by deep_parse_json (containers and JSON strings each count one)
+MAX_EXPAND_DEPTH = 3
+
+# Levels from which scanning a text for JSON-looking strings is cheaper than walking its tree
+SCAN_MIN_LEVELS = 4
+
+# Nested JSON text parsed per body - larger strings are left as they are
+MAX_EXPAND_BYTES = 16 * 1024 * 1024
+
+# Length of table cell previews
+PREVIEW_LENGTH = 100
+
+# Bodies shorter than this are previewed by formatting them whole, which is faster than streaming
+STREAM_PREVIEW_MIN_LENGTH = 16 * 1024
+
+# Limits of one unit of work sent to a formatting process
+BATCH_CHUNK_BODIES = 256
+BATCH_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Batches smaller than this are formatted in the calling process
+PARALLEL_MIN_BYTES = 1024 * 1024
+
+
+def _is_missing(content: Any) -> bool:
+    return content is None or (isinstance(content, float) and math.isnan(content))
+
+
+def _looks_like_json(text: str) -> bool:
+    """Whether a string is a JSON object or array, judged by its first and last non-space characters"""
+    start = _LEADING_SPACE.match(text).end()
+    if start == len(text):
+        return False
+    end = len(text) - 1
+    while text[end].isspace():
+        end -= 1
+    return (text[start] == '{' and text[end] == '}') or (text[start] == '[' and text[end] == ']')
+
+
+def _may_contain_json_strings(raw: str) -> bool:
+    """Whether the JSON text `raw` may hold string values that are themselves JSON"""
+    # Cheap single-character test first, the full pattern only from the first candidate on
+    candidate = _NESTED_JSON_CANDIDATE.search(raw)
+    if candidate is None:
+        return False
+    return _NESTED_JSON_START.search(raw, candidate.start()) is not None
+
+
+def _own(frame: list) -> None:
+    """Copy a caller's container, and its not yet copied ancestors, before it is changed"""
+    chain = []
+    while not frame[3]:
+        chain.append(frame)
+        frame = frame[1]
+    for frame in reversed(chain):
+        node, parent, key = frame[0], frame[1], frame[2]
+        frame[0] = parent[0][key] = dict(node) if isinstance(node, dict) else list(node)
+        frame[3] = True
+
+
+def _expand(content: Any, depth: int, max_depth: int, max_bytes: int, fresh: bool) -> Any:
+    """Expand JSON strings nested in `content` (found at `depth`) without recursion
+
+    Containers the caller passed in are copied only on the path to a string
+    that is actually replaced; `fresh` containers (decoded here) are updated
+    in place.
+    """
+    holder = [content]
+    budget = max_bytes
+    # Containers whose children are still to visit: (container, its depth, frame). Caller
+    # containers have a frame [container, parent frame, key in parent, owned] to copy them
+    # before they change; containers decoded here have None and are changed in place.
+    stack = [(holder, depth - 1, None if fresh else [holder, None, None, True])]
+
+    while stack:
+        node, node_depth, frame = stack.pop()
+        child_depth = node_depth + 1
+        if child_depth >= max_depth:
+            continue
+        for key, value in (node.items() if isinstance(node, dict) else enumerate(node)):
+            if isinstance(value, str):
+                if len(value) > budget or not _looks_like_json(value):
+                    continue
+                try:
+                    parsed = json_backend.loads(value)
+                except (json.JSONDecodeError, RecursionError):
+                    continue
+                budget -= len(value)
+                if frame is None:
+                    node[key] = parsed
+                else:
+                    if not frame[3]:
+                        _own(frame)
+                    frame[0][key] = parsed
+                if isinstance(parsed, (dict, list)) and parsed and \
+                        _worth_walking(value, max_depth - child_depth - 1):
+                    stack.append((parsed, child_depth + 1, None))
+            elif isinstance(value, (dict, list)) and value:
+                stack.append((value, child_depth, None if frame is None else [value, frame, key, False]))
+
+    return holder[0]
+
+
+def _worth_walking(raw: str, levels: int) -> bool:
+    """Whether the tree decoded from `raw` should be walked `levels` deep for nested JSON strings"""
+    if levels <= 0:
+        return False
+    # A shallow walk costs less than scanning the whole text first
+    return levels < SCAN_MIN_LEVELS or _may_contain_json_strings(raw)
+
+
+def deep_parse_json(content: Any, max_depth: int = MAX_EXPAND_DEPTH, current_depth: int = 0,
+                    max_bytes: int = MAX_EXPAND_BYTES) -> Any:
+    """Parse JSON strings nested in a value, within depth and byte budgets (the input is not modified)"""
+    return _expand(content, current_depth, max_depth, max_bytes, fresh=False)
+
+
+def parse_nested_json(text: str, max_depth: int = MAX_EXPAND_DEPTH, max_bytes: int = MAX_EXPAND_BYTES) -> Any:
+    """Decode a JSON text and the JSON strings nested in it (JSONDecodeError if the text is invalid)"""
+    parsed = json_backend.loads(text)
+    if not isinstance(parsed, (dict, list)) or not _worth_walking(text, max_depth):
+        return parsed
+    return _expand(parsed, 0, max_depth, max_bytes, fresh=True)
+
+
+def safely_process_json(process_func: Callable, content: Any, *args, **kwargs) -> Any:
+    """Wrapper to catch and handle errors when processing JSON data"""
+    try:
+        return process_func(content, *args, **kwargs)
+    except RecursionError:
+        logger.warning("Recursion limit reached while processing JSON data.")
+        return str(content)
+    except MemoryError:
+        logger.warning("Out of memory while processing large JSON data.")
+        return "Error: Data too large to process"
+    except Exception as e:
+        logger.warning("Error processing JSON data: %s", e)
+        return str(content)
+
+
+def prettify_json(content: Any) -> str:
+    """Prettify a body for full display, expanding JSON nested in strings"""
+    if _is_missing(content):
+        return ""
+
+    # Convert to string if it's not already
+    if not isinstance(content, str):
+        try:
+            if isinstance(content, (dict, list)):
+                # Handle any nested JSON strings
+                deep_parsed = safely_process_json(deep_parse_json, content)
+                return json_backend.dumps_pretty(deep_parsed)
+            content = str(content)
+        except Exception:
+            return str(content)
+
+    # Try to parse and prettify JSON
+    try:
+        if _looks_like_json(content):
+            # Parse the JSON (this will handle escaped characters) and any nested JSON strings
+            deep_parsed = parse_nested_json(content)
+            # Re-serialize with nice formatting but without escaping unicode or special chars
+            return json_backend.dumps_pretty(deep_parsed)
+    except json.JSONDecodeError:
+        # Not valid JSON, keep as is
+        pass
+
+    return content
+
+
+def truncate_text(text: str, max_length: int = PREVIEW_LENGTH) -> str:
+    """Cut text to a preview, preferably at the end of a line"""
+    if len(text) <= max_length:
+        return text
+    cut_at = text.rfind('\n', 0, max_length)
+    if cut_at > 0:
+        return text[:cut_at] + "\n..."
+    return text[:max_length] + "..."
+
+
+class _PreviewFull(Exception):
+    """Raised by _PreviewWriter once the preview budget is used up"""
+
+
+class _PreviewEnd(ValueError):
+    """Raised by the previewer when the text ends mid-value - it may be a prefix of a longer text"""
+
+
+# Characters near the end of a text within which a syntax error may just mean the text was cut
+_END_SLACK = 12
+
+# Raw characters of a string first decoded per preview character still to write,
+# multiplied by WINDOW_GROWTH whenever that is not enough
+WINDOW_PER_CHAR = 8
+WINDOW_GROWTH = 4
+
+# JSON string content up to its closing quote, escapes taken whole
+_STRING_CONTENT = re.compile(r'[^"\\]*(?:(?:\\u[0-9a-fA-F]{4}|\\[^u])[^"\\]*)*')
+
+
+class _PreviewWriter:
+    """Collects preview text and stops the printer once `limit` characters are written"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.length = 0
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        self.length += len(text)
+        if self.length >= self.limit:
+            raise _PreviewFull
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _syntax_error(text: str, pos: int, message: str) -> ValueError:
+    """Return the error for invalid JSON at `pos`, a _PreviewEnd if the text may just have been cut there"""
+    if pos >= len(text) - _END_SLACK:
+        return _PreviewEnd(message)
+    return ValueError(message)
+
+
+def _scan_string(text: str, pos: int) -> Tuple[str, int]:
+    """Decode the JSON string whose content starts at `pos`, returning (value, end)"""
+    try:
+        return scanstring(text, pos)
+    except json.JSONDecodeError as e:
+        if e.msg.startswith("Unterminated string"):
+            raise _PreviewEnd(e.msg) from e
+        raise _syntax_error(text, e.pos, e.msg) from e
+
+
+def _scan_string_prefix(text: str, pos: int, window: int) -> Tuple[str, Optional[int]]:
+    """Decode the JSON string whose content starts at `pos`, or only its first `window` characters
+
+    Returns (value, end) with `end` the position after the closing quote, or
+    (prefix, None) when the string runs past the window or the end of the text.
+    """
+    limit = min(pos + window, len(text))
+    stop = _STRING_CONTENT.match(text, pos, limit).end()
+    if stop < limit and (text[stop] == '"' or stop < limit - _END_SLACK):
+        # Closed within the window, or malformed - let the decoder report it
+        return _scan_string(text, pos)
+    value, _ = scanstring(text[pos:stop] + '"', 0)
+    if value and "\ud800" <= value[-1] <= "\udbff":
+        # Cut between the two halves of a surrogate pair
+        value = value[:-1]
+    return value, None
+
+
+def _grow_window(text: str, pos: int, window: int) -> int:
+    """Return a larger window for a string cut short (_PreviewEnd if the text ends within this one)"""
+    if pos + window >= len(text):
+        raise _PreviewEnd("Unexpected end of JSON text")
+    return window * WINDOW_GROWTH
+
+
+def _write_string(writer: _PreviewWriter, value: str) -> None:
+    """Write a JSON string, encoding no more of it than the preview can show"""
+    room = writer.limit - writer.length
+    if len(value) > room:
+        value = value[:room]
+    writer.write(json.dumps(value, ensure_ascii=False))
+
+
+def _opens_json(value: str, complete: bool) -> bool:
+    """Whether a string value is to be expanded as JSON - judged by its start alone if only a prefix is known"""
+    if complete:
+        return _looks_like_json(value)
+    start = _LEADING_SPACE.match(value).end()
+    return value.startswith(("{", "["), start)
+
+
+def _expansion_valid(value: str, complete: bool, indent: int, depth: int, max_depth: int) -> bool:
+    """Whether a string whose expansion filled the preview may be shown expanded
+
+    A whole string must parse, as the full formatter only expands valid JSON.
+    Of a cut string only the decoded prefix is checked.
+    """
+    try:
+        if complete:
+            json_backend.loads(value)
+        else:
+            _preview_json(value, _PreviewWriter(len(value)), indent, depth, max_depth)
+    except (_PreviewFull, _PreviewEnd):
+        return True
+    except (ValueError, RecursionError):
+        return False
+    return True
+
+
+def _preview_string(text: str, pos: int, writer: _PreviewWriter, indent: int, depth: int, max_depth: int) -> int:
+    """Write the string value whose content starts at `pos`, expanding nested JSON, and return its end
+
+    Only as much of the string is decoded as the preview can show, so a long
+    string holding JSON is expanded from its start without being parsed to
+    its end - an expansion cut short by the budget is shown even if the rest
+    of the string would turn out not to be valid JSON.
+    """
+    room = writer.limit - writer.length
+    window = WINDOW_PER_CHAR * room
+    expand = depth < max_depth
+    while True:
+        value, end = _scan_string_prefix(text, pos, window)
+        complete = end is not None
+        if expand and _opens_json(value, complete):
+            # Expand into a separate writer so invalid nested JSON stays a plain string
+            nested = _PreviewWriter(room)
+            try:
+                _preview_json(value, nested, indent, depth + 1, max_depth)
+            except _PreviewFull:
+                if _expansion_valid(value, complete, indent, depth + 1, max_depth):
+                    writer.write(nested.text())
+                expand = False
+            except _PreviewEnd:
+                # Cut inside the nested value - only invalid if the whole string was there
+                expand = not complete
+            except (ValueError, RecursionError):
+                expand = False
+            else:
+                if complete:
+                    writer.write(nested.text())
+                    return end
+                # The nested value ended before the string did - look further
+            if expand:
+                window = _grow_window(text, pos, window)
+                continue
+        if complete or len(value) >= room:
+            # A plain string - a cut one fills the preview
+            _write_string(writer, value)
+            return end
+        window = _grow_window(text, pos, window)
+
+
+def _preview_json(text: str, writer: _PreviewWriter, indent: int, depth: int, max_depth: int) -> None:
+    """Pretty-print the JSON text token by token into `writer` (ValueError on invalid JSON)
+
+    `indent` is the indentation level the value starts at and `depth` its
+    nesting depth as counted by deep_parse_json, so strings holding JSON are
+    expanded the same way the full formatter expands them.
+    """
+    # Closing characters of the open containers
+    stack: List[str] = []
+    pos = _LEADING_SPACE.match(text).end()
+    expect_value = True
+
+    while True:
+        if expect_value:
+            if pos >= len(text):
+                raise _PreviewEnd("Unexpected end of JSON text")
+            char = text[pos]
+            if char == '{' or char == '[':
+                close = '}' if char == '{' else ']'
+                pos = _LEADING_SPACE.match(text, pos + 1).end()
+                if text.startswith(close, pos):
+                    writer.write(char + close)
+                    pos += 1
+                    expect_value = False
+                    continue
+                stack.append(close)
+                writer.write(char + "\n" + "  " * (indent + len(stack)))
+                if close == '}':
+                    pos = _write_key(text, pos, writer)
+                continue
+            if char == '"':
+                pos = _preview_string(text, pos + 1, writer, indent + len(stack), depth + len(stack), max_depth)
+            else:
+                match = _JSON_LITERAL.match(text, pos)
+                if match is None:
+                    raise _syntax_error(text, pos, f"Invalid JSON value at {pos}")
+                writer.write(match.group())
+                pos = match.end()
+            expect_value = False
+            continue
+
+        pos = _LEADING_SPACE.match(text, pos).end()
+        if not stack:
+            if pos != len(text):
+                raise ValueError(f"Extra data at {pos}")
+            return
+        char = text[pos] if pos < len(text) else ""
+        if char == ',':
+            writer.write(",\n" + "  " * (indent + len(stack)))
+            pos = _LEADING_SPACE.match(text, pos + 1).end()
+            if stack[-1] == '}':
+                pos = _write_key(text, pos, writer)
+            expect_value = True
+        elif char == stack[-1]:
+            stack.pop()
+            writer.write("\n" + "  " * (indent + len(stack)) + char)
+            pos += 1
+        else:
+            raise _syntax_error(text, pos, f"Expected ',' or {stack[-1]!r} at {pos}")
+
+
+def _write_key(text: str, pos: int, writer: _PreviewWriter) -> int:
+    """Write an object key and its separator, returning the position of the value"""
+    if not text.startswith('"', pos):
+        raise _syntax_error(text, pos, f"Expected an object key at {pos}")
+    key, pos = _scan_string(text, pos + 1)
+    pos = _LEADING_SPACE.match(text, pos).end()
+    if not text.startswith(':', pos):
+        raise _syntax_error(text, pos, f"Expected ':' at {pos}")
+    _write_string(writer, key)
+    writer.write(": ")
+    return _LEADING_SPACE.match(text, pos + 1).end()
+
+
+def preview_json(text: str, max_length: int = PREVIEW_LENGTH, max_depth: int = MAX_EXPAND_DEPTH) -> Optional[str]:
+    """Pretty-print the start of a JSON text, stopping after `max_length` characters
+
+    Returns None if the text turns out not to be JSON before the preview is
+    complete. Only the part of the body needed for the preview is tokenized,
+    and strings holding JSON are decoded only as far as the preview needs -
+    so, unlike in the full formatter, one that turns out invalid further on
+    may still be shown expanded.
+    """
+    writer = _PreviewWriter(max_length + 1)
+    try:
+        _preview_json(text, writer, 0, 0, max_depth)
+    except _PreviewFull:
+        pass
+    except ValueError:
+        return None
+    return writer.text()
+
+
+def prettify_and_truncate(content: Any, max_length: int = PREVIEW_LENGTH) -> str:
+    """Prettify the start of a body and cut it to a preview, without formatting the whole body"""
+    if _is_missing(content):
+        return ""
+    if isinstance(content, (dict, list)):
+        try:
+            content = json_backend.dumps(content)
+        except (TypeError, ValueError):
+            content = str(content)
+    elif not isinstance(content, str):
+        content = str(content)
+
+    if _looks_like_json(content):
+        if len(content) < STREAM_PREVIEW_MIN_LENGTH:
+            return truncate_text(prettify_json(content), max_length)
+        preview = preview_json(content, max_length)
+        if preview is not None:
+            return truncate_text(preview, max_length)
+    return truncate_text(content, max_length)
+
+
+class FormatMemo:
+    """LRU of formatted bodies keyed by a hash of the raw body, bounded by total size"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMO_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, bytes], str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content: Any, mode: str = "pretty") -> Optional[Tuple[str, bytes]]:
+        """Return the memo key of a raw body (None if it cannot be hashed)"""
+        if isinstance(content, str):
+            data = content.encode("utf-8", "surrogatepass")
+        elif isinstance(content, (dict, list)):
+            try:
+                data = json_backend.dumps(content).encode("utf-8", "surrogatepass")
+            except (TypeError, ValueError):
+                return None
+        else:
+            return None
+        # Type tag keeps a JSON string body apart from an embedded object with the same text
+        tag = b"s" if isinstance(content, str) else b"o"
+        return mode, hashlib.blake2b(tag + data, digest_size=16).digest()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: Tuple[str, bytes], text: str) -> None:
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = text
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_memo = FormatMemo()
+
+
+def get_format_memo() -> FormatMemo:
+    """Return the process-wide memo of formatted bodies"""
+    return _memo
+
+
+def format_body(content: Any) -> str:
+    """Prettify a body for display, reusing the memoized result for identical bodies"""
+    if _is_missing(content):
+        return ""
+    key = FormatMemo.key(content)
+    if key is None:
+        return prettify_json(content)
+    text = _memo.get(key)
+    if text is None:
+        text = prettify_json(content)
+        _memo.put(key, text)
+    return text
+
+
+def encode_body(content: Any) -> Optional[bytes]:
+    """Encode a body value as the raw JSON bytes taken by `format_raw_bodies` (None if missing)"""
+    if _is_missing(content):
+        return None
+    return json_backend.dumps(content).encode("utf-8", "surrogatepass")
+
+
+def _format_raw_chunk(chunk: List[Optional[bytes]]) -> List[str]:
+    """Decode and prettify a list of raw JSON bodies (runs in a worker process)"""
+    formatted = []
+    for raw in chunk:
+        if raw is None:
+            formatted.append("")
+            continue
+        try:
+            content = json_backend.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            formatted.append(raw.decode("utf-8", "replace"))
+            continue
+        # Not memoized: format_raw_bodies already dedupes, and exports would evict the display memo
+        formatted.append(prettify_json(content))
+    return formatted
+
+
+def _chunks(bodies: Sequence[Optional[bytes]], max_bodies: int, max_bytes: int) -> List[List[Optional[bytes]]]:
+    """Split bodies into consecutive chunks bounded by count and size"""
+    chunks, current, size = [], [], 0
+    for raw in bodies:
+        length = len(raw) if raw is not None else 0
+        if current and (len(current) >= max_bodies or size + length > max_bytes):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(raw)
+        size += length
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def format_raw_bodies(raw_bodies: Iterable[Optional[bytes]], workers: Optional[int] = None,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      chunk_bodies: int = BATCH_CHUNK_BODIES,
+                      chunk_bytes: int = BATCH_CHUNK_BYTES) -> List[str]:
+    """Prettify a batch of raw JSON bodies in parallel, keeping their order
+
+    Identical bodies are formatted once. `progress(done, total)` is called as
+    chunks complete, counting distinct bodies.
+    """
+    raw_bodies = list(raw_bodies)
+    # Format each distinct body once
+    positions = {}
+    distinct: List[Optional[bytes]] = []
+    order = []
+    for raw in raw_bodies:
+        key = bytes(raw) if raw is not None else None
+        if key not in positions:
+            positions[key] = len(distinct)
+            distinct.append(key)
+        order.append(positions[key])
+
+    chunks = _chunks(distinct, chunk_bodies, chunk_bytes)
+    total = len(distinct)
+    workers = workers or os.cpu_count() or 1
+    total_bytes = sum(len(raw) for raw in distinct if raw is not None)
+    results: List[Optional[List[str]]] = [None] * len(chunks)
+
+    done = 0
+    if workers <= 1 or len(chunks) <= 1 or total_bytes < PARALLEL_MIN_BYTES:
+        for i, chunk in enumerate(chunks):
+            results[i] = _format_raw_chunk(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            futures = {executor.submit(_format_raw_chunk, chunk): i for i, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += len(chunks[i])
+                if progress:
+                    progress(done, total)
+
+    formatted = [text for chunk in results for text in chunk]
+    return [formatted[i] for i in order]
+
+
+def format_bodies(bodies: Iterable[Any], workers: Optional[int] = None,
+                  progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """Prettify a batch of decoded body values in parallel, keeping their order"""
+    return format_raw_bodies((encode_body(body) for body in bodies), workers=workers, progress=progress)
+
+
+def render_bodies_export(labels: Sequence[str], formatted: "OrderedDict[str, List[str]]") -> Iterable[str]:
+    """Yield a plain-text export of formatted bodies, one section per entry"""
+    for i, label in enumerate(labels):
+        yield f"=== {label} ===\n"
+        for field, texts in formatted.items():
+            if texts[i]:
+                yield f"--- {field} ---\n{texts[i]}\n"
+        yield "\n"
@@ -0,0 +1,140 @@
+"""
+In-memory cache for parsed Charles capture files.
+
+Streamlit re-runs the whole dashboard script on every widget interaction,
+so without a cache each filter change re-parses the selected capture.
+Cached values are keyed on the file's (path, mtime, size) signature, which
+means that editing or replacing a file on disk invalidates its entry
+automatically. The cache holds at most a configurable number of bytes and
+evicts the least recently used captures first.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Default memory budget, overridable with the CHARLES_CACHE_MB environment variable
+DEFAULT_CACHE_MB = 1024
+
+
+def file_signature(file_path: str) -> Tuple[str, int, int]:
+    """Return the (path, mtime, size) signature identifying a file's contents"""
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Estimate the memory held by a cached value"""
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        # pandas DataFrame - count object columns deeply
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(item) for item in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return 0
+
+
+class CaptureCache:
+    """Thread-safe LRU cache of per-file values bounded by a byte budget"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Tuple[str, int, int], Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path: str, kind: str = "capture") -> Optional[Any]:
+        """Return the cached value for a file, or None if missing or stale"""
+        try:
+            signature = file_signature(file_path)
+        except OSError:
+            return None
+        key = (kind, signature[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != signature:
+                # File changed on disk since it was cached
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, file_path: str, value: Any, kind: str = "capture",
+            nbytes: Optional[int] = None) -> None:
+        """Store a value for a file, evicting least recently used entries as needed"""
+        try:
+            signature = file_signature(file_path)
+        except OSError:
+            return
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+        key = (kind, signature[0])
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget - caching it would evict everything
+                return
+            self._entries[key] = (signature, value, nbytes)
+            self._total_bytes += nbytes
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the memory budget, evicting entries if it shrank"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """Drop every cached value for a file, or everything if no file is given"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self._total_bytes = 0
+                return
+            path = os.path.abspath(file_path)
+            for key in [k for k in self._entries if k[1] == path]:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache usage counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, _, nbytes = self._entries.pop(key)
+        self._total_bytes -= nbytes
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+
+_cache: Optional[CaptureCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_capture_cache() -> CaptureCache:
+    """Return the process-wide capture cache shared by all dashboard sessions"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            budget_mb = int(os.environ.get("CHARLES_CACHE_MB", DEFAULT_CACHE_MB))
+            _cache = CaptureCache(budget_mb * 1024 * 1024)
+        return _cache
@@ -0,0 +1,236 @@
+"""
+Catalog of the captures in an output directory.
+
+The dashboard's file picker needs a few facts about every capture - size
+(compressed and uncompressed), modification time, format, entry count,
+time range and busiest hosts - to sort, filter and search thousands of
+files. Gathering them means reading each capture once, so they are kept in
+a small JSON index (`.charles_catalog.json`) inside the directory. A
+refresh lists the directory and rescans only the files whose size or mtime
+changed; removed files are dropped. Bulk rescans run in worker processes.
+A capture parsed anyway (by the watcher) gets its record from that same
+pass through `capture_record` and `complete_record` instead of a rescan.
+
+Only the standard library is used (plus zstandard for .zst captures, if installed).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from capture_compression import compression_suffix
+from capture_stream import CaptureStream, is_capture_name
+
+CATALOG_FILE = ".charles_catalog.json"
+
+# Bumped whenever the recorded fields change, so older catalogs are rebuilt
+CATALOG_VERSION = 2
+
+# Busiest hosts recorded per capture
+TOP_HOSTS = 5
+
+# Entry fields holding the request time, in order of preference
+TIME_FIELDS = ("start_time", "timestamp", "time")
+
+# Changed files scanned in worker processes above this count
+PARALLEL_MIN_FILES = 4
+
+# A catalog refreshed more recently than this is not re-listed
+DEFAULT_MAX_AGE = 2.0
+
+
+def capture_record(file_path: str) -> Dict[str, Any]:
+    """Return the record of a capture with only its file facts, taken before the file is read"""
+    stat = os.stat(file_path)
+    return {
+        "name": os.path.basename(file_path),
+        "size": stat.st_size,
+        # Bytes after decompression; the same as size for plain files
+        "uncompressed_size": None,
+        "compression": compression_suffix(file_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "format": None,
+        "entries": 0,
+        "first_time": None,
+        "last_time": None,
+        "top_hosts": [],
+        "error": None,
+    }
+
+
+def failed_record(record: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """Mark a record as an unreadable capture"""
+    record["format"] = "invalid"
+    record["error"] = str(error)
+    return record
+
+
+def complete_record(record: Dict[str, Any], stream: CaptureStream, hosts: Counter,
+                    first: Optional[str], last: Optional[str]) -> Dict[str, Any]:
+    """Fill in a record from a fully read stream, the host counts and the request time range of its entries"""
+    record["format"] = stream.format
+    record["uncompressed_size"] = stream.bytes_read
+    record["entries"] = stream.entry_count
+    if stream.format == "summary":
+        # Summaries carry their own counts
+        record["entries"] = stream.header.get("total_entries", 0)
+        if isinstance(stream.header.get("hosts"), dict):
+            hosts = Counter(stream.header["hosts"])
+    hosts.pop(None, None)
+    record["top_hosts"] = [[str(host), count] for host, count in hosts.most_common(TOP_HOSTS)]
+    record["first_time"], record["last_time"] = first, last
+    return record
+
+
+def scan_capture(file_path: str) -> Dict[str, Any]:
+    """Read a capture once and return its catalog record"""
+    record = capture_record(file_path)
+    # Bodies are never needed here - drop them as soon as they are decoded
+    stream = CaptureStream(file_path, max_body_bytes=0)
+    hosts: Counter = Counter()
+    first = last = None
+    try:
+        for entry in stream:
+            hosts[entry.get("host")] += 1
+            for field in TIME_FIELDS:
+                value = entry.get(field)
+                if value is not None:
+                    # ISO 8601 times order correctly as text
+                    value = str(value)
+                    if first is None or value < first:
+                        first = value
+                    if last is None or value > last:
+                        last = value
+                    break
+    except (ValueError, UnicodeDecodeError) as e:
+        return failed_record(record, e)
+    return complete_record(record, stream, hosts, first, last)
+
+
+def _scan_or_error(file_path: str) -> Dict[str, Any]:
+    """Scan a capture, recording OS errors instead of raising them"""
+    try:
+        return scan_capture(file_path)
+    except OSError as e:
+        return {"name": os.path.basename(file_path), "size": 0, "uncompressed_size": None,
+                "compression": compression_suffix(file_path), "mtime_ns": 0, "format": "invalid",
+                "entries": 0, "first_time": None, "last_time": None, "top_hosts": [], "error": str(e)}
+
+
+class CaptureCatalog:
+    """Incrementally maintained catalog of the captures in one directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, CATALOG_FILE)
+        # File name -> record
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._refreshed = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        """Read the saved catalog, ignoring a missing, unreadable or outdated one"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(saved, dict) and saved.get("version") == CATALOG_VERSION:
+            self._records = {record["name"]: record for record in saved.get("captures", [])}
+
+    def _save(self) -> None:
+        """Write the catalog next to the captures (atomically; skipped if the directory is read-only)"""
+        partial = self.path + ".part"
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump({"version": CATALOG_VERSION, "captures": list(self._records.values())}, f)
+            os.replace(partial, self.path)
+        except OSError:
+            pass
+
+    def refresh(self, max_age: float = DEFAULT_MAX_AGE, workers: Optional[int] = None) -> int:
+        """Bring the catalog up to date with the directory, returning the number of files (re)scanned
+
+        Only captures whose size or mtime changed since they were catalogued
+        are read. A catalog refreshed less than `max_age` seconds ago is
+        returned as is.
+        """
+        with self._lock:
+            if time.monotonic() - self._refreshed < max_age:
+                return 0
+            current = {}
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if is_capture_name(entry.name) and entry.is_file():
+                        try:
+                            current[entry.name] = entry.stat()
+                        except OSError:
+                            continue
+            changed = [name for name, stat in current.items()
+                       if name not in self._records
+                       or self._records[name]["size"] != stat.st_size
+                       or self._records[name]["mtime_ns"] != stat.st_mtime_ns]
+            removed = [name for name in self._records if name not in current]
+
+            for name in removed:
+                del self._records[name]
+            paths = [os.path.join(self.directory, name) for name in changed]
+            if len(paths) >= PARALLEL_MIN_FILES and workers != 1:
+                workers = min(workers or os.cpu_count() or 1, len(paths))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    records = list(executor.map(_scan_or_error, paths))
+            else:
+                records = [_scan_or_error(path) for path in paths]
+            for name, record in zip(changed, records):
+                self._records[name] = record
+
+            if changed or removed:
+                self._save()
+            self._refreshed = time.monotonic()
+            return len(changed)
+
+    def update(self, file_path: str, record: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Rescan one capture now, or store the record built while parsing it, and return the record"""
+        if record is None:
+            record = _scan_or_error(file_path)
+        with self._lock:
+            self._records[record["name"]] = record
+            self._save()
+        return record
+
+    def is_current(self, file_path: str) -> bool:
+        """Whether a capture is catalogued with its current size and mtime"""
+        record = self.get(os.path.basename(file_path))
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return record is not None and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Return the catalog records, newest capture first"""
+        with self._lock:
+            return sorted(self._records.values(), key=lambda record: record["mtime_ns"], reverse=True)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a capture by file name"""
+        with self._lock:
+            return self._records.get(name)
+
+
+_catalogs: Dict[str, CaptureCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(directory: str) -> CaptureCatalog:
+    """Return the process-wide catalog of a directory shared by all dashboard sessions"""
+    key = os.path.abspath(directory)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = CaptureCatalog(key)
+        return _catalogs[key]
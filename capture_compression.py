@@ -0,0 +1,209 @@
+"""
+Compressed capture files (.gz, .xz, .zst).
+
+Captures are often archived compressed - `x.json.gz`, `x.chlsj.xz`,
+`x.har.zst`. `open_capture` returns a binary file object yielding the
+decompressed bytes of any capture. For a compressed file, decompression
+runs on a background thread that keeps a few chunks ahead of the reader
+in a bounded queue, so it overlaps with JSON parsing (zlib, lzma and
+zstandard release the GIL while they work).
+
+Body spans of a compressed capture are offsets into its decompressed
+bytes; `read_spans` reads them back in a single forward pass. Bodies read
+this way are kept in a small LRU keyed by the file's signature, so
+reruns that show the same page do not decompress the file again.
+
+gzip and xz use the standard library. zstd needs the optional
+`zstandard` package - without it .zst files are not treated as captures.
+"""
+
+import gzip
+import lzma
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from capture_cache import file_signature
+
+# Compressed file extension -> opener returning a decompressing binary file
+COMPRESSIONS: Dict[str, Callable[[str], BinaryIO]] = {
+    ".gz": gzip.open,
+    ".xz": lzma.open,
+}
+if zstandard is not None:
+    COMPRESSIONS[".zst"] = zstandard.open
+
+# Decompressed bytes handed over per chunk, and chunks decoded ahead of the reader
+CHUNK_SIZE = 1024 * 1024
+QUEUE_CHUNKS = 8
+
+
+def compression_suffix(file_path: str) -> Optional[str]:
+    """Return the compression extension of a file name (".gz", ".xz", ".zst"), None if uncompressed"""
+    lowered = file_path.lower()
+    for suffix in COMPRESSIONS:
+        if lowered.endswith(suffix):
+            return suffix
+    return None
+
+
+def strip_compression(file_path: str) -> str:
+    """Return a file name without its compression extension ("x.json.gz" -> "x.json")"""
+    suffix = compression_suffix(file_path)
+    return file_path if suffix is None else file_path[:-len(suffix)]
+
+
+def open_decompressed(file_path: str) -> BinaryIO:
+    """Open a capture for reading its decompressed bytes on the calling thread"""
+    suffix = compression_suffix(file_path)
+    if suffix is None:
+        return open(file_path, "rb")
+    return COMPRESSIONS[suffix](file_path)
+
+
+class ThreadedReader:
+    """Read a decompressing file on a background thread, handing chunks over through a bounded queue"""
+
+    def __init__(self, raw: BinaryIO, file_path: str = "", chunk_size: int = CHUNK_SIZE,
+                 max_chunks: int = QUEUE_CHUNKS):
+        self._raw = raw
+        self._file_path = file_path
+        self._chunks: "queue.Queue[Any]" = queue.Queue(max_chunks)
+        self._stopping = threading.Event()
+        self._pending = b""
+        self._done = False
+        self._thread = threading.Thread(target=self._produce, args=(chunk_size,),
+                                        name="capture-decompress", daemon=True)
+        self._thread.start()
+
+    def _put(self, item: Any) -> None:
+        """Queue a chunk, giving up once the reader is closed"""
+        while not self._stopping.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _produce(self, chunk_size: int) -> None:
+        """Decompress chunks until end of file (an empty chunk) or an error, which is passed on"""
+        try:
+            while not self._stopping.is_set():
+                chunk = self._raw.read(chunk_size)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def read(self, size: int = -1) -> bytes:
+        """Return up to `size` decompressed bytes (all remaining ones if negative), b"" at end of file"""
+        parts = [self._pending] if self._pending else []
+        have = len(self._pending)
+        self._pending = b""
+        while not self._done and (size < 0 or have < size):
+            item = self._chunks.get()
+            if isinstance(item, Exception):
+                self._done = True
+                if isinstance(item, OSError):
+                    raise item
+                # lzma/zstd errors and truncated streams (EOFError) surface like malformed JSON
+                raise ValueError(f"Cannot decompress {self._file_path}: {item}") from item
+            if not item:
+                self._done = True
+                break
+            parts.append(item)
+            have += len(item)
+        data = b"".join(parts)
+        if 0 <= size < len(data):
+            data, self._pending = data[:size], data[size:]
+        return data
+
+    def close(self) -> None:
+        """Stop the decompression thread and close the file"""
+        self._stopping.set()
+        # Unblock a producer waiting on a full queue
+        while True:
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        self._raw.close()
+
+    def __enter__(self) -> "ThreadedReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def open_capture(file_path: str) -> Any:
+    """Open a capture for streaming its decompressed bytes, decompressing on a background thread"""
+    if compression_suffix(file_path) is None:
+        return open(file_path, "rb")
+    return ThreadedReader(open_decompressed(file_path), file_path)
+
+
+# Memory budget for bodies read back from compressed captures
+SPAN_CACHE_BYTES = 64 * 1024 * 1024
+
+# (file signature, offset, length) -> body bytes, least recently used first
+_span_cache: "OrderedDict[Tuple[Tuple[str, int, int], int, int], bytes]" = OrderedDict()
+_span_cache_bytes = 0
+_span_lock = threading.Lock()
+
+
+def _cache_span(key: Tuple[Tuple[str, int, int], int, int], data: bytes) -> None:
+    """Remember a body read from a compressed capture, evicting the oldest beyond the budget"""
+    global _span_cache_bytes
+    if len(data) > SPAN_CACHE_BYTES:
+        return
+    with _span_lock:
+        if key in _span_cache:
+            return
+        _span_cache[key] = data
+        _span_cache_bytes += len(data)
+        while _span_cache_bytes > SPAN_CACHE_BYTES:
+            _, evicted = _span_cache.popitem(last=False)
+            _span_cache_bytes -= len(evicted)
+
+
+def read_spans(file_path: str, spans: List[Tuple[int, int]]) -> List[Optional[bytes]]:
+    """Read (offset, length) spans of a compressed capture's decompressed bytes in one forward pass"""
+    signature = file_signature(file_path)
+    bodies: List[Optional[bytes]] = [None] * len(spans)
+    with _span_lock:
+        for i, (offset, length) in enumerate(spans):
+            key = (signature, offset, length)
+            if offset >= 0 and key in _span_cache:
+                _span_cache.move_to_end(key)
+                bodies[i] = _span_cache[key]
+    # Only bodies not read before cost a pass over the file
+    order: List[int] = sorted((i for i, (offset, _) in enumerate(spans) if offset >= 0 and bodies[i] is None),
+                              key=lambda i: spans[i][0])
+    if not order:
+        return bodies
+    previous: Optional[Tuple[Tuple[int, int], bytes]] = None
+    with open_decompressed(file_path) as f:
+        for i in order:
+            if previous is not None and previous[0] == spans[i]:
+                # The same body listed twice - seeking back would restart decompression
+                bodies[i] = previous[1]
+                continue
+            offset, length = spans[i]
+            # Forward seeks decompress and discard
+            f.seek(offset)
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError("Body offset is beyond the end of the file - it has changed since loading")
+            bodies[i] = data
+            previous = (spans[i], data)
+            _cache_span((signature, offset, length), data)
+    return bodies
@@ -0,0 +1,226 @@
+"""
+Capture-vs-capture comparison for regression hunting.
+
+Two captures of the same user journey (say, on two app builds) are
+compared endpoint by endpoint. Each capture is first reduced to an
+`EndpointProfile`: per normalized endpoint, the request count, error
+count, status distribution, mean payload sizes and a latency sketch. The
+profile is built in one grouped pass and cached per file like the other
+aggregates. `diff_profiles` then hash-joins the two profiles on the
+endpoint key and reports percentile deltas, status and payload-size
+changes, and endpoints that are new or missing.
+
+Endpoints are normalized so that the same call with different ids lines
+up: the query string is dropped and path segments that look like ids
+(numbers, UUIDs, long hex or token strings) become `{id}`.
+"""
+
+import re
+from typing import Dict, Optional, Sequence
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from latency_sketch import PERCENTILES, LatencySketches, endpoint_key
+
+# Path segments replaced by ID_PLACEHOLDER
+_ID_SEGMENT = re.compile(
+    r"\d+"
+    r"|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|[0-9a-fA-F]{12,}"
+    # Opaque tokens: long, and mixing letters with digits
+    r"|(?=[A-Za-z_\-]*\d)(?=\d*[A-Za-z])[A-Za-z0-9_\-]{20,}"
+)
+ID_PLACEHOLDER = "{id}"
+
+# Statuses listed per endpoint in the comparison, most frequent first
+TOP_STATUSES = 3
+
+# Columns holding each side's payload sizes, in order of preference
+SIZE_COLUMNS = {
+    "request_size": ("request_size", "request_body_length"),
+    "response_size": ("response_size", "response_body_length"),
+}
+
+# Change labels of compared endpoints
+NEW, MISSING, MATCHED = "new", "missing", "matched"
+
+
+def normalize_path(path: str) -> str:
+    """Return a path without its query string and with id-like segments replaced by {id}"""
+    path = path.split("?", 1)[0]
+    return "/".join(ID_PLACEHOLDER if _ID_SEGMENT.fullmatch(segment) else segment
+                    for segment in path.split("/"))
+
+
+def _format_statuses(counts: Dict[int, int]) -> str:
+    """Return a status distribution as "200: 95, 500: 5", most frequent first"""
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:TOP_STATUSES]
+    return ", ".join(f"{status}: {count:,}" for status, count in ranked)
+
+
+class EndpointProfile:
+    """Per-endpoint counts, statuses, payload sizes and latency sketches of one capture"""
+
+    def __init__(self, table: pd.DataFrame, statuses: Dict[str, Dict[int, int]], latency: LatencySketches):
+        # Indexed by endpoint: requests, errors, <side>_size_sum, <side>_size_count
+        self.table = table
+        # Endpoint -> {status: count}
+        self.statuses = statuses
+        # Latency sketches, overall and per endpoint
+        self.latency = latency
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "EndpointProfile":
+        """Profile an entries DataFrame in one grouped pass"""
+        n = len(df)
+        # Normalize each distinct (method, host, path) once, then map rows to endpoint codes.
+        # Missing values become None (not NaN, which would be labelled "nan") like endpoint_key expects.
+        def key_column(col: str) -> pd.Series:
+            if col not in df.columns:
+                return pd.Series(None, index=df.index, dtype=object)
+            return df[col].astype(object).where(df[col].notna(), None)
+
+        keys = pd.DataFrame({col: key_column(col) for col in ("method", "host", "path")})
+        from_url = "path" not in df.columns and "url" in df.columns
+        if from_url:
+            keys["path"] = key_column("url")
+        combo_ids = keys.groupby(list(keys.columns), dropna=False, sort=False).ngroup().to_numpy()
+        first_rows = np.unique(combo_ids, return_index=True)[1]
+        labels = []
+        for method, host, path in keys.iloc[first_rows].itertuples(index=False):
+            if from_url and path is not None:
+                # Split full URLs so the scheme and host are not repeated in the path
+                url = urlsplit(str(path))
+                host, path = host or url.netloc or None, url.path
+            labels.append(endpoint_key(method, host, normalize_path(str(path or ""))))
+        endpoint_of_combo, endpoints = pd.factorize(np.asarray(labels, dtype=object))
+        codes = endpoint_of_combo[combo_ids].astype(np.int64)
+        n_endpoints = len(endpoints)
+
+        status = df["status"].to_numpy(dtype="float64", na_value=np.nan) if "status" in df.columns \
+            else np.full(n, np.nan)
+        table = pd.DataFrame(index=pd.Index(endpoints, name="endpoint"))
+        table["requests"] = np.bincount(codes, minlength=n_endpoints)
+        table["errors"] = np.bincount(codes, weights=(status >= 400).astype(np.int64),
+                                      minlength=n_endpoints).astype(np.int64)
+        for side, candidates in SIZE_COLUMNS.items():
+            col = next((col for col in candidates if col in df.columns), None)
+            sizes = np.full(n, np.nan) if col is None else \
+                pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            if col is not None and col.endswith("_length"):
+                # Body spans: -1 (or 0) where there is no body
+                sizes = np.where(sizes > 0, sizes, np.nan)
+            known = ~np.isnan(sizes)
+            table[f"{side}_sum"] = np.bincount(codes[known], weights=sizes[known], minlength=n_endpoints)
+            table[f"{side}_count"] = np.bincount(codes[known], minlength=n_endpoints)
+
+        # Status distribution per endpoint from one count of (endpoint, status) pairs
+        statuses: Dict[str, Dict[int, int]] = {}
+        known = ~np.isnan(status)
+        if known.any():
+            pairs, pair_counts = np.unique(np.stack([codes[known], status[known].astype(np.int64)]), axis=1,
+                                           return_counts=True)
+            for code, value, count in zip(pairs[0].tolist(), pairs[1].tolist(), pair_counts.tolist()):
+                statuses.setdefault(endpoints[code], {})[value] = count
+
+        durations = df["duration_ms"].to_numpy(dtype="float64", na_value=np.nan) if "duration_ms" in df.columns \
+            else np.full(n, np.nan)
+        latency = LatencySketches()
+        latency.add_arrays(durations, endpoints=(codes, list(endpoints)))
+        return cls(table, statuses, latency)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the profile"""
+        return int(self.table.memory_usage(deep=True).sum()) + 50 * len(self.statuses) + self.latency.nbytes
+
+    def percentiles(self, percentiles: Sequence[float] = PERCENTILES) -> pd.DataFrame:
+        """Return the latency percentiles of every endpoint with durations"""
+        rows = {endpoint: sketch.percentiles(percentiles) for endpoint, sketch in self.latency.by_endpoint.items()}
+        return pd.DataFrame.from_dict(rows, orient="index", columns=list(percentiles))
+
+
+def diff_profiles(before: EndpointProfile, after: EndpointProfile,
+                  percentiles: Sequence[float] = PERCENTILES) -> pd.DataFrame:
+    """Compare two capture profiles endpoint by endpoint
+
+    Returns one row per endpoint seen in either capture, with its change
+    (new, missing or matched), request counts, error rates and status
+    distributions, mean payload sizes and latency percentiles of both
+    captures, and their deltas. Rows are ordered by the largest slowdown at
+    the highest percentile.
+    """
+    # Hash join of the two profiles on the endpoint key
+    joined = before.table.join(after.table, how="outer", lsuffix="_before", rsuffix="_after")
+    joined = joined.join(before.percentiles(percentiles).add_prefix("p").add_suffix("_before"), how="left")
+    joined = joined.join(after.percentiles(percentiles).add_prefix("p").add_suffix("_after"), how="left")
+
+    diff = pd.DataFrame(index=joined.index)
+    requests_before = joined["requests_before"].fillna(0).astype(np.int64)
+    requests_after = joined["requests_after"].fillna(0).astype(np.int64)
+    diff["change"] = np.where(requests_before == 0, NEW, np.where(requests_after == 0, MISSING, MATCHED))
+    diff["requests_before"] = requests_before
+    diff["requests_after"] = requests_after
+
+    for p in percentiles:
+        p_before, p_after = joined.get(f"p{p:g}_before"), joined.get(f"p{p:g}_after")
+        if p_before is None or p_after is None:
+            continue
+        diff[f"p{p:g}_before"] = p_before.astype("float64")
+        diff[f"p{p:g}_after"] = p_after.astype("float64")
+        diff[f"p{p:g}_delta"] = diff[f"p{p:g}_after"] - diff[f"p{p:g}_before"]
+        diff[f"p{p:g}_change"] = diff[f"p{p:g}_delta"] / diff[f"p{p:g}_before"].where(diff[f"p{p:g}_before"] > 0)
+
+    for when, requests in (("before", requests_before), ("after", requests_after)):
+        diff[f"error_rate_{when}"] = joined[f"errors_{when}"] / requests.where(requests > 0)
+    diff["error_rate_delta"] = diff["error_rate_after"] - diff["error_rate_before"]
+    diff["statuses_before"] = [_format_statuses(before.statuses.get(endpoint, {})) for endpoint in joined.index]
+    diff["statuses_after"] = [_format_statuses(after.statuses.get(endpoint, {})) for endpoint in joined.index]
+    diff["status_changed"] = [
+        change == MATCHED and set(before.statuses.get(endpoint, {})) != set(after.statuses.get(endpoint, {}))
+        for endpoint, change in zip(joined.index, diff["change"])
+    ]
+
+    for side in SIZE_COLUMNS:
+        for when in ("before", "after"):
+            count = joined[f"{side}_count_{when}"]
+            diff[f"{side}_{when}"] = joined[f"{side}_sum_{when}"] / count.where(count > 0)
+        diff[f"{side}_delta"] = diff[f"{side}_after"] - diff[f"{side}_before"]
+
+    # Worst slowdowns first, then endpoints without a latency delta
+    top = f"p{max(percentiles):g}_delta"
+    if top in diff.columns:
+        diff = diff.sort_values(top, ascending=False, na_position="last", kind="stable")
+    diff.index.name = "endpoint"
+    return diff.reset_index()
+
+
+def diff_summary(before: EndpointProfile, after: EndpointProfile, diff: pd.DataFrame,
+                 percentiles: Sequence[float] = PERCENTILES) -> Dict[str, Optional[float]]:
+    """Return the headline numbers of a comparison: totals, overall percentiles and endpoint changes"""
+    summary: Dict[str, Optional[float]] = {
+        "requests_before": int(before.table["requests"].sum()),
+        "requests_after": int(after.table["requests"].sum()),
+        "new_endpoints": int((diff["change"] == NEW).sum()),
+        "missing_endpoints": int((diff["change"] == MISSING).sum()),
+        "status_changes": int(diff["status_changed"].sum()),
+    }
+    overall_before = before.latency.overall.percentiles(percentiles)
+    overall_after = after.latency.overall.percentiles(percentiles)
+    for p in percentiles:
+        summary[f"p{p:g}_before"] = overall_before[p]
+        summary[f"p{p:g}_after"] = overall_after[p]
+    return summary
+
+
+def regressions(diff: pd.DataFrame, percentile: float = max(PERCENTILES), min_change: float = 0.2,
+                min_requests: int = 1) -> pd.DataFrame:
+    """Return matched endpoints whose percentile latency grew by at least `min_change` (0.2 = 20%)"""
+    column = f"p{percentile:g}_change"
+    matched = diff[(diff["change"] == MATCHED)
+                   & (diff["requests_before"] >= min_requests) & (diff["requests_after"] >= min_requests)]
+    if column not in matched.columns:
+        return matched.iloc[0:0]
+    return matched[matched[column] >= min_change]
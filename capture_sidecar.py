@@ -0,0 +1,135 @@
+"""
+Columnar Parquet sidecars for parsed Charles capture files.
+
+The first time a capture is opened its entries DataFrame is written next to
+the JSON file as a Parquet file. The dashboard's frames index their bodies,
+so the sidecar holds only the small metadata columns (host, status, method,
+duration, ...) and the byte spans of the bodies. Later opens read the
+sidecar instead of re-parsing the JSON. A sidecar records the mtime and size
+of the JSON it was built from and is ignored once they change.
+
+pyarrow is optional - without it sidecars are simply never written or read.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+META_SUFFIX = ".meta.parquet"
+
+# Bumped whenever the sidecar layout or the columns built by
+# finalize_entries_frame change, so older sidecars are rebuilt
+SIDECAR_VERSION = 3
+
+# Keys stored in the Parquet schema metadata
+_VERSION_KEY = b"charles.sidecar_version"
+_SOURCE_MTIME_KEY = b"charles.source_mtime_ns"
+_SOURCE_SIZE_KEY = b"charles.source_size"
+_HEADER_KEY = b"charles.header"
+_JSON_COLUMNS_KEY = b"charles.json_columns"
+
+
+def sidecars_enabled() -> bool:
+    """Check whether sidecars can be used (pyarrow installed and not disabled)"""
+    return HAS_PYARROW and os.environ.get("CHARLES_SIDECAR", "1") != "0"
+
+
+def sidecar_path(json_path: str) -> str:
+    """Return the sidecar path for a capture file"""
+    # Other formats keep their extension so x.chlsj and x.json get separate sidecars
+    base = json_path[:-len(".json")] if json_path.lower().endswith(".json") else json_path
+    return base + META_SUFFIX
+
+
+def _source_matches(metadata: Dict[bytes, bytes], json_path: str) -> bool:
+    """Check that sidecar metadata was written for the current version of the file"""
+    try:
+        stat = os.stat(json_path)
+    except OSError:
+        return False
+    return (
+        metadata.get(_VERSION_KEY) == str(SIDECAR_VERSION).encode()
+        and metadata.get(_SOURCE_MTIME_KEY) == str(stat.st_mtime_ns).encode()
+        and metadata.get(_SOURCE_SIZE_KEY) == str(stat.st_size).encode()
+    )
+
+
+def _to_table(df: pd.DataFrame, metadata: Dict[bytes, bytes]) -> "pa.Table":
+    """Convert a DataFrame to an Arrow table, JSON-encoding columns Arrow cannot type"""
+    df = df.copy()
+    json_columns = []
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed types or nested values - store as JSON text instead
+            df[col] = df[col].map(lambda v: None if v is None else json.dumps(v, default=str))
+            json_columns.append(col)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(metadata)
+    metadata[_JSON_COLUMNS_KEY] = json.dumps(json_columns).encode()
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+
+def _from_table(table: "pa.Table") -> pd.DataFrame:
+    """Convert an Arrow table back to a DataFrame, decoding JSON-encoded columns"""
+    df = table.to_pandas()
+    metadata = table.schema.metadata or {}
+    for col in json.loads(metadata.get(_JSON_COLUMNS_KEY, b"[]")):
+        if col in df.columns:
+            df[col] = df[col].map(lambda v: None if v is None else json.loads(v))
+    return df
+
+
+def write_sidecar(json_path: str, header: Dict[str, Any], df: pd.DataFrame) -> bool:
+    """Write the sidecar of a capture, returning True on success"""
+    if not sidecars_enabled() or df.empty:
+        return False
+
+    try:
+        stat = os.stat(json_path)
+        metadata = {
+            _VERSION_KEY: str(SIDECAR_VERSION).encode(),
+            _SOURCE_MTIME_KEY: str(stat.st_mtime_ns).encode(),
+            _SOURCE_SIZE_KEY: str(stat.st_size).encode(),
+            _HEADER_KEY: json.dumps(header, default=str).encode(),
+        }
+        path = sidecar_path(json_path)
+
+        # Write to a temporary file first so readers never see a partial sidecar
+        tmp_path = path + ".tmp"
+        pq.write_table(_to_table(df, metadata), tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, pa.ArrowException, TypeError, ValueError):
+        # Read-only directory or unconvertible data - fall back to JSON next time
+        return False
+
+
+def read_sidecar(json_path: str,
+                 columns: Optional[List[str]] = None) -> Optional[Tuple[Dict[str, Any], pd.DataFrame]]:
+    """Read (header, DataFrame) from a fresh sidecar, or None if it is missing or stale"""
+    if not sidecars_enabled():
+        return None
+
+    try:
+        table = pq.read_table(sidecar_path(json_path), columns=columns)
+        metadata = table.schema.metadata or {}
+        if not _source_matches(metadata, json_path):
+            return None
+        header = json.loads(metadata.get(_HEADER_KEY, b"{}"))
+        return header, _from_table(table)
+    except (OSError, pa.ArrowException, ValueError):
+        return None
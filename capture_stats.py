@@ -0,0 +1,190 @@
+"""
+Summary statistics of a capture, computed over columnar arrays.
+
+Status, host and method counts and duration statistics (min, max, mean,
+total and percentiles) come from one vectorized pass per column instead of
+per-entry Python updates. `stats_from_entries` serves the HTML report, which
+holds parsed entry dicts; `stats_from_frame` serves the Streamlit dashboard,
+whose latency percentiles also come from the statistics' sketches.
+`merge_stats` combines the statistics of several captures without their
+entries.
+
+Only numpy is required, so the HTML report keeps its small dependency set.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from latency_sketch import LatencySketches
+
+# Label of entries without a status, host or method
+UNKNOWN = "Unknown"
+
+
+class CaptureStats:
+    """Counts and duration statistics of a capture"""
+
+    def __init__(self, total: int, status_counts: Dict[str, int], host_counts: Dict[str, int],
+                 method_counts: Dict[str, int], durations: np.ndarray, latency: LatencySketches):
+        self.total = total
+        # Label -> count, most frequent first
+        self.status_counts = status_counts
+        self.host_counts = host_counts
+        self.method_counts = method_counts
+        self.duration_count = len(durations)
+        self.duration_min = float(durations.min()) if len(durations) else None
+        self.duration_max = float(durations.max()) if len(durations) else None
+        self.duration_sum = float(durations.sum()) if len(durations) else 0.0
+        self.duration_mean = self.duration_sum / len(durations) if len(durations) else None
+        # Duration sketches overall and per host (and per endpoint from a DataFrame)
+        self.latency = latency
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the statistics"""
+        labels = len(self.status_counts) + len(self.host_counts) + len(self.method_counts)
+        return 100 * labels + self.latency.nbytes
+
+    def error_rate(self) -> Optional[float]:
+        """Share of entries with a 4xx or 5xx status"""
+        known = sum(count for status, count in self.status_counts.items() if status.isdigit())
+        errors = sum(count for status, count in self.status_counts.items()
+                     if status.isdigit() and 400 <= int(status) < 600)
+        return errors / known if known else None
+
+
+def _factorize(values: Sequence[Any]) -> Tuple[np.ndarray, List[str]]:
+    """Return (codes, labels) of raw values, labelled as strings with None as UNKNOWN"""
+    if isinstance(values, tuple) and len(values) == 2 and isinstance(values[0], np.ndarray):
+        # Already factorized
+        return values
+    try:
+        # Distinct values and their codes, both found by C-level dict operations
+        index = {value: code for code, value in enumerate(dict.fromkeys(values))}
+        lookup = values
+    except TypeError:
+        # Unhashable values - fall back to their text
+        lookup = [str(value) for value in values]
+        index = {value: code for code, value in enumerate(dict.fromkeys(lookup))}
+    codes = np.fromiter(map(index.__getitem__, lookup), dtype=np.int64, count=len(lookup))
+    return codes, [UNKNOWN if value is None else str(value) for value in index]
+
+
+def _counts(codes: np.ndarray, labels: Sequence[str]) -> Dict[str, int]:
+    """Count coded labels, most frequent first"""
+    counts: Dict[str, int] = {}
+    for code, count in enumerate(np.bincount(codes[codes >= 0], minlength=len(labels)).tolist()):
+        if count:
+            # Distinct raw values may share a label (200 and "200")
+            counts[labels[code]] = counts.get(labels[code], 0) + count
+    unknown = int((codes < 0).sum())
+    if unknown:
+        counts[UNKNOWN] = counts.get(UNKNOWN, 0) + unknown
+    return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+
+def _floats(values: Sequence[Any]) -> np.ndarray:
+    """Convert raw durations to floats, with NaN for missing or non-numeric values"""
+    try:
+        return np.asarray(values, dtype="float64")
+    except (TypeError, ValueError):
+        converted = []
+        for value in values:
+            try:
+                converted.append(float(value))
+            except (TypeError, ValueError):
+                converted.append(np.nan)
+        return np.asarray(converted, dtype="float64")
+
+
+def compute_stats(status: Sequence[Any], host: Sequence[Any], method: Sequence[Any],
+                  duration: Sequence[Any], latency: Optional[LatencySketches] = None) -> CaptureStats:
+    """Compute capture statistics from parallel per-entry columns
+
+    Each column is either raw values (None where missing) or already
+    factorized as (codes, labels) with code -1 where missing. Overall and
+    per-host latency sketches are built unless `latency` is given.
+    """
+    host_codes, host_labels = _factorize(host)
+    durations = _floats(duration)
+
+    if latency is None:
+        # Per-host sketches skip unknown hosts
+        sketch_codes = host_codes.copy()
+        for code, label in enumerate(host_labels):
+            if label == UNKNOWN:
+                sketch_codes[sketch_codes == code] = -1
+        latency = LatencySketches()
+        latency.add_arrays(durations, (sketch_codes, host_labels))
+
+    return CaptureStats(
+        total=len(host_codes),
+        status_counts=_counts(*_factorize(status)),
+        host_counts=_counts(host_codes, host_labels),
+        method_counts=_counts(*_factorize(method)),
+        durations=durations[~np.isnan(durations)],
+        latency=latency,
+    )
+
+
+def stats_from_entries(entries: Iterable[Dict[str, Any]]) -> CaptureStats:
+    """Compute capture statistics from a list of entry dicts"""
+    entries = [entry for entry in entries if isinstance(entry, dict)]
+    columns: Dict[str, List[Any]] = {}
+    for field in ("status", "host", "method", "duration"):
+        columns[field] = [entry.get(field) for entry in entries]
+    return compute_stats(**columns)
+
+
+def stats_from_frame(df) -> CaptureStats:
+    """Compute capture statistics from an entries DataFrame, with host and endpoint latency sketches"""
+    def factorized(col: str) -> Tuple[np.ndarray, List[str]]:
+        if col not in df.columns:
+            return np.full(len(df), -1, dtype=np.int64), []
+        series = df[col]
+        if hasattr(series, "cat"):
+            return series.cat.codes.to_numpy().astype(np.int64), [str(c) for c in series.cat.categories]
+        codes, uniques = series.factorize()
+        return codes.astype(np.int64), [str(u) for u in uniques]
+
+    durations = df["duration_ms"] if "duration_ms" in df.columns else df.get("duration")
+    return compute_stats(
+        status=factorized("status"),
+        host=factorized("host"),
+        method=factorized("method"),
+        duration=np.full(len(df), np.nan) if durations is None
+        else durations.to_numpy(dtype="float64", na_value=np.nan),
+        latency=LatencySketches.build(df),
+    )
+
+
+def _merge_counts(counts: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    """Sum label counts, most frequent first"""
+    merged: Dict[str, int] = {}
+    for part in counts:
+        for label, count in part.items():
+            merged[label] = merged.get(label, 0) + count
+    return dict(sorted(merged.items(), key=lambda item: item[1], reverse=True))
+
+
+def merge_stats(stats: Sequence[CaptureStats]) -> CaptureStats:
+    """Combine the statistics of several captures"""
+    if len(stats) == 1:
+        return stats[0]
+    merged = CaptureStats(
+        total=sum(part.total for part in stats),
+        status_counts=_merge_counts(part.status_counts for part in stats),
+        host_counts=_merge_counts(part.host_counts for part in stats),
+        method_counts=_merge_counts(part.method_counts for part in stats),
+        durations=np.empty(0),
+        latency=LatencySketches.merged(part.latency for part in stats),
+    )
+    timed = [part for part in stats if part.duration_count]
+    if timed:
+        merged.duration_count = sum(part.duration_count for part in timed)
+        merged.duration_min = min(part.duration_min for part in timed)
+        merged.duration_max = max(part.duration_max for part in timed)
+        merged.duration_sum = sum(part.duration_sum for part in timed)
+        merged.duration_mean = merged.duration_sum / merged.duration_count
+    return merged
@@ -0,0 +1,381 @@
+"""
+Incremental reader for parsed Charles capture files.
+
+Walks the `entries` / `data` array (or a top-level list) of a capture and
+decodes one entry at a time from a bounded read buffer, so the whole JSON
+document is never held in memory. The remaining top-level fields (summary
+statistics and the like) are collected into a small header dict.
+
+The buffer is decoded as latin-1 so that string positions equal byte
+positions in the file. Entries that contain non-ASCII bytes are decoded a
+second time from their UTF-8 bytes to get the correct text.
+
+With `index_bodies` the request/response bodies are not kept at all.
+Instead each entry records the byte offset and length of its body values,
+and `read_bodies` later decodes them straight from a memory map.
+
+Native session files (Charles .chlsj, HAR archives) are read the same way:
+each item is mapped onto the parser's entry model by the module registered
+for its file extension in SOURCE_FORMATS, and body spans point into the
+nested values. A module whose entries are nested inside the document names
+the keys leading to them in ENTRY_PATH (HAR: log -> entries).
+
+Compressed captures (`x.json.gz`, `x.chlsj.xz`, ...) are decompressed on a
+background thread while they are parsed; their body spans are offsets into
+the decompressed bytes and are read back by decompressing again.
+"""
+
+import base64
+import binascii
+import json
+import mmap
+import os
+import re
+from json.decoder import scanstring
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import charles_session
+import har_log
+import json_backend
+from capture_compression import compression_suffix, open_capture, read_spans, strip_compression
+
+# Native capture formats mapped onto the entry model, by file extension
+SOURCE_FORMATS: Dict[str, ModuleType] = {
+    ".chlsj": charles_session,
+    ".har": har_log,
+}
+
+# File extensions of capture files in an output directory, optionally followed by a compression extension
+CAPTURE_EXTENSIONS = (".json",) + tuple(SOURCE_FORMATS)
+
+# Top-level keys that may hold the list of entries, in order of preference
+ENTRY_KEYS = ("entries", "data")
+
+# Fields that hold request/response payloads
+BODY_FIELDS = ("request_body", "response_body")
+
+# Bytes read from the file per refill
+READ_SIZE = 4 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = re.compile(r"[0-9.eE+\-]*")
+_decoder = json.JSONDecoder()
+
+
+def is_capture_name(name: str) -> bool:
+    """Whether a file name in an output directory is a capture (hidden files never are)"""
+    return strip_compression(name).lower().endswith(CAPTURE_EXTENSIONS) and not name.startswith(".")
+
+
+def source_format(file_path: str) -> Optional[ModuleType]:
+    """Return the module mapping a native capture format onto entries (None for parser JSON)"""
+    return SOURCE_FORMATS.get(os.path.splitext(strip_compression(file_path))[1].lower())
+
+
+def load_document(file_path: str) -> Any:
+    """Load a whole capture: parser JSON as is, native formats as {"entries": [...]} plus their header"""
+    if source_format(file_path) is None:
+        if compression_suffix(file_path) is None:
+            return json_backend.load_file(file_path)
+        with open_capture(file_path) as f:
+            return json_backend.loads(f.read())
+    stream = CaptureStream(file_path)
+    entries = list(stream)
+    return dict(stream.header, entries=entries)
+
+
+def body_span_columns(field: str) -> Tuple[str, str]:
+    """Return the (offset, length) column names recorded for an indexed body field"""
+    return field + "_offset", field + "_length"
+
+
+def read_bodies(file_path: str, spans: Iterable[Tuple[int, int]]) -> List[Any]:
+    """Decode several body values from their (offset, length) spans in one pass over the file"""
+    return [None if raw is None else json_backend.loads(raw) for raw in read_raw_bodies(file_path, spans)]
+
+
+def decode_base64_body(value: Any) -> Any:
+    """Decode a base64-encoded body to text (a size note for binary content)"""
+    if not isinstance(value, str):
+        return value
+    try:
+        data = base64.b64decode(value)
+    except (binascii.Error, ValueError):
+        return value
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return f"<{len(data):,} bytes of binary data>"
+
+
+def read_raw_bodies(file_path: str, spans: Iterable[Tuple[int, int]]) -> List[Optional[bytes]]:
+    """Return the undecoded JSON bytes of several body values (None where not indexed)"""
+    spans = list(spans)
+    if all(offset < 0 for offset, _ in spans):
+        return [None] * len(spans)
+    if compression_suffix(file_path) is not None:
+        return read_spans(file_path, spans)
+    bodies = []
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset, length in spans:
+                if offset < 0:
+                    bodies.append(None)
+                    continue
+                if offset + length > len(mm):
+                    raise ValueError("Body offset is beyond the end of the file - it has changed since loading")
+                bodies.append(mm[offset:offset + length])
+    return bodies
+
+
+def _find_path_span(raw: str, path: Tuple[str, ...], expected: Any) -> Optional[Tuple[int, int]]:
+    """Find the span of a nested value, given its key path and the entry it belongs to"""
+    start = 0
+    for key in path[:-1]:
+        expected = expected[key]
+        # The first occurrence of a parent key never lies past the real one
+        pos = raw.find(f'"{key}"', start)
+        if pos != -1:
+            start = pos
+    # Any later occurrence of the innermost key holding the same value is as good as the real one
+    return _find_field_span(raw, path[-1], expected[path[-1]], start)
+
+
+def _find_field_span(raw: str, field: str, expected: Any, start: int = 0) -> Optional[Tuple[int, int]]:
+    """Find the span of a field's value inside the raw text of an entry, searching from `start`"""
+    needle = f'"{field}"'
+    # The same key may also appear nested deeper - only then compare decoded values
+    unique = raw.count(needle, start) == 1
+    pos = raw.find(needle, start)
+    while pos != -1:
+        i = _WHITESPACE.match(raw, pos + len(needle)).end()
+        if raw.startswith(":", i):
+            i = _WHITESPACE.match(raw, i + 1).end()
+            if not unique and isinstance(expected, str) and not raw.startswith('"', i):
+                # Cannot hold the expected text - skip without decoding
+                pos = raw.find(needle, pos + 1)
+                continue
+            try:
+                if raw.startswith('"', i):
+                    value, end = scanstring(raw, i + 1)
+                else:
+                    value, end = _decoder.raw_decode(raw, i)
+                if unique or value == expected:
+                    return i, end
+            except json.JSONDecodeError:
+                pass
+        pos = raw.find(needle, pos + 1)
+    return None
+
+
+class CaptureStream:
+    """Iterate over the entries of a capture file without loading the whole document
+
+    After iteration, `header` holds the top-level fields other than the entries
+    list and `format` is one of "entries", "data", "list" or "summary", or the
+    FORMAT of a native source module.
+    """
+
+    def __init__(self, file_path: str, max_body_bytes: Optional[int] = None,
+                 index_bodies: bool = False, read_size: int = READ_SIZE):
+        self.file_path = file_path
+        # Mapping of a native capture format, None for parser JSON
+        self.source = source_format(file_path)
+        self.max_body_bytes = max_body_bytes
+        self.index_bodies = index_bodies
+        self.read_size = read_size
+        self.header: Dict[str, Any] = {}
+        self.format: Optional[str] = None
+        self.entry_count = 0
+        self.dropped_bodies = 0
+        # Bytes parsed, after decompression
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open_capture(self.file_path) as f:
+            self._file = f
+            self._text = ""
+            self._pos = 0
+            self._base = 0
+            self._eof = False
+            try:
+                yield from self._read_document()
+            finally:
+                self._file = None
+                self._text = ""
+
+    # Buffer handling
+
+    def _fill(self) -> bool:
+        """Append more of the file to the buffer, returning False at end of file"""
+        if self._eof:
+            return False
+        # Drop the consumed prefix so the buffer only holds unread data
+        if self._pos:
+            self._text = self._text[self._pos:]
+            self._base += self._pos
+            self._pos = 0
+        # Read at least as much as is already buffered so huge values need few retries
+        chunk = self._file.read(max(self.read_size, len(self._text)))
+        if not chunk:
+            self._eof = True
+            return False
+        self.bytes_read += len(chunk)
+        self._text += chunk.decode("latin-1")
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of file)"""
+        while True:
+            self._pos = _WHITESPACE.match(self._text, self._pos).end()
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        """Consume one of the given structural characters"""
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at byte {self._base + self._pos}, found {char!r}")
+        self._pos += 1
+        return char
+
+    def _decode_value(self) -> Any:
+        """Decode the JSON value at the current position, refilling the buffer as needed"""
+        return self._decode_span()[0]
+
+    def _decode_span(self) -> Tuple[Any, Any, int, str]:
+        """Decode the next value, returning (value, latin-1 value, file offset, raw text)"""
+        self._peek()
+        while True:
+            start = self._pos
+            try:
+                value, end = _decoder.raw_decode(self._text, start)
+            except json.JSONDecodeError as e:
+                # Positions in the error are relative to the buffer, which a refill shifts
+                offset = self._base + e.pos
+                # Value may be cut off by the end of the buffer
+                if self._fill():
+                    continue
+                raise ValueError(f"{e.msg} at byte {offset}") from e
+            if isinstance(value, (int, float)) and \
+               _NUMBER_CHARS.match(self._text, end).end() == len(self._text) and self._fill():
+                # A number running up to the end of the buffer may continue past it
+                continue
+            raw = self._text[start:end]
+            latin_value = value
+            if not raw.isascii():
+                # Non-ASCII bytes were decoded as latin-1 - decode the real UTF-8 text
+                value = json.loads(raw.encode("latin-1").decode("utf-8"))
+            self._pos = end
+            return value, latin_value, self._base + start, raw
+
+    # Document structure
+
+    def _read_document(self) -> Iterator[Dict[str, Any]]:
+        first = self._peek()
+        if first == "[":
+            self.format = "list" if self.source is None else self.source.FORMAT
+            yield from self._read_entries()
+            return
+        if first != "{":
+            raise ValueError("Capture file must contain a JSON object or list")
+
+        # Native formats name the path to their entries; parser JSON keeps them at the top
+        entry_path = None if self.source is None else self.source.ENTRY_PATH
+        yield from self._read_object(entry_path)
+
+        if self.format is None and "total_entries" in self.header:
+            self.format = "summary"
+
+    def _read_object(self, entry_path: Optional[Tuple[str, ...]]) -> Iterator[Dict[str, Any]]:
+        """Read an object into the header, streaming the entries list found along `entry_path`"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key, _, offset, _ = self._decode_span()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key at byte {offset}")
+            self._expect(":")
+            if self.format is not None:
+                self.header[key] = self._decode_value()
+            elif entry_path is None and key in ENTRY_KEYS and self._peek() == "[":
+                self.format = key
+                yield from self._read_entries()
+            elif entry_path and key == entry_path[0] and len(entry_path) == 1 and self._peek() == "[":
+                self.format = self.source.FORMAT
+                yield from self._read_entries()
+            elif entry_path and key == entry_path[0] and self._peek() == "{":
+                # Fields of the enclosing objects (HAR version, creator, pages) join the header
+                yield from self._read_object(entry_path[1:])
+            else:
+                self.header[key] = self._decode_value()
+            if self._expect(",}") == "}":
+                break
+
+    def _read_entries(self) -> Iterator[Dict[str, Any]]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            entry, latin_entry, offset, raw = self._decode_span()
+            if isinstance(entry, dict):
+                if self.source is not None:
+                    entry = self._map_source_entry(entry, latin_entry, offset, raw)
+                elif self.index_bodies:
+                    self._index_entry_bodies(entry, latin_entry, offset, raw)
+                elif self.max_body_bytes is not None:
+                    self._drop_large_bodies(entry)
+                self.entry_count += 1
+                yield entry
+            if self._expect(",]") == "]":
+                return
+
+    def _map_source_entry(self, item: Dict[str, Any], latin_item: Dict[str, Any],
+                          offset: int, raw: str) -> Dict[str, Any]:
+        """Map an item of a native capture onto the entry model, indexing or limiting its bodies"""
+        entry = self.source.map_entry(item)
+        if self.index_bodies:
+            for field in BODY_FIELDS:
+                entry.pop(field, None)
+                body_offset, body_length = -1, 0
+                path = self.source.body_path(latin_item, field)
+                if path is not None:
+                    span = _find_path_span(raw, path, latin_item)
+                    if span is not None:
+                        body_offset, body_length = offset + span[0], span[1] - span[0]
+                offset_col, length_col = body_span_columns(field)
+                entry[offset_col] = body_offset
+                entry[length_col] = body_length
+        elif self.max_body_bytes is not None:
+            self._drop_large_bodies(entry)
+        return entry
+
+    def _drop_large_bodies(self, entry: Dict[str, Any]) -> None:
+        """Replace bodies above the size limit with None (bounded-memory mode)"""
+        for field in BODY_FIELDS:
+            body = entry.get(field)
+            if isinstance(body, str) and len(body) > self.max_body_bytes:
+                entry[field] = None
+                entry[field + "_dropped"] = True
+                self.dropped_bodies += 1
+
+    def _index_entry_bodies(self, entry: Dict[str, Any], latin_entry: Dict[str, Any],
+                            offset: int, raw: str) -> None:
+        """Replace body values with their byte offset and length in the file"""
+        for field in BODY_FIELDS:
+            body = latin_entry.get(field)
+            entry.pop(field, None)
+            body_offset, body_length = -1, 0
+            if body is not None:
+                span = _find_field_span(raw, field, body)
+                if span is not None:
+                    body_offset, body_length = offset + span[0], span[1] - span[0]
+            offset_col, length_col = body_span_columns(field)
+            entry[offset_col] = body_offset
+            entry[length_col] = body_length
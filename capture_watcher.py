@@ -0,0 +1,250 @@
+"""
+Background pre-ingestion of new captures.
+
+A watcher follows an output directory and hands every capture that is
+created or rewritten there to a small pool of worker threads, which build
+its caches before anyone opens it. Pending captures wait in a priority
+queue ordered by modification time, so the newest file is always
+processed next, and a capture queued twice is only processed once.
+
+On Linux the directory is watched with inotify (through libc, no extra
+package), which reports a file once it has been closed after writing or
+renamed into place. Elsewhere, or when inotify is unavailable, the
+directory is polled, and a file is queued once its size and mtime have
+stayed the same for a whole poll interval so half-written captures are not
+parsed. Captures already present when the watcher starts are left alone.
+
+Workers are threads so that what they build lands in the in-process
+capture cache shared by the dashboard sessions.
+"""
+
+import ctypes
+import ctypes.util
+import heapq
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from capture_stream import is_capture_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+
+# Seconds between directory listings when polling
+POLL_INTERVAL = 2.0
+
+# inotify event masks (linux/inotify.h)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+# struct inotify_event: wd, mask, cookie, len, then the name
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal inotify watch of one directory through libc (Linux only)"""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        # AttributeError where libc has no inotify
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"Cannot watch {directory}")
+        self.fd = fd
+
+    def read(self, timeout: float) -> List[str]:
+        """Return the names of files written or moved in, waiting at most `timeout` seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class CaptureWatcher:
+    """Watch a directory and process new or changed captures in worker threads, newest first"""
+
+    def __init__(self, directory: str, handler: Callable[[str], None], workers: int = DEFAULT_WORKERS,
+                 poll_interval: float = POLL_INTERVAL, use_inotify: bool = True):
+        self.directory = os.path.abspath(directory)
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        # "inotify" or "polling" once started
+        self.mode: Optional[str] = None
+        self.processed = 0
+        self.failed = 0
+        # Heap of (-mtime_ns, sequence, path) and the paths in it
+        self._queue: List[Tuple[int, int, str]] = []
+        self._queued: Set[str] = set()
+        self._sequence = 0
+        self._active = 0
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "CaptureWatcher":
+        """Start watching and the worker threads"""
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(self.directory)
+            except (OSError, AttributeError) as e:
+                logger.info("inotify unavailable for %s (%s), polling instead", self.directory, e)
+        self.mode = "polling" if inotify is None else "inotify"
+        watch = self._poll if inotify is None else (lambda: self._follow(inotify))
+        self._threads = [threading.Thread(target=watch, name="capture-watcher", daemon=True)]
+        self._threads += [threading.Thread(target=self._work, name=f"capture-worker-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop watching; captures being processed are finished, pending ones dropped"""
+        self._stopping.set()
+        with self._condition:
+            self._queue.clear()
+            self._queued.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, file_path: str) -> bool:
+        """Queue a capture for processing, returning False if it is already queued or gone"""
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return False
+        with self._condition:
+            if file_path in self._queued or self._stopping.is_set():
+                return False
+            self._sequence += 1
+            heapq.heappush(self._queue, (-mtime_ns, self._sequence, file_path))
+            self._queued.add(file_path)
+            self._condition.notify()
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Captures queued or being processed"""
+        with self._condition:
+            return len(self._queue) + self._active
+
+    # Watching
+
+    def _follow(self, inotify: _Inotify) -> None:
+        """Queue captures reported by inotify"""
+        try:
+            while not self._stopping.is_set():
+                for name in inotify.read(self.poll_interval):
+                    if is_capture_name(name):
+                        self.submit(os.path.join(self.directory, name))
+        except OSError as e:
+            logger.warning("Watching %s failed: %s", self.directory, e)
+        finally:
+            inotify.close()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Return the (size, mtime) of every capture in the directory"""
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if is_capture_name(entry.name):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+        return snapshot
+
+    def _poll(self) -> None:
+        """Queue captures that changed and then stayed unchanged for a poll interval"""
+        previous = self._snapshot()
+        settled = dict(previous)
+        while not self._stopping.wait(self.poll_interval):
+            current = self._snapshot()
+            for name, signature in current.items():
+                if signature == previous.get(name) and signature != settled.get(name):
+                    settled[name] = signature
+                    self.submit(os.path.join(self.directory, name))
+            previous = current
+
+    # Processing
+
+    def _work(self) -> None:
+        """Process queued captures, newest first, until stopped"""
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping.is_set():
+                    self._condition.wait()
+                if self._stopping.is_set():
+                    return
+                _, _, file_path = heapq.heappop(self._queue)
+                self._queued.discard(file_path)
+                self._active += 1
+            try:
+                self.handler(file_path)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Pre-ingesting %s failed", file_path)
+            finally:
+                with self._condition:
+                    self._active -= 1
+
+
+_watcher: Optional[CaptureWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def ensure_watcher(directory: str, handler: Callable[[str], None],
+                   workers: int = DEFAULT_WORKERS) -> CaptureWatcher:
+    """Return the process-wide watcher, moving it to `directory` if it watches another one"""
+    global _watcher
+    directory = os.path.abspath(directory)
+    with _watcher_lock:
+        if _watcher is not None and _watcher.directory != directory:
+            _watcher.stop(timeout=0)
+            _watcher = None
+        if _watcher is None:
+            _watcher = CaptureWatcher(directory, handler, workers=workers).start()
+        return _watcher
+
+
+def stop_watcher() -> None:
+    """Stop the process-wide watcher, if any"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.stop(timeout=0)
+            _watcher = None
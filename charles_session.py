@@ -0,0 +1,109 @@
+"""
+Charles session files (.chlsj) mapped onto the dashboard's entry model.
+
+A .chlsj file is a JSON list of Charles transactions. Each one is mapped
+to the flat entry the log parser would have written - method, host, path,
+url, status, duration and start time - plus the Charles timing breakdown,
+request/response body sizes, headers and the bodies themselves.
+CaptureStream does the reading, so a session is ingested in one streaming
+pass without an intermediate JSON file.
+
+Timing columns use the HAR phase names (timing_dns, timing_connect,
+timing_ssl, timing_send, timing_wait, timing_receive) so captures from
+different sources line up. Binary bodies, which Charles stores base64
+encoded, are kept encoded and flagged with a `<field>_base64` column;
+they are decoded only when displayed.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from har_log import format_headers
+
+FORMAT = "chlsj"
+
+# Transactions form the top-level list
+ENTRY_PATH = ()
+
+# Charles duration breakdown -> entry timing column
+TIMING_FIELDS = (
+    ("dns", "timing_dns"),
+    ("connect", "timing_connect"),
+    ("ssl", "timing_ssl"),
+    ("request", "timing_send"),
+    ("latency", "timing_wait"),
+    ("response", "timing_receive"),
+)
+
+# Body field -> transaction key holding that side of the exchange
+_SIDES = {"request_body": "request", "response_body": "response"}
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _ms(value: Any) -> Optional[float]:
+    """Return a Charles duration in ms, or None where it is unknown (missing or negative)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+        return value
+    return None
+
+
+def _url(transaction: Dict[str, Any]) -> str:
+    """Rebuild the request URL of a transaction"""
+    scheme = transaction.get("scheme") or "http"
+    host = transaction.get("host") or ""
+    port = transaction.get("actualPort") or transaction.get("port")
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    url = f"{scheme}://{host}{transaction.get('path') or ''}"
+    query = transaction.get("query")
+    return f"{url}?{query}" if query else url
+
+
+def body_path(transaction: Dict[str, Any], field: str) -> Optional[Tuple[str, ...]]:
+    """Return the key path of a body value inside a transaction (None without a body)"""
+    side = _SIDES[field]
+    body = (transaction.get(side) or {}).get("body")
+    if not isinstance(body, dict):
+        return None
+    for key in ("text", "encoded"):
+        if body.get(key) is not None:
+            return (side, "body", key)
+    return None
+
+
+def map_entry(transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one Charles transaction to a flat entry"""
+    request = transaction.get("request") or {}
+    response = transaction.get("response") or {}
+    times = transaction.get("times") or {}
+    durations = transaction.get("durations") or {}
+
+    entry: Dict[str, Any] = {
+        "method": transaction.get("method"),
+        "host": transaction.get("host"),
+        "path": transaction.get("path"),
+        "url": _url(transaction),
+        "status": response.get("status"),
+        "duration": _ms(durations.get("total")),
+        "start_time": times.get("start"),
+        "protocol": transaction.get("protocolVersion"),
+        "content_type": response.get("mimeType"),
+        "request_size": (request.get("sizes") or {}).get("body"),
+        "response_size": (response.get("sizes") or {}).get("body"),
+        "total_size": transaction.get("totalSize"),
+        "error": transaction.get("errorMessage"),
+        "request_headers": format_headers((request.get("header") or {}).get("headers")),
+        "response_headers": format_headers((response.get("header") or {}).get("headers")),
+    }
+    for charles_field, column in TIMING_FIELDS:
+        entry[column] = _ms(durations.get(charles_field))
+
+    for field, side in _SIDES.items():
+        path = body_path(transaction, field)
+        if path is None:
+            entry[field] = None
+            continue
+        entry[field] = transaction[side]["body"][path[-1]]
+        if path[-1] == "encoded":
+            entry[field + "_base64"] = True
+    return entry
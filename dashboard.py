@@ -1,100 +1,279 @@
 #!/usr/bin/env python3
 import streamlit as st
 import pandas as pd
-import json
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+import multiprocessing
 import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from aggregates import AggregateCube
+from body_format import format_body, format_raw_bodies, get_format_memo, prettify_and_truncate, render_bodies_export
+from capture_cache import file_signature, get_capture_cache
+from capture_catalog import capture_record, complete_record, failed_record, get_catalog
+from capture_compression import strip_compression
+from capture_diff import MATCHED, MISSING, NEW, EndpointProfile, diff_profiles, diff_summary, regressions
+from capture_stats import UNKNOWN, CaptureStats, merge_stats, stats_from_frame
+from capture_sidecar import read_sidecar, write_sidecar
+from capture_stream import CaptureStream, load_document
+from capture_watcher import ensure_watcher, stop_watcher
+from entry_frame import (
+    body_span_column_names,
+    catalog_facts,
+    concat_entries_frames,
+    finalize_entries_frame,
+    frame_from_stream,
+    read_bodies_frame,
+    read_raw_body_column,
+    stream_entries_frame,
+    DURATION_LABELS,
+    STATUS_CLASS_BINS,
+    STATUS_CLASS_LABELS,
+    SOURCE_COLUMN,
+)
+from filter_index import FilterIndex
+from latency_sketch import PERCENTILES, LatencySketches
 
 def load_data(file_path: str) -> Dict:
     """Load JSON data from file"""
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        data = load_document(file_path)
         return data
     except Exception as e:
         st.error(f"Error loading file: {str(e)}")
         return {}
 
-def create_entries_dataframe(data: Dict) -> pd.DataFrame:
-    """Create a DataFrame from log entries"""
-    # Handle different data formats
-    entries = []
-    
-    if "entries" in data:
-        # Detailed or raw format
-        entries = data.get("entries", [])
-    elif "data" in data and isinstance(data["data"], list):
-        # Format with entries in a "data" field
-        entries = data.get("data", [])
-    elif isinstance(data, dict) and "total_entries" in data:
-        # Summary format - no entries to display
-        st.info("This is a summary file. It contains statistics but no detailed entries.")
-        return pd.DataFrame()
-    elif isinstance(data, list):
-        # Direct list of entries
-        entries = data
-    
-    if not entries:
-        return pd.DataFrame()
+def cached_capture(file_path: str) -> Optional[Tuple[Dict, pd.DataFrame]]:
+    """Return a capture from the cache or its sidecar while the file is unchanged, None if it must be parsed"""
+    cache = get_capture_cache()
+    cached = cache.get(file_path)
+    if cached is not None:
+        return cached
     
-    # Convert entries to DataFrame
-    df = pd.DataFrame(entries)
+    # Columnar sidecar written by an earlier open of the same file version
+    sidecar = read_sidecar(file_path)
+    if sidecar is not None:
+        cache.put(file_path, sidecar)
+    return sidecar
+
+def load_capture(file_path: str) -> Tuple[Optional[Dict], pd.DataFrame]:
+    """Load a capture's header and entries DataFrame, from cache or sidecar when the file is unchanged"""
+    cached = cached_capture(file_path)
+    if cached is not None:
+        return cached
     
-    # Ensure required columns exist
-    for col in ["host", "status", "duration"]:
+    try:
+        return build_capture(file_path)
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None, pd.DataFrame()
+
+def parse_capture(file_path: str) -> Tuple[Dict, pd.DataFrame]:
+    """Parse a capture into (header, entries DataFrame)"""
+    # Stream entries straight into the DataFrame without building the JSON tree.
+    # Bodies are only indexed by byte offset and read when a row is displayed.
+    return stream_entries_frame(file_path, index_bodies=True)
+
+def store_capture(file_path: str, header: Dict, df: pd.DataFrame) -> None:
+    """Write a parsed capture's sidecar and cache it"""
+    write_sidecar(file_path, header, df)
+    get_capture_cache().put(file_path, (header, df))
+
+def build_capture(file_path: str) -> Tuple[Dict, pd.DataFrame]:
+    """Parse a capture into (header, entries DataFrame), writing its sidecar and caching it"""
+    header, df = parse_capture(file_path)
+    store_capture(file_path, header, df)
+    return header, df
+
+def load_captures(paths: List[str]) -> List[Tuple[Optional[Dict], pd.DataFrame]]:
+    """Load several captures, parsing those not cached concurrently in worker processes"""
+    loaded = {path: cached_capture(path) for path in paths}
+    missing = [path for path, capture in loaded.items() if capture is None]
+    if len(missing) == 1:
+        loaded[missing[0]] = load_capture(missing[0])
+    elif missing:
+        progress = st.progress(0.0, text=f"Parsing {len(missing)} captures...")
+        # Workers are spawned rather than forked from the threaded server, and run the
+        # module-level parser that parse_capture wraps since they cannot import this script
+        with ProcessPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(stream_entries_frame, path, index_bodies=True): path for path in missing}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    header, df = future.result()
+                except Exception as e:
+                    st.error(f"Error loading {os.path.basename(path)}: {str(e)}")
+                    loaded[path] = (None, pd.DataFrame())
+                else:
+                    store_capture(path, header, df)
+                    loaded[path] = (header, df)
+                progress.progress(done / len(missing), text=f"Parsed {done} of {len(missing)} captures")
+        progress.empty()
+    return [loaded[path] for path in paths]
+
+def load_merged(paths: List[str], kind: str, build: Callable[[], Any]) -> Any:
+    """Return a structure derived from several captures, rebuilt only when the selection or a file changes"""
+    key = tuple(file_signature(path) for path in paths)
+    merged = st.session_state.setdefault("merged_captures", {})
+    if merged.get("key") != key:
+        merged.clear()
+        merged["key"] = key
+    if kind not in merged:
+        merged[kind] = build()
+    return merged[kind]
+
+# Data Explorer page sizes
+PAGE_SIZES = [25, 50, 100, 250, 500]
+DEFAULT_PAGE_SIZE = 50
+
+# Columns matched by the Data Explorer search box
+SEARCH_COLUMNS = ["host", "path", "url"]
+
+def search_entries(df: pd.DataFrame, query: str) -> pd.Series:
+    """Return a mask of rows whose host, path or URL contains the query (case-insensitive)"""
+    mask = pd.Series(False, index=df.index)
+    for col in SEARCH_COLUMNS:
         if col not in df.columns:
-            df[col] = None
+            continue
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Match the few distinct categories instead of every row
+            categories = series.cat.categories
+            matches = categories[categories.astype(str).str.contains(query, case=False, regex=False)]
+            mask |= series.isin(matches)
+        else:
+            mask |= series.astype(str).str.contains(query, case=False, regex=False, na=False)
+    return mask
+
+def load_derived(file_path: str, kind: str, build: Callable[[], Any]) -> Any:
+    """Return a structure derived from a capture, building it once per file version"""
+    cache = get_capture_cache()
+    value = cache.get(file_path, kind=kind)
+    if value is None:
+        value = build()
+        cache.put(file_path, value, kind=kind, nbytes=value.nbytes)
+    return value
+
+def load_cube(file_path: str, df: pd.DataFrame) -> AggregateCube:
+    """Return the aggregate cube of a capture"""
+    return load_derived(file_path, "cube", lambda: AggregateCube.build(df))
+
+def load_filter_index(file_path: str, df: pd.DataFrame) -> FilterIndex:
+    """Return the bitmap filter index of a capture"""
+    return load_derived(file_path, "filter_index", lambda: FilterIndex.build(df))
+
+def load_stats(file_path: str, df: pd.DataFrame) -> CaptureStats:
+    """Return the summary statistics of a capture, with its latency sketches"""
+    return load_derived(file_path, "stats", lambda: stats_from_frame(df))
+
+def load_endpoint_profile(file_path: str, df: pd.DataFrame) -> EndpointProfile:
+    """Return the per-endpoint profile of a capture, used to compare it with another"""
+    return load_derived(file_path, "endpoints", lambda: EndpointProfile.build(df))
+
+# Per-file loader of each aggregate and how those of several captures are combined
+AGGREGATES: Dict[str, Tuple[Callable[[str, pd.DataFrame], Any], Callable[[List[Any]], Any]]] = {
+    "stats": (load_stats, merge_stats),
+    "cube": (load_cube, AggregateCube.merge),
+    "filter_index": (load_filter_index, FilterIndex.concat),
+}
+
+def load_aggregate(kind: str, paths: List[str], frames: List[pd.DataFrame]) -> Any:
+    """Return an aggregate of the selected captures, merged from their per-file aggregates if there are several"""
+    load, merge = AGGREGATES[kind]
+    if len(paths) == 1:
+        return load(paths[0], frames[0])
+    return load_merged(paths, kind, lambda: merge([load(path, df) for path, df in zip(paths, frames)]))
+
+def parse_catalogued_capture(file_path: str) -> Tuple[Dict[str, Any], Optional[Tuple[Dict, pd.DataFrame]]]:
+    """Parse a capture and build its catalog record from the same pass; the capture is None if unreadable"""
+    record = capture_record(file_path)
+    stream = CaptureStream(file_path, index_bodies=True)
+    try:
+        header, df = frame_from_stream(stream)
+    except (ValueError, UnicodeDecodeError) as e:
+        return failed_record(record, e), None
+    return complete_record(record, stream, *catalog_facts(df)), (header, df)
+
+def prebuild_capture(file_path: str) -> None:
+    """Build a capture's catalog record, DataFrame and aggregates before it is first opened (watcher worker)"""
+    catalog = get_catalog(os.path.dirname(file_path))
+    cached = cached_capture(file_path)
+    if cached is not None:
+        _, df = cached
+        if not catalog.is_current(file_path):
+            catalog.update(file_path)
+    else:
+        # New or changed captures are read once, for both the catalog and the DataFrame
+        try:
+            record, capture = parse_catalogued_capture(file_path)
+        except OSError:
+            # Removed or unreadable - recorded as such
+            catalog.update(file_path)
+            return
+        catalog.update(file_path, record)
+        if capture is None:
+            return
+        header, df = capture
+        store_capture(file_path, header, df)
+    if df.empty:
+        return
+    load_stats(file_path, df)
+    load_cube(file_path, df)
+    load_filter_index(file_path, df)
+    load_endpoint_profile(file_path, df)
+
+def show_latency_percentiles(sketches: LatencySketches, filters: Dict[str, Any]) -> None:
+    """Show tail latencies from the sketches, overall or for the selected host"""
+    st.subheader("Latency Percentiles (ms)")
+    host = filters.get("host")
+    sketch = sketches.by_host.get(str(host)) if host is not None else sketches.overall
+    if sketch is None or not sketch.count:
+        st.warning("No duration data available")
+        return
     
-    # If duration is present, add duration categories
-    if "duration" in df.columns:
-        df["duration_ms"] = pd.to_numeric(df["duration"], errors="coerce")
-        # Create duration categories
-        bins = [0, 100, 500, 1000, 5000, float('inf')]
-        labels = ['<100ms', '100-500ms', '500ms-1s', '1s-5s', '>5s']
-        df["duration_category"] = pd.cut(df["duration_ms"], bins=bins, labels=labels)
+    cols = st.columns(len(PERCENTILES))
+    for col, (p, value) in zip(cols, sketch.percentiles().items()):
+        col.metric(f"p{p}", f"{value:,.0f}")
+    caption = f"{'Host ' + str(host) if host is not None else 'All hosts'}, within ±{sketch.relative_accuracy:.0%}."
+    if filters.get("status") is not None or filters.get("duration_category") is not None:
+        caption += " Status and duration filters do not apply to percentiles."
+    st.caption(caption)
     
-    return df
+    with st.expander("Percentiles by host and endpoint"):
+        for group, title in (("host", "By Host"), ("endpoint", "By Endpoint")):
+            st.write(f"**{title}**")
+            table = pd.DataFrame(list(sketches.table(group))).head(50)
+            st.dataframe(table.round(1), use_container_width=True, hide_index=True)
 
-def plot_status_codes(df: pd.DataFrame) -> None:
+def plot_status_codes(cube: AggregateCube) -> None:
     """Plot status code distribution"""
-    if df.empty or "status" not in df.columns:
+    if cube.empty:
         st.warning("No status code data available")
         return
     
-    # Filter out None/NaN values
-    filtered_df = df[df["status"].notna()]
-    if filtered_df.empty:
+    # Count status codes (entries without a status are skipped)
+    status_counts = cube.counts_by("status").reset_index()
+    if status_counts.empty:
         st.warning("No valid status codes found")
         return
-    
-    # Convert status to string if it's not already
-    filtered_df["status"] = filtered_df["status"].astype(str)
-    
-    # Count status codes
-    status_counts = filtered_df["status"].value_counts().reset_index()
     status_counts.columns = ["Status Code", "Count"]
+    status_counts = status_counts.sort_values("Count", ascending=False)
     
-    # Create color map
-    def get_status_color(status_str):
-        if pd.isna(status_str) or not status_str.isdigit():
-            return "gray"
-        status = int(status_str)
-        if 200 <= status < 300:
-            return "green"
-        elif 300 <= status < 400:
-            return "blue"
-        elif 400 <= status < 500:
-            return "orange"
-        elif 500 <= status < 600:
-            return "red"
-        else:
-            return "gray"
-    
-    status_counts["Color"] = status_counts["Status Code"].apply(get_status_color)
+    # Color by status class
+    class_colors = {"2xx": "green", "3xx": "blue", "4xx": "orange", "5xx": "red"}
+    status_class = pd.cut(
+        status_counts["Status Code"].astype("float64"),
+        bins=STATUS_CLASS_BINS,
+        labels=STATUS_CLASS_LABELS,
+        right=False
+    )
+    status_counts["Color"] = status_class.map(class_colors).astype(object).fillna("gray")
+    status_counts["Status Code"] = status_counts["Status Code"].astype(str)
     
     # Create bar chart
     fig = px.bar(
@@ -107,57 +286,61 @@ def plot_status_codes(df: pd.DataFrame) -> None:
     )
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_duration_distribution(df: pd.DataFrame) -> None:
+def plot_duration_distribution(cube: AggregateCube, filters: Dict[str, Any], scale: str = "linear") -> None:
     """Plot request duration distribution"""
-    if df.empty or "duration_ms" not in df.columns:
+    filtered_cube = cube.select(**filters)
+    if filtered_cube.empty:
         st.warning("No duration data available")
         return
     
-    # Filter out None/NaN values
-    filtered_df = df[df["duration_ms"].notna()]
-    if filtered_df.empty:
+    # Bins are summed from the per-cell histograms and cached per filter state;
+    # only edges and counts are sent to the browser
+    counts, edges = cube.filtered_histogram(filters, scale)
+    if counts.sum() == 0:
         st.warning("No valid duration data found")
         return
     
     # Plot histogram of durations
-    fig = px.histogram(
-        filtered_df, 
-        x="duration_ms",
-        nbins=50,
+    if scale == "log":
+        # Geometric bin centers are evenly spaced on a log axis
+        centers = np.sqrt(edges[:-1] * edges[1:])
+    else:
+        centers = (edges[:-1] + edges[1:]) / 2
+    fig = px.bar(
+        x=centers,
+        y=counts,
         title="Request Duration Distribution (ms)",
-        labels={"duration_ms": "Duration (ms)"}
+        labels={"x": "Duration (ms)", "y": "Count"},
+        log_x=scale == "log"
     )
-    fig.update_layout(showlegend=False)
+    if scale != "log":
+        fig.update_traces(width=edges[1] - edges[0])
+    fig.update_layout(showlegend=False, bargap=0)
     st.plotly_chart(fig, use_container_width=True)
     
     # Plot duration categories
-    if "duration_category" in filtered_df.columns:
-        cat_counts = filtered_df["duration_category"].value_counts().reset_index()
-        cat_counts.columns = ["Duration", "Count"]
-        cat_counts = cat_counts.sort_values("Duration")
-        
-        fig = px.bar(
-            cat_counts,
-            x="Duration",
-            y="Count",
-            title="Request Duration Categories"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    cat_counts = filtered_cube.counts_by("duration_category").reindex(DURATION_LABELS, fill_value=0).reset_index()
+    cat_counts.columns = ["Duration", "Count"]
+    
+    fig = px.bar(
+        cat_counts,
+        x="Duration",
+        y="Count",
+        title="Request Duration Categories"
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
-def plot_top_hosts(df: pd.DataFrame, top_n: int = 10) -> None:
+def plot_top_hosts(cube: AggregateCube, top_n: int = 10) -> None:
     """Plot top hosts by request count"""
-    if df.empty or "host" not in df.columns:
+    if cube.empty:
         st.warning("No host data available")
         return
     
-    # Filter out None/NaN values
-    filtered_df = df[df["host"].notna()]
-    if filtered_df.empty:
+    # Count hosts (entries without a host are skipped)
+    host_counts = cube.counts_by("host").sort_values(ascending=False).reset_index()
+    if host_counts.empty:
         st.warning("No valid host data found")
         return
-    
-    # Count hosts
-    host_counts = filtered_df["host"].value_counts().reset_index()
     host_counts.columns = ["Host", "Count"]
     
     # Get top N hosts
@@ -173,33 +356,28 @@ def plot_top_hosts(df: pd.DataFrame, top_n: int = 10) -> None:
     )
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_host_status_heatmap(df: pd.DataFrame, top_n: int = 10) -> None:
+def plot_host_status_heatmap(cube: AggregateCube, top_n: int = 10) -> None:
     """Plot heatmap of hosts vs status codes"""
-    if df.empty or "host" not in df.columns or "status" not in df.columns:
+    if cube.empty:
         st.warning("No host or status data available")
         return
     
-    # Filter out None/NaN values for both host and status
-    filtered_df = df[df["host"].notna() & df["status"].notna()]
-    if filtered_df.empty:
+    # Counts for entries that have both a host and a status
+    host_status = cube.counts_by("host", "status")
+    if host_status.empty:
         st.warning("No valid host and status data found")
         return
     
-    # Convert status to string if it's not already
-    filtered_df["status"] = filtered_df["status"].astype(str)
-    
     # Get top hosts
-    top_hosts = filtered_df["host"].value_counts().head(top_n).index.tolist()
-    if not top_hosts:
+    top_hosts = host_status.groupby(level="host", observed=True).sum().sort_values(ascending=False).head(top_n)
+    if top_hosts.empty:
         st.warning("No host data available for heatmap")
         return
     
-    # Filter for top hosts
-    filtered_df = filtered_df[filtered_df["host"].isin(top_hosts)]
-    
     try:
-        # Create crosstab of hosts vs status codes
-        crosstab = pd.crosstab(filtered_df["host"], filtered_df["status"])
+        # Create crosstab of top hosts vs status codes
+        crosstab = host_status.unstack(fill_value=0).loc[top_hosts.index.tolist()]
+        crosstab.columns = crosstab.columns.astype(str)
         
         # Create heatmap
         fig = px.imshow(
@@ -212,6 +390,194 @@ def plot_host_status_heatmap(df: pd.DataFrame, top_n: int = 10) -> None:
     except Exception as e:
         st.warning(f"Error creating host-status heatmap: {str(e)}")
 
+# File picker orderings: label -> (sort key, descending)
+CATALOG_SORTS = OrderedDict([
+    ("Newest first", (lambda record: record["mtime_ns"], True)),
+    ("Oldest first", (lambda record: record["mtime_ns"], False)),
+    ("Name", (lambda record: record["name"].lower(), False)),
+    ("Largest first", (lambda record: record["size"], True)),
+    ("Most entries", (lambda record: record["entries"] or 0, True)),
+])
+
+def format_size(size: int) -> str:
+    """Return a file size in human-readable units"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
+
+def describe_size(record: Dict[str, Any]) -> str:
+    """Return the size of a catalogued capture, with its uncompressed size if it is compressed"""
+    size = format_size(record["size"])
+    if record.get("compression") and record.get("uncompressed_size") is not None:
+        size += f" ({format_size(record['uncompressed_size'])} uncompressed)"
+    return size
+
+def describe_capture(record: Dict[str, Any]) -> str:
+    """Return the file picker label of a catalogued capture"""
+    parts = [record["name"]]
+    if record["error"]:
+        parts.append("unreadable")
+    else:
+        parts.append(f"{record['entries']:,} entries ({record['format']})")
+    parts.append(describe_size(record))
+    if record["first_time"]:
+        parts.append(f"{record['first_time']} to {record['last_time']}")
+    return " · ".join(parts)
+
+def search_catalog(records: List[Dict[str, Any]], query: str, formats: List[str]) -> List[Dict[str, Any]]:
+    """Return the catalog records whose format is selected and whose name or top hosts contain the query"""
+    query = query.strip().lower()
+    matching = []
+    for record in records:
+        if formats and record["format"] not in formats:
+            continue
+        if query and query not in record["name"].lower() and \
+           not any(query in host.lower() for host, _ in record["top_hosts"]):
+            continue
+        matching.append(record)
+    return matching
+
+def pick_capture(records: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """Show the capture picker with search, format filter and sorting; return the selected file names
+
+    Returns None when no capture matches the search.
+    """
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        query = st.text_input("Search captures:", placeholder="File name or host")
+    with col2:
+        formats = st.multiselect("Formats:", sorted({str(record["format"]) for record in records}),
+                                 placeholder="All formats")
+    with col3:
+        sort_by = st.selectbox("Sort by:", list(CATALOG_SORTS))
+
+    matching = search_catalog(records, query, formats)
+    key, descending = CATALOG_SORTS[sort_by]
+    matching.sort(key=key, reverse=descending)
+    st.caption(f"{len(matching):,} of {len(records):,} captures")
+    if not matching:
+        return None
+
+    with st.expander("Capture catalog"):
+        st.dataframe(pd.DataFrame([{
+            "File": record["name"],
+            "Format": record["format"],
+            "Entries": record["entries"],
+            "Size": format_size(record["size"]),
+            "Uncompressed": None if record.get("uncompressed_size") is None
+            else format_size(record["uncompressed_size"]),
+            "Modified": datetime.fromtimestamp(record["mtime_ns"] / 1e9).strftime("%Y-%m-%d %H:%M:%S"),
+            "First Request": record["first_time"],
+            "Last Request": record["last_time"],
+            "Top Hosts": ", ".join(host for host, _ in record["top_hosts"]),
+        } for record in matching]), use_container_width=True, hide_index=True)
+
+    labels = {record["name"]: describe_capture(record) for record in matching}
+    if st.checkbox("Select several captures", key="multi_capture",
+                   help="Merge captures, e.g. the files of one test run, into a single view"):
+        return st.multiselect("Select parsed Charles log files:", list(labels), format_func=labels.get,
+                              placeholder="Choose captures to merge")
+    return [st.selectbox("Select a parsed Charles log file:", list(labels), format_func=labels.get)]
+
+# Endpoint subsets of the comparison table
+COMPARE_SHOWS = ["All endpoints", "Slower", "Status changes", "New", "Missing"]
+
+def show_comparison(output_dir: str, records: List[Dict[str, Any]]) -> None:
+    """Compare two captures endpoint by endpoint: latency deltas, status and payload changes, new and missing calls"""
+    st.header("Compare Captures")
+    readable = sorted((record for record in records if not record["error"]),
+                      key=lambda record: record["mtime_ns"], reverse=True)
+    labels = {record["name"]: describe_capture(record) for record in readable}
+    if len(labels) < 2:
+        st.info("Comparing needs at least two readable captures")
+        return
+
+    # Newest capture compared against the one before it by default
+    col1, col2 = st.columns(2)
+    with col1:
+        before_name = st.selectbox("Baseline capture:", list(labels), index=1, format_func=labels.get,
+                                   key="compare_before")
+    with col2:
+        after_name = st.selectbox("Compared capture:", list(labels), index=0, format_func=labels.get,
+                                  key="compare_after")
+    if before_name == after_name:
+        st.info("Select two different captures")
+        return
+
+    # Profiles are built once per file and cached with its other aggregates; the join is rebuilt per pair
+    paths = [os.path.join(output_dir, before_name), os.path.join(output_dir, after_name)]
+    (_, before_df), (_, after_df) = load_captures(paths)
+    if before_df.empty or after_df.empty:
+        st.warning("Both captures need detailed entries to be compared")
+        return
+    before = load_endpoint_profile(paths[0], before_df)
+    after = load_endpoint_profile(paths[1], after_df)
+    diff = load_merged(paths, "diff", lambda: diff_profiles(before, after))
+    summary = load_merged(paths, "diff_summary", lambda: diff_summary(before, after, diff))
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Requests", f"{summary['requests_after']:,}",
+                  f"{summary['requests_after'] - summary['requests_before']:+,}", delta_color="off")
+    top = max(PERCENTILES)
+    with col2:
+        p_before, p_after = summary[f"p{top}_before"], summary[f"p{top}_after"]
+        if p_before is None or p_after is None:
+            st.metric(f"p{top} (ms)", "N/A")
+        else:
+            st.metric(f"p{top} (ms)", f"{p_after:,.0f}", f"{p_after - p_before:+,.0f}", delta_color="inverse")
+    with col3:
+        st.metric("New / Missing Endpoints", f"{summary['new_endpoints']} / {summary['missing_endpoints']}")
+    with col4:
+        st.metric("Status Changes", summary["status_changes"])
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        show = st.selectbox("Show:", COMPARE_SHOWS, key="compare_show")
+    with col2:
+        percentile = st.selectbox("Percentile:", PERCENTILES, index=len(PERCENTILES) - 1,
+                                  format_func=lambda p: f"p{p}", key="compare_percentile")
+    with col3:
+        min_change = st.number_input("Minimum slowdown (%):", min_value=0, value=20, step=5,
+                                     key="compare_min_change", help="Used by Slower")
+    with col4:
+        min_requests = st.number_input("Minimum requests:", min_value=1, value=1, key="compare_min_requests",
+                                       help="Matched endpoints called less often in either capture are hidden")
+
+    rows = diff[(diff["change"] != MATCHED)
+                | ((diff["requests_before"] >= min_requests) & (diff["requests_after"] >= min_requests))]
+    if show == "Slower":
+        rows = regressions(rows, percentile, min_change / 100, min_requests)
+    elif show == "Status changes":
+        rows = rows[rows["status_changed"]]
+    elif show == "New":
+        rows = rows[rows["change"] == NEW]
+    elif show == "Missing":
+        rows = rows[rows["change"] == MISSING]
+    rows = rows.sort_values(f"p{percentile}_delta", ascending=False, na_position="last", kind="stable")
+    st.caption(f"{len(rows):,} of {len(diff):,} endpoints")
+
+    columns = ["endpoint", "change", "requests_before", "requests_after",
+               f"p{percentile}_before", f"p{percentile}_after", f"p{percentile}_delta", f"p{percentile}_change",
+               "error_rate_before", "error_rate_after", "statuses_before", "statuses_after",
+               "response_size_before", "response_size_after", "response_size_delta"]
+    st.dataframe(rows[columns].round(3), use_container_width=True, hide_index=True, height=500)
+
+    st.download_button(
+        "Download comparison (CSV)",
+        rows.to_csv(index=False),
+        file_name=f"{os.path.splitext(strip_compression(before_name))[0]}_vs_"
+                  f"{os.path.splitext(strip_compression(after_name))[0]}.csv",
+        mime="text/csv"
+    )
+
+def show_cache_usage() -> None:
+    """Show the usage of the capture cache and the formatted-body memo in the sidebar"""
+    for label, usage in (("Cache", get_capture_cache().stats()), ("Formatted bodies", get_format_memo().stats())):
+        st.sidebar.caption(f"{label}: {usage['entries']} entries, {usage['bytes'] / (1024 * 1024):,.1f} MB, "
+                           f"{usage['hits']} hits / {usage['misses']} misses")
+
 def main():
     try:
         st.set_page_config(
@@ -236,9 +602,31 @@ def main():
         
         output_dir = st.sidebar.text_input("Output Directory", value=default_output_dir)
         
-        # File selector
+        # Parsed captures are cached across reruns within this memory budget
+        cache = get_capture_cache()
+        cache_mb = st.sidebar.number_input(
+            "Cache Budget (MB)",
+            min_value=0,
+            value=cache.max_bytes // (1024 * 1024),
+            step=128
+        )
+        cache.resize(int(cache_mb) * 1024 * 1024)
+        if st.sidebar.button("Clear cache", help="Drop every cached capture, derived structure and formatted body"):
+            cache.invalidate()
+            get_format_memo().clear()
+
+        # New captures can be parsed in the background before anyone opens them
+        pre_ingest = st.sidebar.checkbox(
+            "Pre-ingest new captures",
+            value=os.environ.get("CHARLES_WATCH", "1") != "0",
+            help="Watch the output directory and build caches for new or changed captures in the background"
+        )
+        
+        # File selector over the directory's catalog - only new or changed captures are read
+        catalog = get_catalog(output_dir)
         try:
-            json_files = [f for f in os.listdir(output_dir) if f.endswith('.json')]
+            with st.spinner("Updating capture catalog..."):
+                catalog.refresh()
         except FileNotFoundError:
             st.error(f"Directory '{output_dir}' not found")
             st.info("Please enter a valid directory path or create the directory")
@@ -253,32 +641,79 @@ def main():
                         st.error(f"Failed to create directory: {str(e)}")
             return
             
-        if not json_files:
-            st.error(f"No JSON files found in '{output_dir}'")
+        if pre_ingest:
+            watcher = ensure_watcher(output_dir, prebuild_capture)
+            st.sidebar.caption(f"Watching for new captures ({watcher.mode}): "
+                               f"{watcher.pending} pending, {watcher.processed} pre-ingested")
+        else:
+            stop_watcher()
+        
+        records = catalog.records()
+        if not records:
+            st.error(f"No captures found in '{output_dir}'")
             st.info("Please run the parser first to generate JSON files, e.g.:\n\n```\npython client.py /path/to/your-file.chlsj --format detailed --save --output-dir={output_dir}\n```")
             return
-        
-        selected_file = st.selectbox("Select a parsed Charles log file:", json_files)
-        full_path = os.path.join(output_dir, selected_file)
-        
-        # Load data
-        data = load_data(full_path)
-        if not data:
+
+        view = st.sidebar.radio("View", ["Explore captures", "Compare two captures"],
+                                help="Compare: line up two captures by endpoint to find regressions")
+        if view == "Compare two captures":
+            show_comparison(output_dir, records)
             return
-        
-        # Create DataFrame
-        df = create_entries_dataframe(data)
+
+        selected_files = pick_capture(records)
+        if selected_files is None:
+            st.warning("No captures match the search")
+            return
+        if not selected_files:
+            st.info("Select one or more captures to merge")
+            return
+        paths = [os.path.join(output_dir, name) for name in selected_files]
+        
+        if len(paths) == 1:
+            # Load data and create DataFrame (cached until the file changes)
+            full_path = paths[0]
+            data, df = load_capture(full_path)
+            if data is None:
+                return
+            frames = [df]
+            # Bodies are read from the capture itself
+            body_source = full_path
+            export_name = os.path.splitext(strip_compression(selected_files[0]))[0]
+        else:
+            # Per-file frames come from the cache or are parsed concurrently, then concatenated once
+            captures = load_captures(paths)
+            loaded = [(path, df) for path, (_, df) in zip(paths, captures) if not df.empty]
+            paths = [path for path, _ in loaded]
+            frames = [df for _, df in loaded]
+            data = {}
+            df = load_merged(paths, "frame", lambda: concat_entries_frames(
+                [(os.path.basename(path), frame) for path, frame in loaded]))
+            # Rows name their capture in the source_file column, relative to the directory
+            body_source = output_dir
+            export_name = f"{len(paths)}_captures"
         
         # Display summary info
         st.header("Log Summary")
-        
-        if "entries" in data:
-            col1, col2 = st.columns(2)
+        if len(selected_files) > 1:
+            st.caption(f"Merged {len(paths)} of {len(selected_files)} selected captures with entries: "
+                       + ", ".join(os.path.basename(path) for path in paths))
+        
+        if not df.empty:
+            # Counts and timing computed once per file in one vectorized pass (merged across files)
+            stats = load_aggregate("stats", paths, frames)
+            col1, col2, col3, col4 = st.columns(4)
             with col1:
-                total_entries = len(data.get("entries", []))
-                st.metric("Total Entries", total_entries)
+                st.metric("Total Entries", stats.total)
+            with col2:
+                st.metric("Hosts", sum(1 for host in stats.host_counts if host != UNKNOWN))
+            with col3:
+                error_rate = stats.error_rate()
+                st.metric("Error Rate (4xx/5xx)", "N/A" if error_rate is None else f"{error_rate:.1%}")
+            with col4:
+                st.metric("Average Duration (ms)", "N/A" if stats.duration_mean is None else f"{stats.duration_mean:,.0f}")
         elif "total_entries" in data:
             # Summary format
+            st.info("This is a summary file. It contains statistics but no detailed entries.")
             st.metric("Total Entries", data.get("total_entries", 0))
             
             # Display summary stats
@@ -327,9 +762,12 @@ def main():
         # Add filters
         st.header("Filters")
         
+        # Aggregates for every chart, computed once per file
+        cube = load_aggregate("cube", paths, frames)
+        
         # Get unique non-null values
-        hosts = df["host"].dropna().unique().tolist()
-        statuses = df["status"].dropna().unique().tolist()
+        hosts = cube.counts_by("host").index.tolist()
+        statuses = cube.counts_by("status").index.tolist()
         
         col1, col2, col3 = st.columns(3)
         
@@ -340,254 +778,154 @@ def main():
         
         with col2:
             # Status code filter
-            statuses = ["All"] + sorted([str(s) for s in statuses if pd.notna(s)])
+            statuses = ["All"] + [str(s) for s in sorted(statuses)]
             selected_status = st.selectbox("Status Code:", statuses)
         
         with col3:
             # Duration filter
             if "duration_category" in df.columns:
-                durations = ["All"] + sorted(df["duration_category"].dropna().unique().tolist())
+                durations = ["All"] + sorted(cube.counts_by("duration_category").index.tolist())
                 selected_duration = st.selectbox("Duration:", durations)
             else:
                 selected_duration = "All"
                 st.text("No duration data available")
         
-        # Apply filters
-        filtered_df = df.copy()
-        
-        if selected_host != "All":
-            filtered_df = filtered_df[filtered_df["host"] == selected_host]
-        
-        if selected_status != "All":
-            filtered_df = filtered_df[filtered_df["status"].astype(str) == selected_status]
+        # Apply filters (None means no filter on that column)
+        filters = {
+            "host": None if selected_host == "All" else selected_host,
+            "status": None if selected_status == "All" else int(selected_status),
+            "duration_category": None if selected_duration == "All" else selected_duration,
+        }
         
-        if selected_duration != "All" and "duration_category" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["duration_category"] == selected_duration]
+        # Matching rows come from ANDing precomputed bitmaps, the charts from the cube
+        filter_index = load_aggregate("filter_index", paths, frames)
+        filtered_rows = filter_index.rows(**filters)
+        filtered_df = df if len(filtered_rows) == len(df) else df.iloc[filtered_rows]
+        filtered_cube = cube.select(**filters)
         
         # Display filter summary
-        st.metric("Filtered Entries", len(filtered_df))
+        st.metric("Filtered Entries", filtered_cube.total())
         
         # Visualizations
         st.header("Visualizations")
         
         # Status code distribution
-        plot_status_codes(filtered_df)
+        plot_status_codes(filtered_cube)
         
         # Top hosts
         col1, col2 = st.columns(2)
         
         with col1:
-            plot_top_hosts(filtered_df)
+            plot_top_hosts(filtered_cube)
         
         with col2:
-            plot_host_status_heatmap(filtered_df)
+            plot_host_status_heatmap(filtered_cube)
         
         # Duration distribution
-        plot_duration_distribution(filtered_df)
+        bin_scale = st.radio("Duration bins:", ["linear", "log"], horizontal=True,
+                             help="Log-scale bins spread out long-tail latencies")
+        plot_duration_distribution(cube, filters, bin_scale)
+        
+        # Tail latencies from mergeable sketches built once per file
+        show_latency_percentiles(stats.latency, filters)
         
         # Data table
         st.header("Data Explorer")
         
-        # Drop duration calculation columns for display
-        display_df = filtered_df.drop(columns=["duration_ms", "duration_category"], errors="ignore")
+        # Server-side pagination: only the visible page is read, formatted and sent to the browser
+        col1, col2, col3 = st.columns(3)
         
-        # Function to recursively parse and prettify nested JSON strings
-        def deep_parse_json(content, max_depth=3, current_depth=0):
-            """Recursively parse nested JSON strings in a value with depth limit"""
-            # Check recursion depth to prevent infinite recursion or stack overflow
-            if current_depth >= max_depth:
-                return content
-                
-            try:
-                if isinstance(content, dict):
-                    # Handle dictionaries - recursively process each value
-                    result = {}
-                    for key, value in content.items():
-                        result[key] = deep_parse_json(value, max_depth, current_depth + 1)
-                    return result
-                elif isinstance(content, list):
-                    # Handle lists - recursively process each item
-                    return [deep_parse_json(item, max_depth, current_depth + 1) for item in content]
-                elif isinstance(content, str):
-                    # See if this string is a JSON string itself
-                    try:
-                        if (content.strip().startswith('{') and content.strip().endswith('}')) or \
-                           (content.strip().startswith('[') and content.strip().endswith(']')):
-                            # Try to parse as JSON
-                            parsed = json.loads(content)
-                            # Recursively process this parsed JSON
-                            return deep_parse_json(parsed, max_depth, current_depth + 1)
-                    except json.JSONDecodeError:
-                        # Not a JSON string, return as is
-                        pass
-                    except RecursionError:
-                        st.warning("Recursion limit reached while processing nested JSON.")
-                        return content
-                # For any other type, return as is
-                return content
-            except Exception as e:
-                # Catch any other exceptions to prevent dashboard crashes
-                st.warning(f"Error processing JSON data: {str(e)}")
-                return content
-
-        # Function to safely process potentially large JSON data
-        def safely_process_json(process_func, content, *args, **kwargs):
-            """Wrapper to catch and handle errors when processing JSON data"""
-            try:
-                return process_func(content, *args, **kwargs)
-            except RecursionError:
-                st.warning("Recursion limit reached while processing JSON data.")
-                return str(content)
-            except MemoryError:
-                st.warning("Out of memory while processing large JSON data.")
-                return "Error: Data too large to process"
-            except Exception as e:
-                st.warning(f"Error processing JSON data: {str(e)}")
-                return str(content)
-
-        # Function to prettify and truncate JSON content
-        def prettify_and_truncate(content, max_length=100):
-            if pd.isna(content) or content is None:
-                return ""
-            
-            # Convert to string if it's not already
-            if not isinstance(content, str):
-                try:
-                    if isinstance(content, (dict, list)):
-                        content = json.dumps(content, indent=2)
-                    else:
-                        content = str(content)
-                except Exception:
-                    content = str(content)
-            
-            # Try to parse and prettify JSON
-            try:
-                # Check if it looks like JSON
-                if (content.strip().startswith('{') and content.strip().endswith('}')) or \
-                   (content.strip().startswith('[') and content.strip().endswith(']')):
-                    # Parse the JSON (this will handle escaped characters)
-                    parsed = json.loads(content)
-                    # Handle any nested JSON strings
-                    deep_parsed = safely_process_json(deep_parse_json, parsed)
-                    # Re-serialize with nice formatting but without escaping unicode or special chars
-                    content = json.dumps(deep_parsed, indent=2, ensure_ascii=False)
-            except json.JSONDecodeError:
-                # Not valid JSON, keep as is
-                pass
-            
-            # Truncate if needed
-            if len(content) > max_length:
-                # Try to find a reasonable place to cut (like end of a line)
-                cut_at = content.rfind('\n', 0, max_length)
-                if cut_at > 0:
-                    return content[:cut_at] + "\n..."
-                else:
-                    return content[:max_length] + "..."
-            return content
-
-        # Function to prettify JSON for full display
-        def prettify_json(content):
-            if pd.isna(content) or content is None:
-                return ""
-            
-            # Convert to string if it's not already
-            if not isinstance(content, str):
-                try:
-                    if isinstance(content, (dict, list)):
-                        # Handle any nested JSON strings
-                        deep_parsed = safely_process_json(deep_parse_json, content)
-                        return json.dumps(deep_parsed, indent=2, ensure_ascii=False)
-                    else:
-                        content = str(content)
-                except Exception:
-                    return str(content)
-            
-            # Try to parse and prettify JSON
-            try:
-                # Check if it looks like JSON
-                if (content.strip().startswith('{') and content.strip().endswith('}')) or \
-                   (content.strip().startswith('[') and content.strip().endswith(']')):
-                    # Parse the JSON (this will handle escaped characters)
-                    parsed = json.loads(content)
-                    # Handle any nested JSON strings
-                    deep_parsed = safely_process_json(deep_parse_json, parsed)
-                    # Re-serialize with nice formatting but without escaping unicode or special chars
-                    return json.dumps(deep_parsed, indent=2, ensure_ascii=False)
-            except json.JSONDecodeError:
-                # Not valid JSON, keep as is
-                pass
-                
-            return content
+        with col1:
+            page_size = st.selectbox(
+                "Rows per page:",
+                PAGE_SIZES,
+                index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                key="explorer_page_size"
+            )
         
-        # Create a display-friendly version of the dataframe
-        display_friendly_df = display_df.copy()
+        with col2:
+            query = st.text_input("Search host, path or URL:", key="explorer_search")
         
-        # Add progress indicator for processing large datasets
-        if len(display_df) > 100 and ('request_body' in display_df.columns or 'response_body' in display_df.columns):
-            progress_bar = st.progress(0)
-            st.info("Processing large dataset...")
-            
-        # Process columns safely
-        for col in ['request_body', 'response_body']:
-            if col in display_friendly_df.columns:
-                # Process rows in chunks to avoid memory issues
-                chunk_size = 50
-                num_chunks = (len(display_friendly_df) + chunk_size - 1) // chunk_size
-                
-                for i in range(num_chunks):
-                    start_idx = i * chunk_size
-                    end_idx = min((i + 1) * chunk_size, len(display_friendly_df))
-                    
-                    # Process this chunk
-                    for idx in range(start_idx, end_idx):
-                        display_friendly_df.at[idx, col] = prettify_and_truncate(display_friendly_df.iloc[idx][col])
-                    
-                    # Update progress bar if shown
-                    if len(display_df) > 100 and ('request_body' in display_df.columns or 'response_body' in display_df.columns):
-                        progress_bar.progress((i + 1) / num_chunks)
-                
-        # Clear progress bar if shown
-        if len(display_df) > 100 and ('request_body' in display_df.columns or 'response_body' in display_df.columns):
-            st.success("Processing complete!")
-            progress_bar.empty()
+        explorer_df = filtered_df[search_entries(filtered_df, query)] if query else filtered_df
+        num_rows = len(explorer_df)
+        num_pages = max(1, (num_rows + page_size - 1) // page_size)
         
-        # Data table section
-
-        # Display data table (standard version without row selection)
-        st.write("**Data Explorer:** Full request and response body data with proper JSON formatting.")
+        # Keep page and row inputs in range when filters or search shrink the results
+        if st.session_state.get("explorer_page", 1) > num_pages:
+            st.session_state["explorer_page"] = num_pages
+        if st.session_state.get("explorer_jump", 0) > max(num_rows - 1, 0):
+            st.session_state["explorer_jump"] = 0
         
-        # Create a display version with formatted JSON but without truncation
-        display_friendly_no_truncate = display_df.copy()
+        def jump_to_row():
+            """Show the page containing the requested row"""
+            row = st.session_state["explorer_jump"]
+            st.session_state["explorer_page"] = row // st.session_state["explorer_page_size"] + 1
         
-        # Format JSON columns without truncation
-        for col in ['request_body', 'response_body']:
-            if col in display_friendly_no_truncate.columns:
-                # Process rows for formatting
-                for idx in range(len(display_friendly_no_truncate)):
-                    content = display_friendly_no_truncate.iloc[idx][col]
-                    if content and not pd.isna(content):
-                        display_friendly_no_truncate.at[idx, col] = prettify_json(content)
+        with col3:
+            jump_row = st.number_input(
+                "Jump to row:",
+                min_value=0,
+                max_value=max(num_rows - 1, 0),
+                key="explorer_jump",
+                on_change=jump_to_row
+            )
+        
+        page = st.number_input("Page:", min_value=1, max_value=num_pages, key="explorer_page")
+        start = (int(page) - 1) * page_size
+        end = min(start + page_size, num_rows)
+        st.caption(f"Showing rows {start}-{max(end - 1, start)} of {num_rows} (page {page} of {num_pages})")
+        
+        # Drop duration calculation and body offset columns for display
+        page_rows = explorer_df.iloc[start:end]
+        display_df = page_rows.drop(
+            columns=["duration_ms", "duration_category", "status_class"] + body_span_column_names(),
+            errors="ignore"
+        )
+        display_df.index = pd.RangeIndex(start, end)
+        if SOURCE_COLUMN in display_df.columns:
+            # Which capture each row of a merged view came from
+            display_df.insert(0, SOURCE_COLUMN, display_df.pop(SOURCE_COLUMN))
         
+        # Read the bodies of the visible rows from the capture file
+        try:
+            page_bodies = read_bodies_frame(body_source, page_rows)
+            for col in page_bodies.columns:
+                display_df[col] = page_bodies[col].values
+        except (OSError, ValueError) as e:
+            st.warning(f"Could not read bodies for this page: {str(e)}")
+        
+        # Display data table (standard version without row selection)
+        st.write("**Data Explorer:** Request and response body previews for the current page. Select a row below to see the full bodies.")
+
+        # Table cells only show previews - only the start of each body is formatted
+        display_friendly_df = display_df.copy()
+        for col in ['request_body', 'response_body']:
+            if col in display_friendly_df.columns:
+                display_friendly_df[col] = display_friendly_df[col].map(prettify_and_truncate)
+
         # Standard dataframe without selection
         st.dataframe(
-            display_friendly_no_truncate,
+            display_friendly_df,
             use_container_width=True,
             height=400
         )
         
-        # Let user select row from dropdown
+        # Let user select a row of the current page from dropdown
         st.write("### View Full Request/Response Data")
-        row_indices = list(range(len(display_df)))
+        row_indices = list(range(start, end))
         if row_indices:
-            selected_index = st.selectbox("Select a row to view details:", row_indices)
-            selected_row = display_df.iloc[selected_index]
+            default_index = row_indices.index(jump_row) if jump_row in row_indices else 0
+            selected_index = st.selectbox("Select a row to view details:", row_indices, index=default_index)
+            selected_row = display_df.loc[selected_index].to_dict()
             
             # Show summary data for the row
             col1, col2, col3 = st.columns(3)
             if 'method' in selected_row:
                 col1.metric("Method", selected_row.get('method', 'N/A'))
             if 'status' in selected_row:
-                col2.metric("Status", selected_row.get('status', 'N/A'))
+                # Missing statuses are <NA> in the nullable integer column
+                status = selected_row.get('status')
+                col2.metric("Status", 'N/A' if pd.isna(status) else int(status))
             if 'duration' in selected_row:
                 col3.metric("Duration (ms)", selected_row.get('duration', 'N/A'))
             
@@ -597,8 +935,8 @@ def main():
                 
                 with req_tab:
                     if selected_row['request_body'] and not pd.isna(selected_row['request_body']):
-                        # Prettify and display with syntax highlighting
-                        pretty_req = prettify_json(selected_row['request_body'])
+                        # Prettify and display with syntax highlighting (memoized by content hash)
+                        pretty_req = format_body(selected_row['request_body'])
                         st.code(pretty_req, language="json")
                     else:
                         st.info("No request body data available.")
@@ -606,7 +944,7 @@ def main():
                 with resp_tab:
                     if selected_row['response_body'] and not pd.isna(selected_row['response_body']):
                         # Prettify and display with syntax highlighting
-                        pretty_resp = prettify_json(selected_row['response_body'])
+                        pretty_resp = format_body(selected_row['response_body'])
                         st.code(pretty_resp, language="json")
                     else:
                         st.info("No response body data available.")
@@ -614,13 +952,48 @@ def main():
                 if selected_row['response_body'] and not pd.isna(selected_row['response_body']):
                     st.subheader("Response Body")
                     # Prettify and display with syntax highlighting
-                    pretty_resp = prettify_json(selected_row['response_body'])
+                    pretty_resp = format_body(selected_row['response_body'])
                     st.code(pretty_resp, language="json")
                 else:
                     st.info("No response body data available.")
+
+        # Format the bodies of every filtered entry for download
+        with st.expander("Export formatted bodies"):
+            st.write(f"Pretty-prints the request and response bodies of all {num_rows} matching entries using all CPU cores.")
+            if st.button("Format bodies for export"):
+                export_progress = st.progress(0.0)
+                formatted = OrderedDict()
+                try:
+                    for i, field in enumerate(['request_body', 'response_body']):
+                        raw = read_raw_body_column(body_source, explorer_df, field)
+                        formatted[field] = format_raw_bodies(
+                            raw,
+                            progress=lambda done, total, i=i: export_progress.progress((i + done / max(total, 1)) / 2)
+                        )
+                except (OSError, ValueError) as e:
+                    st.warning(f"Could not read bodies for export: {str(e)}")
+                else:
+                    export_progress.progress(1.0)
+                    labels = [
+                        f"{row} {method} {url}"
+                        for row, method, url in zip(
+                            range(num_rows),
+                            explorer_df["method"].astype(object) if "method" in explorer_df.columns else [""] * num_rows,
+                            explorer_df["url"] if "url" in explorer_df.columns else explorer_df["host"].astype(object)
+                        )
+                    ]
+                    st.download_button(
+                        "Download formatted bodies",
+                        "".join(render_bodies_export(labels, formatted)),
+                        file_name=export_name + "_bodies.txt",
+                        mime="text/plain"
+                    )
     except Exception as e:
         st.error(f"An unexpected error occurred: {str(e)}")
         st.info("If this is a dependency issue, make sure you've installed all required packages with: `pip install -r dashboard_requirements.txt`")
+    finally:
+        # Rendered last so the counters include this run's loads
+        show_cache_usage()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
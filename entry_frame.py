@@ -0,0 +1,254 @@
+"""
+Build the entries DataFrame used by the dashboard.
+
+`finalize_entries_frame` adds the derived columns every view relies on, and
+`stream_entries_frame` builds the frame straight from a capture file in
+chunks via `CaptureStream`, so the parsed JSON tree and the DataFrame are
+never in memory at the same time. With `index_bodies` the frame holds only
+byte spans of the bodies, and `read_bodies_frame` decodes those of a page
+of rows on demand.
+
+`concat_entries_frames` merges the frames of several captures, naming each
+row's capture in a `source_file` column; the body readers then take the
+captures' directory and read every row from its own file.
+"""
+
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import json_backend
+from body_format import encode_body
+from capture_catalog import TIME_FIELDS
+from capture_stream import (
+    BODY_FIELDS,
+    CaptureStream,
+    body_span_columns,
+    decode_base64_body,
+    read_bodies,
+    read_raw_bodies,
+)
+
+# Rows converted to a DataFrame at a time while streaming
+CHUNK_ROWS = 50000
+
+DURATION_BINS = [0, 100, 500, 1000, 5000, float('inf')]
+DURATION_LABELS = ['<100ms', '100-500ms', '500ms-1s', '1s-5s', '>5s']
+
+STATUS_CLASS_BINS = [100, 200, 300, 400, 500, 600]
+STATUS_CLASS_LABELS = ['1xx', '2xx', '3xx', '4xx', '5xx']
+
+# Suffix of the flag columns marking base64-encoded bodies
+BASE64_SUFFIX = "_base64"
+
+# Columns stored as categoricals - few distinct values, grouped and filtered often
+CATEGORY_COLUMNS = ["host", "method"]
+
+# Column naming the capture file each row of a merged frame came from
+SOURCE_COLUMN = "source_file"
+
+
+def normalize_status(values: pd.Series) -> pd.Series:
+    """Convert raw status values to a nullable Int16 column (<NA> for missing or non-numeric)"""
+    status = pd.to_numeric(values, errors="coerce")
+    status = status.where((status >= 0) & (status < 1000)).round()
+    return status.astype("Int16")
+
+
+def finalize_entries_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Ensure required columns exist, normalize dtypes and add derived columns"""
+    # Ensure required columns exist
+    for col in ["host", "status", "duration"]:
+        if col not in df.columns:
+            df[col] = None
+
+    # Compact dtypes so value_counts, groupby and filters work on codes, not objects
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    df["status"] = normalize_status(df["status"])
+    df["status_class"] = pd.cut(
+        df["status"].astype("float64"),
+        bins=STATUS_CLASS_BINS,
+        labels=STATUS_CLASS_LABELS,
+        right=False
+    )
+
+    # If duration is present, add duration categories
+    if "duration" in df.columns:
+        df["duration_ms"] = pd.to_numeric(df["duration"], errors="coerce")
+        df["duration_category"] = pd.cut(df["duration_ms"], bins=DURATION_BINS, labels=DURATION_LABELS)
+
+    return df
+
+
+def body_span_column_names() -> List[str]:
+    """Return the names of all body offset/length columns"""
+    return [col for field in BODY_FIELDS for col in body_span_columns(field)]
+
+
+def stream_entries_frame(file_path: str, max_body_bytes: Optional[int] = None,
+                         index_bodies: bool = False,
+                         chunk_rows: int = CHUNK_ROWS) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """Build (header, entries DataFrame) from a capture file without loading the whole JSON"""
+    stream = CaptureStream(file_path, max_body_bytes=max_body_bytes, index_bodies=index_bodies)
+    return frame_from_stream(stream, chunk_rows)
+
+
+def frame_from_stream(stream: CaptureStream, chunk_rows: int = CHUNK_ROWS) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """Build (header, entries DataFrame) by reading a capture stream to its end"""
+    chunks: List[pd.DataFrame] = []
+    rows: List[Dict[str, Any]] = []
+
+    for entry in stream:
+        rows.append(entry)
+        if len(rows) >= chunk_rows:
+            chunks.append(pd.DataFrame(rows))
+            rows = []
+    if rows:
+        chunks.append(pd.DataFrame(rows))
+
+    if not chunks:
+        return stream.header, pd.DataFrame()
+
+    df = pd.concat(chunks, ignore_index=True, sort=False) if len(chunks) > 1 else chunks[0]
+    for col in df.columns:
+        if col.endswith(("_dropped", BASE64_SUFFIX)):
+            df[col] = df[col].eq(True)
+    for col in body_span_column_names():
+        if col in df.columns:
+            df[col] = df[col].astype("int64")
+    return stream.header, finalize_entries_frame(df)
+
+
+def catalog_facts(df: pd.DataFrame) -> Tuple[Counter, Optional[str], Optional[str]]:
+    """Return the host counts and request time range of an entries frame, as a catalog scan records them"""
+    hosts: Counter = Counter()
+    if "host" in df.columns:
+        hosts.update({host: count for host, count in df["host"].value_counts(sort=False).items() if count})
+    # Each entry's time is its first present TIME_FIELDS value
+    times = None
+    for field in TIME_FIELDS:
+        if field in df.columns:
+            values = df[field].astype(object)
+            times = values if times is None else times.where(times.notna(), values)
+    if times is None:
+        return hosts, None, None
+    # ISO 8601 times order correctly as text
+    times = times.dropna().astype(str)
+    if times.empty:
+        return hosts, None, None
+    return hosts, times.min(), times.max()
+
+
+def _decode_flagged(values: List[Any], flags: Optional[pd.Series]) -> List[Any]:
+    """Decode the base64-encoded values among body values"""
+    if flags is None or not flags.any():
+        return values
+    return [decode_base64_body(value) if flag else value for value, flag in zip(values, flags.tolist())]
+
+
+def concat_entries_frames(frames: Sequence[Tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+    """Concatenate the entries frames of several captures, given as (file name, frame), in order
+
+    Empty frames are skipped. Categorical columns stay categorical over the
+    union of their categories, and SOURCE_COLUMN names each row's capture.
+    """
+    frames = [(name, df) for name, df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    parts = [df.copy(deep=False) for _, df in frames]
+    for col in CATEGORY_COLUMNS:
+        present = [part[col] for part in parts
+                   if col in part.columns and isinstance(part[col].dtype, pd.CategoricalDtype)]
+        if len(present) > 1:
+            categories = pd.api.types.union_categoricals(present, ignore_order=True).categories
+            for part in parts:
+                if col in part.columns:
+                    part[col] = part[col].astype(pd.CategoricalDtype(categories))
+    df = pd.concat(parts, ignore_index=True, sort=False)
+
+    # Columns missing from some captures come back as NaN - restore their types
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in body_span_column_names():
+        if col in df.columns:
+            df[col] = df[col].fillna(-1).astype("int64")
+    for col in df.columns:
+        if col.endswith(("_dropped", BASE64_SUFFIX)):
+            df[col] = df[col].eq(True)
+    codes = np.repeat(np.arange(len(frames)), [len(frame) for _, frame in frames])
+    df[SOURCE_COLUMN] = pd.Categorical.from_codes(codes, categories=[name for name, _ in frames])
+    return df
+
+
+def _source_groups(file_path: str, df: pd.DataFrame) -> List[Tuple[str, np.ndarray]]:
+    """Split rows by capture file, as (path, row positions)
+
+    Rows of a merged frame name their capture in SOURCE_COLUMN, relative to
+    `file_path`, which is then the captures' directory.
+    """
+    if SOURCE_COLUMN not in df.columns:
+        return [(file_path, np.arange(len(df)))]
+    codes = df[SOURCE_COLUMN].cat.codes.to_numpy()
+    names = df[SOURCE_COLUMN].cat.categories
+    return [(os.path.join(file_path, names[code]), np.flatnonzero(codes == code)) for code in np.unique(codes)]
+
+
+def read_bodies_frame(file_path: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Return the request/response bodies of the given rows, reading indexed bodies from their capture"""
+    groups = _source_groups(file_path, df)
+    if len(groups) == 1 and len(groups[0][1]) == len(df):
+        return _read_bodies_frame(groups[0][0], df)
+    parts = [_read_bodies_frame(path, df.iloc[rows]) for path, rows in groups]
+    return pd.concat(parts).reindex(df.index) if parts else pd.DataFrame(index=df.index)
+
+
+def _read_bodies_frame(file_path: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Return the bodies of rows that all come from one capture file"""
+    bodies = pd.DataFrame(index=df.index)
+    for field in BODY_FIELDS:
+        offset_col, length_col = body_span_columns(field)
+        if offset_col in df.columns:
+            values = read_bodies(file_path, zip(df[offset_col].tolist(), df[length_col].tolist()))
+        elif field in df.columns:
+            values = df[field].tolist()
+        else:
+            continue
+        values = _decode_flagged(values, df.get(field + BASE64_SUFFIX))
+        bodies[field] = pd.Series(values, index=df.index, dtype=object)
+    return bodies
+
+
+def read_raw_body_column(file_path: str, df: pd.DataFrame, field: str) -> List[Optional[bytes]]:
+    """Return one body field of the given rows as undecoded JSON bytes (None where missing)"""
+    groups = _source_groups(file_path, df)
+    if len(groups) == 1 and len(groups[0][1]) == len(df):
+        return _read_raw_body_column(groups[0][0], df, field)
+    raw: List[Optional[bytes]] = [None] * len(df)
+    for path, rows in groups:
+        for position, body in zip(rows.tolist(), _read_raw_body_column(path, df.iloc[rows], field)):
+            raw[position] = body
+    return raw
+
+
+def _read_raw_body_column(file_path: str, df: pd.DataFrame, field: str) -> List[Optional[bytes]]:
+    """Return one body field of rows that all come from one capture file"""
+    offset_col, length_col = body_span_columns(field)
+    if offset_col in df.columns:
+        raw = read_raw_bodies(file_path, zip(df[offset_col].tolist(), df[length_col].tolist()))
+    elif field in df.columns:
+        raw = [encode_body(value) for value in df[field].tolist()]
+    else:
+        return [None] * len(df)
+    flags = df.get(field + BASE64_SUFFIX)
+    if flags is not None and flags.any():
+        # Encoded bodies are decoded here so that their content is what gets formatted
+        raw = [encode_body(decode_base64_body(json_backend.loads(body))) if flag and body is not None else body
+               for body, flag in zip(raw, flags.tolist())]
+    return raw
+
@@ -0,0 +1,130 @@
+"""
+Bitmap indexes for the dashboard's row filters.
+
+For each filterable column the index keeps one packed bitset per value
+(one bit per row), built once per file. Applying a filter combination is
+then a bitwise AND of a few bitsets, which yields the matching row
+positions without comparing or copying any DataFrame columns.
+
+Columns with a long tail of values only get bitsets for their most
+frequent values; rarer values are answered from the column's integer codes.
+
+The index of several concatenated captures is assembled from theirs by
+remapping each one's codes onto the union of their values.
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns the dashboard filters on
+FILTER_COLUMNS = ("host", "status", "duration_category")
+
+# Bitsets kept per column - each one costs rows / 8 bytes
+MAX_BITMAPS_PER_COLUMN = 256
+
+
+class FilterIndex:
+    """Per-value packed bitsets over the rows of an entries DataFrame"""
+
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+        # Column -> integer code per row (-1 for missing values)
+        self._codes: Dict[str, np.ndarray] = {}
+        # Column -> {value: code}
+        self._lookup: Dict[str, Dict[Any, int]] = {}
+        # Column -> {code: packed bitset}
+        self._bitmaps: Dict[str, Dict[int, np.ndarray]] = {}
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, columns=FILTER_COLUMNS,
+              max_bitmaps: int = MAX_BITMAPS_PER_COLUMN) -> "FilterIndex":
+        """Index the given columns of an entries DataFrame"""
+        index = cls(len(df))
+        for col in columns:
+            if col not in df.columns:
+                continue
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                uniques = series.cat.categories
+            else:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            frequent = np.argsort(counts)[::-1][:max_bitmaps]
+
+            index._codes[col] = codes
+            index._lookup[col] = {value: code for code, value in enumerate(uniques)}
+            index._bitmaps[col] = {
+                int(code): np.packbits(codes == code) for code in frequent if counts[code]
+            }
+        return index
+
+    @classmethod
+    def concat(cls, indexes: Sequence["FilterIndex"],
+               max_bitmaps: int = MAX_BITMAPS_PER_COLUMN) -> "FilterIndex":
+        """Return the index of the captures' frames concatenated in the same order"""
+        if len(indexes) == 1:
+            return indexes[0]
+        index = cls(sum(part.n_rows for part in indexes))
+        columns = dict.fromkeys(col for part in indexes for col in part._codes)
+        for col in columns:
+            lookup: Dict[Any, int] = {}
+            codes = []
+            for part in indexes:
+                if col not in part._codes:
+                    codes.append(np.full(part.n_rows, -1, dtype=np.int64))
+                    continue
+                # Code in this part -> code in the union (the lookup is in code order)
+                remap = np.array([lookup.setdefault(value, len(lookup)) for value in part._lookup[col]] + [-1],
+                                 dtype=np.int64)
+                codes.append(remap[part._codes[col]])
+            merged = np.concatenate(codes)
+            counts = np.bincount(merged[merged >= 0], minlength=len(lookup))
+            frequent = np.argsort(counts)[::-1][:max_bitmaps]
+            index._codes[col] = merged
+            index._lookup[col] = lookup
+            index._bitmaps[col] = {
+                int(code): np.packbits(merged == code) for code in frequent if counts[code]
+            }
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index"""
+        total = sum(codes.nbytes for codes in self._codes.values())
+        for bitmaps in self._bitmaps.values():
+            total += sum(bitmap.nbytes for bitmap in bitmaps.values())
+        return total
+
+    def bitmap(self, column: str, value: Any) -> np.ndarray:
+        """Return the packed bitset of rows where `column == value`"""
+        if column not in self._codes:
+            raise KeyError(f"Column '{column}' is not indexed")
+        code = self._lookup[column].get(value)
+        if code is None:
+            return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        bitmap = self._bitmaps[column].get(code)
+        if bitmap is None:
+            # Rare value without a stored bitset
+            bitmap = np.packbits(self._codes[column] == code)
+        return bitmap
+
+    def mask(self, **filters: Optional[Any]) -> Optional[np.ndarray]:
+        """Return the packed AND of the filters' bitsets (None if no filter is set)"""
+        result = None
+        for column, value in filters.items():
+            if value is None:
+                continue
+            bitmap = self.bitmap(column, value)
+            result = bitmap if result is None else np.bitwise_and(result, bitmap)
+        return result
+
+    def rows(self, **filters: Optional[Any]) -> np.ndarray:
+        """Return the positions of rows matching all `column=value` filters (None means all)"""
+        packed = self.mask(**filters)
+        if packed is None:
+            return np.arange(self.n_rows)
+        return np.flatnonzero(np.unpackbits(packed, count=self.n_rows))
@@ -0,0 +1,117 @@
+"""
+HAR 1.2 archives (.har) mapped onto the dashboard's entry model.
+
+Browsers and most proxies export HAR: a JSON object whose `log.entries`
+list holds one request/response exchange per entry. CaptureStream streams
+that list like any other capture and maps each entry here to the flat
+entry the log parser writes (method, host, path, url, status, duration,
+start time) plus timings, sizes, headers and bodies - the same columns a
+Charles session produces.
+
+HAR timings use -1 for phases that did not apply; they become missing
+values. Response bodies marked `"encoding": "base64"` keep their encoded
+text and get a `<field>_base64` flag, and are decoded only when displayed.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+FORMAT = "har"
+
+# Keys leading from the top-level object to the entries list
+ENTRY_PATH = ("log", "entries")
+
+# HAR timing phase -> entry timing column
+TIMING_FIELDS = (
+    ("blocked", "timing_blocked"),
+    ("dns", "timing_dns"),
+    ("connect", "timing_connect"),
+    ("ssl", "timing_ssl"),
+    ("send", "timing_send"),
+    ("wait", "timing_wait"),
+    ("receive", "timing_receive"),
+)
+
+# Body field -> key path of its text inside an entry
+_BODY_PATHS = {
+    "request_body": ("request", "postData", "text"),
+    "response_body": ("response", "content", "text"),
+}
+
+
+def _size(value: Any) -> Optional[int]:
+    """Return a HAR size or time, or None where it is unknown (-1)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+        return value
+    return None
+
+
+@lru_cache(maxsize=8192)
+def _split_url(url: str) -> Tuple[Optional[str], str]:
+    """Return the (host, path) of a URL; captures repeat the same URLs, so results are cached"""
+    parts = urlsplit(url)
+    return parts.hostname, parts.path
+
+
+def format_headers(headers: Any) -> Optional[str]:
+    """Return a list of {"name", "value"} headers as "Name: value" lines"""
+    if not isinstance(headers, list):
+        return None
+    return "\n".join(f"{header.get('name', '')}: {header.get('value', '')}"
+                     for header in headers if isinstance(header, dict))
+
+
+def body_path(entry: Dict[str, Any], field: str) -> Optional[Tuple[str, ...]]:
+    """Return the key path of a body value inside an entry (None without a body)"""
+    path = _BODY_PATHS[field]
+    container = (entry.get(path[0]) or {}).get(path[1])
+    if not isinstance(container, dict) or container.get(path[2]) is None:
+        return None
+    return path
+
+
+def map_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one HAR entry to a flat entry"""
+    request = entry.get("request") or {}
+    response = entry.get("response") or {}
+    content = response.get("content") or {}
+    timings = entry.get("timings") or {}
+    url = request.get("url") or ""
+    host, path = _split_url(url)
+    request_size = _size(request.get("bodySize"))
+    response_size = _size(response.get("bodySize"))
+    if response_size is None:
+        response_size = _size(content.get("size"))
+
+    mapped: Dict[str, Any] = {
+        "method": request.get("method"),
+        "host": host,
+        "path": path,
+        "url": url,
+        # Status 0 marks a request that never got a response
+        "status": response.get("status") or None,
+        "duration": _size(entry.get("time")),
+        "start_time": entry.get("startedDateTime"),
+        "protocol": response.get("httpVersion") or request.get("httpVersion"),
+        "content_type": content.get("mimeType"),
+        "request_size": request_size,
+        "response_size": response_size,
+        "total_size": None,
+        "error": response.get("_error") or None,
+        "request_headers": format_headers(request.get("headers")),
+        "response_headers": format_headers(response.get("headers")),
+    }
+    sizes = [size for size in (_size(request.get("headersSize")), request_size,
+                               _size(response.get("headersSize")), response_size) if size is not None]
+    if sizes:
+        mapped["total_size"] = sum(sizes)
+    for har_field, column in TIMING_FIELDS:
+        mapped[column] = _size(timings.get(har_field))
+
+    post_data = request.get("postData")
+    mapped["request_body"] = post_data.get("text") if isinstance(post_data, dict) else None
+    mapped["response_body"] = content.get("text")
+    if mapped["response_body"] is not None and content.get("encoding") == "base64":
+        mapped["response_body_base64"] = True
+    return mapped
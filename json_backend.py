@@ -0,0 +1,145 @@
+"""
+Pluggable JSON decoding/encoding for the dashboards.
+
+Uses the fastest installed library - orjson, then simdjson (decoding only) -
+and falls back to the standard library `json` module otherwise. Inputs the
+fast libraries reject but `json` accepts (NaN, integers beyond 64 bits,
+non-string keys, ...) are retried with `json`, so every backend accepts
+the same documents and decode errors are always `json.JSONDecodeError`.
+
+Set CHARLES_JSON_BACKEND to "orjson", "simdjson" or "json" to force one.
+An unknown or uninstalled name is logged and the fastest backend is used.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _json_dumps_pretty(obj: Any) -> str:
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _orjson_loads(data: Union[str, bytes]) -> Any:
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    try:
+        return orjson.dumps(obj).decode("utf-8")
+    except TypeError:
+        return _json_dumps(obj)
+
+
+def _orjson_dumps_pretty(obj: Any) -> str:
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    except TypeError:
+        return _json_dumps_pretty(obj)
+
+
+def _simdjson_loads(data: Union[str, bytes]) -> Any:
+    try:
+        return simdjson.loads(data)
+    except ValueError:
+        return json.loads(data)
+
+
+class JsonBackend:
+    """A set of JSON functions provided by one library"""
+
+    def __init__(self, name: str, loads: Callable[[Union[str, bytes]], Any],
+                 dumps: Callable[[Any], str], dumps_pretty: Callable[[Any], str]):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+        self.dumps_pretty = dumps_pretty
+
+    def load_file(self, file_path: str) -> Any:
+        """Read and decode a whole JSON file"""
+        with open(file_path, "rb") as f:
+            return self.loads(f.read())
+
+
+BACKENDS: Dict[str, JsonBackend] = {
+    "json": JsonBackend("json", _json_loads, _json_dumps, _json_dumps_pretty),
+}
+if simdjson is not None:
+    BACKENDS["simdjson"] = JsonBackend("simdjson", _simdjson_loads, _json_dumps, _json_dumps_pretty)
+if orjson is not None:
+    BACKENDS["orjson"] = JsonBackend("orjson", _orjson_loads, _orjson_dumps, _orjson_dumps_pretty)
+
+# Preferred order when no backend is forced
+_PREFERENCE = ("orjson", "simdjson", "json")
+
+
+def available_backends() -> List[str]:
+    """Return the names of the installed backends, fastest first"""
+    return [name for name in _PREFERENCE if name in BACKENDS]
+
+
+def get_backend(name: Optional[str] = None) -> JsonBackend:
+    """Return the named backend, or the fastest installed one"""
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"JSON backend '{name}' is not installed (available: {', '.join(available_backends())})")
+        return BACKENDS[name]
+    return BACKENDS[available_backends()[0]]
+
+
+def _backend_from_env() -> JsonBackend:
+    """Return the backend named by CHARLES_JSON_BACKEND, or the fastest one if it is unset or unavailable"""
+    name = os.environ.get("CHARLES_JSON_BACKEND") or None
+    try:
+        return get_backend(name)
+    except ValueError as e:
+        fallback = get_backend()
+        logger.warning("%s - using %s", e, fallback.name)
+        return fallback
+
+
+_active = _backend_from_env()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode a JSON document"""
+    return _active.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Encode a value as compact JSON without escaping non-ASCII characters"""
+    return _active.dumps(obj)
+
+
+def dumps_pretty(obj: Any) -> str:
+    """Encode a value as JSON indented by two spaces, without escaping non-ASCII characters"""
+    return _active.dumps_pretty(obj)
+
+
+def load_file(file_path: str) -> Any:
+    """Read and decode a whole JSON file"""
+    return _active.load_file(file_path)
@@ -0,0 +1,365 @@
+"""
+Mergeable latency sketches.
+
+`DDSketch` keeps durations in logarithmically sized buckets, so every
+percentile is answered within a fixed relative error (1% by default) from a
+few hundred counters, however many requests were seen. Sketches built from
+different chunks or files are combined by adding their bucket counts.
+
+`LatencySketches` holds the sketches of one capture: overall, per host and
+per endpoint. Only the standard library is required; numpy speeds up bulk
+inserts when it is installed.
+"""
+
+import math
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Relative error of reported percentiles
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Buckets kept per sketch - the lowest ones are collapsed beyond this
+DEFAULT_MAX_BUCKETS = 2048
+
+# Percentiles shown in the dashboards
+PERCENTILES = (50, 90, 95, 99)
+
+# Endpoints with their own sketch, most frequent first - the rest share OTHER_ENDPOINTS
+MAX_ENDPOINTS = 1000
+OTHER_ENDPOINTS = "(other endpoints)"
+
+# Largest (keys x buckets) table counted densely when grouping
+_DENSE_BUCKET_LIMIT = 8 * 1024 * 1024
+
+
+class DDSketch:
+    """Quantile sketch with relative-error guarantees (Masson et al., VLDB 2019)"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        # Bucket index -> count; bucket i holds values in (gamma^(i-1), gamma^i]
+        self.buckets: Dict[int, int] = {}
+        # Values <= 0, reported as 0
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def bucket_index(self, value: float) -> int:
+        """Index of the bucket holding a positive value"""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def bucket_indexes(self, values: "np.ndarray") -> "np.ndarray":
+        """Bucket index of each positive value (numpy arrays only)"""
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add a value `count` times (NaN is ignored)"""
+        if value != value:
+            return
+        if value > 0:
+            index = self.bucket_index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._collapse()
+
+    def add_indexed(self, values: "np.ndarray", indexes: "np.ndarray") -> None:
+        """Add non-NaN values given the bucket indexes of their positive members"""
+        self.add_buckets(_count_indexes(indexes), zero_count=len(values) - len(indexes),
+                         count=len(values), total=float(values.sum()),
+                         minimum=float(values.min()), maximum=float(values.max()))
+
+    def add_buckets(self, buckets: Iterable[Tuple[int, int]], zero_count: int, count: int,
+                    total: float, minimum: float, maximum: float) -> None:
+        """Add pre-bucketed values along with their exact count, sum, min and max"""
+        for index, bucket_count in buckets:
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        self.zero_count += zero_count
+        self.count += count
+        self.sum += total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+        self._collapse()
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add the values of another sketch with the same accuracy"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if other.count:
+            self.add_buckets(other.buckets.items(), other.zero_count, other.count,
+                             other.sum, other.min, other.max)
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets together once there are too many"""
+        excess = len(self.buckets) - self.max_buckets
+        if excess <= 0:
+            return
+        indexes = sorted(self.buckets)
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the value at quantile q (0-1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return min(max(0.0, self.min), self.max)
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def percentiles(self, percentiles: Iterable[float] = PERCENTILES) -> Dict[float, Optional[float]]:
+        """Return {percentile: value} for percentiles given as 0-100"""
+        return {p: self.quantile(p / 100) for p in percentiles}
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the sketch"""
+        return 200 + 100 * len(self.buckets)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable form of the sketch"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": [[index, count] for index, count in sorted(self.buckets.items())],
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DDSketch":
+        """Rebuild a sketch from `to_dict` output"""
+        sketch = cls(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY))
+        if data.get("count"):
+            sketch.add_buckets(((int(i), int(c)) for i, c in data["buckets"]), data["zero_count"],
+                               data["count"], data["sum"], data["min"], data["max"])
+        return sketch
+
+
+def _count_indexes(indexes: "np.ndarray") -> Iterable[Tuple[int, int]]:
+    """Return (bucket index, count) pairs of an array of bucket indexes"""
+    if not len(indexes):
+        return ()
+    low = int(indexes.min())
+    span = int(indexes.max()) - low + 1
+    if span <= _DENSE_BUCKET_LIMIT:
+        counts = np.bincount(indexes - low, minlength=span)
+        nonzero = np.flatnonzero(counts)
+        return zip((nonzero + low).tolist(), counts[nonzero].tolist())
+    unique, counts = np.unique(indexes, return_counts=True)
+    return zip(unique.tolist(), counts.tolist())
+
+
+def endpoint_key(method: Any, host: Any, path: Any) -> str:
+    """Return the endpoint label of a request: method, host and path without the query string"""
+    path = str(path or "")
+    return f"{method or ''} {host or ''}{path.split('?', 1)[0]}".strip()
+
+
+def _factorize_series(series) -> Tuple["np.ndarray", Sequence[Any]]:
+    """Return (codes, labels) of a pandas Series, with code -1 for missing values"""
+    if hasattr(series, "cat"):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return series.factorize()
+
+
+class LatencySketches:
+    """Duration sketches of a capture - overall, per host and per endpoint"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.overall = DDSketch(relative_accuracy)
+        self.by_host: Dict[str, DDSketch] = {}
+        self.by_endpoint: Dict[str, DDSketch] = {}
+
+    def _sketch(self, group: Dict[str, DDSketch], key: str) -> DDSketch:
+        sketch = group.get(key)
+        if sketch is None:
+            sketch = group[key] = DDSketch(self.relative_accuracy)
+        return sketch
+
+    def add(self, duration: float, host: Any = None, endpoint: Optional[str] = None) -> None:
+        """Add one request duration"""
+        self.overall.add(duration)
+        if host is not None:
+            self._sketch(self.by_host, str(host)).add(duration)
+        if endpoint is not None:
+            self._sketch(self.by_endpoint, endpoint).add(duration)
+
+    @classmethod
+    def build(cls, df, chunk_rows: int = 100000,
+              relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> "LatencySketches":
+        """Build the sketches of an entries DataFrame chunk by chunk, merging as it goes"""
+        sketches = cls(relative_accuracy)
+        for start in range(0, len(df), chunk_rows):
+            sketches.add_frame(df.iloc[start:start + chunk_rows])
+        sketches._limit_endpoints()
+        return sketches
+
+    def add_frame(self, df) -> None:
+        """Add the durations of an entries DataFrame in a few vectorized passes"""
+        if "duration_ms" not in df.columns:
+            return
+        durations = df["duration_ms"].to_numpy(dtype="float64", na_value=np.nan)
+        valid = ~np.isnan(durations)
+        if not valid.any():
+            return
+        columns = [col for col in ("method", "host", "path", "url") if col in df.columns]
+        rows = df.loc[valid, columns]
+
+        hosts = endpoints = None
+        if "host" in rows.columns:
+            hosts = _factorize_series(rows["host"])
+        if "path" in rows.columns or "url" in rows.columns:
+            if "path" in rows.columns:
+                paths = rows["path"].fillna("").astype(str).str.partition("?")[0]
+                if "host" in rows.columns:
+                    paths = rows["host"].astype(str).where(rows["host"].notna(), "") + paths
+            else:
+                paths = rows["url"].fillna("").astype(str).str.partition("?")[0]
+            methods = rows["method"].astype(str).where(rows["method"].notna(), "") if "method" in rows.columns else ""
+            endpoints = _factorize_series((methods + " " + paths).str.strip())
+        self.add_arrays(durations[valid], hosts, endpoints)
+
+    def add_arrays(self, durations: "np.ndarray", hosts: Optional[Tuple["np.ndarray", Sequence[str]]] = None,
+                   endpoints: Optional[Tuple["np.ndarray", Sequence[str]]] = None) -> None:
+        """Add durations with their hosts and endpoints from parallel arrays
+
+        Hosts and endpoints are given factorized, as (codes, labels) with one
+        code per duration and -1 where the key is unknown.
+        """
+        durations = np.asarray(durations, dtype="float64")
+        valid = ~np.isnan(durations)
+        durations = durations[valid]
+        if not len(durations):
+            return
+        # One bucket index per value; values <= 0 go to the zero bucket
+        indexes = np.zeros(len(durations), dtype=np.int64)
+        positive = durations > 0
+        indexes[positive] = self.overall.bucket_indexes(durations[positive])
+
+        self.overall.add_indexed(durations, indexes[positive])
+        for group, keys in ((self.by_host, hosts), (self.by_endpoint, endpoints)):
+            if keys is not None:
+                codes, labels = keys
+                self._add_grouped(group, np.asarray(codes, dtype=np.int64)[valid], labels, durations, indexes, positive)
+
+    def _add_grouped(self, group: Dict[str, DDSketch], codes: "np.ndarray", labels: Sequence[str],
+                     durations: "np.ndarray", indexes: "np.ndarray", positive: "np.ndarray") -> None:
+        """Add durations to one sketch per key code, bucketing all keys with bincounts"""
+        present = codes >= 0
+        codes, durations, indexes, positive = codes[present], durations[present], indexes[present], positive[present]
+        if not len(codes):
+            return
+        n_keys = len(labels)
+        counts = np.bincount(codes, minlength=n_keys)
+        sums = np.bincount(codes, weights=durations, minlength=n_keys)
+        zeros = np.bincount(codes[~positive], minlength=n_keys)
+        mins = np.full(n_keys, np.inf)
+        np.minimum.at(mins, codes, durations)
+        maxs = np.full(n_keys, -np.inf)
+        np.maximum.at(maxs, codes, durations)
+
+        # Count (key, bucket) pairs - a dense table when it is small enough, else by sorting
+        key_codes, bucket_ids = codes[positive], indexes[positive]
+        per_key: Dict[int, Iterable[Tuple[int, int]]] = {}
+        if len(bucket_ids):
+            low = int(bucket_ids.min())
+            span = int(bucket_ids.max()) - low + 1
+            if n_keys * span <= _DENSE_BUCKET_LIMIT:
+                table = np.bincount(key_codes * span + (bucket_ids - low), minlength=n_keys * span).reshape(n_keys, span)
+                for code in np.flatnonzero(counts).tolist():
+                    nonzero = np.flatnonzero(table[code])
+                    per_key[code] = zip((nonzero + low).tolist(), table[code, nonzero].tolist())
+            else:
+                pairs, pair_counts = np.unique(key_codes * span + (bucket_ids - low), return_counts=True)
+                pair_keys, pair_buckets = np.divmod(pairs, span)
+                bounds = np.flatnonzero(np.diff(pair_keys)) + 1
+                for chunk_keys, chunk_buckets, chunk_counts in zip(np.split(pair_keys, bounds),
+                                                                   np.split(pair_buckets, bounds),
+                                                                   np.split(pair_counts, bounds)):
+                    per_key[int(chunk_keys[0])] = zip((chunk_buckets + low).tolist(), chunk_counts.tolist())
+
+        for code in np.flatnonzero(counts).tolist():
+            self._sketch(group, str(labels[code])).add_buckets(
+                per_key.get(code, ()), zero_count=int(zeros[code]), count=int(counts[code]),
+                total=float(sums[code]), minimum=float(mins[code]), maximum=float(maxs[code])
+            )
+
+    def _limit_endpoints(self) -> None:
+        """Fold the sketches of rare endpoints into one"""
+        if len(self.by_endpoint) <= MAX_ENDPOINTS:
+            return
+        ranked = sorted(self.by_endpoint.items(), key=lambda item: item[1].count, reverse=True)
+        kept = dict(ranked[:MAX_ENDPOINTS])
+        other = kept.pop(OTHER_ENDPOINTS, None) or DDSketch(self.relative_accuracy)
+        for key, sketch in ranked[MAX_ENDPOINTS:]:
+            other.merge(sketch)
+        kept[OTHER_ENDPOINTS] = other
+        self.by_endpoint = kept
+
+    @classmethod
+    def merged(cls, sketches: Iterable["LatencySketches"]) -> "LatencySketches":
+        """Return new sketches combining those of several captures (the inputs are left unchanged)"""
+        combined = None
+        for other in sketches:
+            if combined is None:
+                combined = cls(other.relative_accuracy)
+            combined.merge(other)
+        return combined if combined is not None else cls()
+
+    def merge(self, other: "LatencySketches") -> None:
+        """Add the sketches of another capture or chunk"""
+        self.overall.merge(other.overall)
+        for group, other_group in ((self.by_host, other.by_host), (self.by_endpoint, other.by_endpoint)):
+            for key, sketch in other_group.items():
+                self._sketch(group, key).merge(sketch)
+        self._limit_endpoints()
+
+    def table(self, group: str, percentiles: Iterable[float] = PERCENTILES) -> Iterator[Dict[str, Any]]:
+        """Yield one row per host or endpoint with its count, mean and percentiles, busiest first"""
+        sketches = self.by_host if group == "host" else self.by_endpoint
+        for key, sketch in sorted(sketches.items(), key=lambda item: item[1].count, reverse=True):
+            row = {group: key, "count": sketch.count, "mean": sketch.mean}
+            row.update({f"p{p:g}": value for p, value in sketch.percentiles(percentiles).items()})
+            yield row
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the sketches"""
+        return self.overall.nbytes + sum(s.nbytes for s in self.by_host.values()) + \
+            sum(s.nbytes for s in self.by_endpoint.values())
@@ -0,0 +1,166 @@
+"""
+Streaming HTML report writer.
+
+Reports are written section by section straight to a buffered file handle
+instead of being assembled as one string, so generation time and memory stay
+linear in the report size however large its tables get. The page around the
+sections comes from a layout template (templates/report.html by default):
+everything before the `<!-- sections -->` marker is written when the report
+is opened and everything after it when the report is closed.
+
+Output ending in ".gz" is gzip-compressed on the fly. The report is written
+to a temporary file next to the output and renamed into place once complete,
+so a failed run never leaves a truncated report behind.
+
+Only the standard library is used, so simple_dashboard keeps its small
+dependency set.
+"""
+
+import gzip
+import html
+import io
+import os
+from contextlib import ExitStack
+from itertools import islice
+from string import Template
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+DEFAULT_LAYOUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "report.html")
+
+# Where the streamed sections go in the layout
+SECTIONS_MARKER = "<!-- sections -->"
+
+# Size of the write buffer in front of the file (or the compressor)
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+GZIP_LEVEL = 6
+
+# Table rows formatted per write
+ROWS_PER_WRITE = 1024
+
+# Suffix of the file a report is written to until it is complete
+PARTIAL_SUFFIX = ".part"
+
+
+def is_compressed_path(path: str) -> bool:
+    """Whether a report path asks for gzip output"""
+    return path.lower().endswith(".gz")
+
+
+class Markup(str):
+    """HTML that is written as is instead of escaped"""
+
+
+def link(href: str, text: Any) -> Markup:
+    """Return an <a> element"""
+    return Markup(f'<a href="{html.escape(href)}">{_text(text)}</a>')
+
+
+def _text(value: Any) -> str:
+    """Escape a value for use as element text (cheaper than html.escape for mostly plain values)"""
+    if isinstance(value, Markup):
+        return value
+    text = str(value)
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def load_layout(layout_file: Optional[str] = None) -> Template:
+    """Load a report layout template"""
+    with open(layout_file or DEFAULT_LAYOUT, encoding="utf-8") as f:
+        text = f.read()
+    if SECTIONS_MARKER not in text:
+        raise ValueError(f"Layout {layout_file or DEFAULT_LAYOUT} has no {SECTIONS_MARKER} marker")
+    return Template(text)
+
+
+class ReportWriter:
+    """Write an HTML report section by section
+
+    Use as a context manager; the layout's header is written on entry and
+    its footer on a clean exit. Text passed to the section methods is
+    HTML-escaped unless it is Markup.
+    """
+
+    def __init__(self, output_file: str, compress: Optional[bool] = None,
+                 layout: Optional[Template] = None, **fields: Any):
+        self.output_file = output_file
+        self.compress = is_compressed_path(output_file) if compress is None else compress
+        # Layout fields ($title, $generated, ...) are escaped like section text
+        page = (layout or load_layout()).safe_substitute(
+            {key: html.escape(str(value)) for key, value in fields.items()})
+        self._header, _, self._footer = page.partition(SECTIONS_MARKER)
+        # The marker's own line break is dropped along with it
+        self._footer = self._footer[1:] if self._footer.startswith("\n") else self._footer
+        self._stack = ExitStack()
+        self._stream: Optional[io.TextIOBase] = None
+
+    def __enter__(self) -> "ReportWriter":
+        stack = self._stack
+        partial = self.output_file + PARTIAL_SUFFIX
+        if self.compress:
+            raw = stack.enter_context(open(partial, "wb"))
+            # Buffer in front of the compressor so small writes are batched
+            compressor = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL)
+            binary = io.BufferedWriter(compressor, WRITE_BUFFER_BYTES)
+            self._stream = stack.enter_context(io.TextIOWrapper(binary, encoding="utf-8"))
+        else:
+            self._stream = stack.enter_context(
+                open(partial, "w", encoding="utf-8", buffering=WRITE_BUFFER_BYTES))
+        self._stream.write(self._header)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        partial = self.output_file + PARTIAL_SUFFIX
+        completed = False
+        try:
+            if exc_type is None:
+                self._stream.write(self._footer)
+                completed = True
+        finally:
+            self._stream = None
+            try:
+                self._stack.close()
+            except Exception:
+                completed = False
+                raise
+            finally:
+                if completed:
+                    os.replace(partial, self.output_file)
+                elif os.path.exists(partial):
+                    os.remove(partial)
+
+    def raw(self, markup: str) -> None:
+        """Write markup as is"""
+        self._stream.write(markup)
+
+    def heading(self, level: int, text: Any) -> None:
+        """Write a heading"""
+        self._stream.write(f"<h{level}>{_text(text)}</h{level}>\n")
+
+    def paragraph(self, text: Any) -> None:
+        """Write a paragraph"""
+        self._stream.write(f"<p>{_text(text)}</p>\n")
+
+    def table(self, headers: Sequence[Any], rows: Iterable[Sequence[Any]]) -> None:
+        """Write a table, streaming its rows"""
+        stream = self._stream
+        stream.write("<table>\n<tr><th>" + "</th><th>".join(map(_text, headers)) + "</th></tr>\n")
+        rows = iter(rows)
+        while True:
+            # Format a batch of rows per write to keep the per-row overhead low
+            batch = ["<tr><td>" + "</td><td>".join(map(_text, row)) + "</td></tr>\n"
+                     for row in islice(rows, ROWS_PER_WRITE)]
+            if not batch:
+                break
+            stream.write("".join(batch))
+        stream.write("</table>\n")
+
+    def metrics_table(self, metrics: Mapping[str, Any]) -> None:
+        """Write a two-column Metric/Value table"""
+        self.table(("Metric", "Value"), metrics.items())
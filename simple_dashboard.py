@@ -1,192 +1,276 @@
 #!/usr/bin/env python3
-import json
+import argparse
 import os
-import sys
-from collections import Counter
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import webbrowser
 import tempfile
 from datetime import datetime
+from itertools import islice
+from urllib.request import pathname2url
+
+from body_format import format_bodies, render_bodies_export
+from capture_stats import stats_from_entries
+from capture_stream import decode_base64_body, is_capture_name, load_document
+from latency_sketch import PERCENTILES
+from report_writer import ReportWriter, is_compressed_path, link, load_layout
+
+# Name of the page linking all reports of a batch run
+BATCH_INDEX = "index.html"
 
 def load_data(file_path):
     """Load JSON data from file"""
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        data = load_document(file_path)
         return data
     except Exception as e:
         print(f"Error loading file: {str(e)}")
         return {}
 
-def generate_html_report(data, output_file, input_file):
-    """Generate a HTML report from the parsed data"""
-    
-    # Start with HTML header
-    html = """<!DOCTYPE html>
-<html>
-<head>
-    <title>Charles Log Analysis</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 20px; }
-        h1, h2, h3 { color: #333; }
-        .container { display: flex; flex-wrap: wrap; }
-        .chart { margin: 10px; padding: 10px; border: 1px solid #ddd; border-radius: 5px; }
-        table { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
-        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-        th { background-color: #f2f2f2; }
-        tr:nth-child(even) { background-color: #f9f9f9; }
-    </style>
-</head>
-<body>
-    <h1>Charles Proxy Log Analysis</h1>
-"""
-    
-    # Add timestamp and filename
-    html += f"<p>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
-    html += f"<p>File: {os.path.basename(input_file)}</p>\n"
-    
-    # Handle summary format
-    if isinstance(data, dict) and "total_entries" in data:
-        html += "<h2>Summary</h2>\n"
-        html += f"<p>Total Entries: {data.get('total_entries', 0)}</p>\n"
-        
-        # Request Methods
-        if "request_methods" in data:
-            html += "<h3>Request Methods</h3>\n"
-            html += "<table>\n"
-            html += "<tr><th>Method</th><th>Count</th></tr>\n"
-            
-            for method, count in sorted(data["request_methods"].items(), key=lambda x: x[1], reverse=True):
-                html += f"<tr><td>{method}</td><td>{count}</td></tr>\n"
-            
-            html += "</table>\n"
-        
-        # Status Codes
-        if "status_codes" in data:
-            html += "<h3>Status Codes</h3>\n"
-            html += "<table>\n"
-            html += "<tr><th>Status</th><th>Count</th></tr>\n"
-            
-            for status, count in sorted(data["status_codes"].items(), key=lambda x: int(x[0]) if x[0].isdigit() else 0):
-                html += f"<tr><td>{status}</td><td>{count}</td></tr>\n"
-            
-            html += "</table>\n"
-        
-        # Hosts
-        if "hosts" in data:
-            html += "<h3>Top Hosts</h3>\n"
-            html += "<table>\n"
-            html += "<tr><th>Host</th><th>Count</th></tr>\n"
-            
-            for host, count in sorted(data["hosts"].items(), key=lambda x: x[1], reverse=True)[:20]:
-                html += f"<tr><td>{host}</td><td>{count}</td></tr>\n"
-            
-            html += "</table>\n"
-        
-        # Timing
-        if "timing" in data:
-            html += "<h3>Timing (ms)</h3>\n"
-            html += "<table>\n"
-            html += "<tr><th>Metric</th><th>Value</th></tr>\n"
-            html += f"<tr><td>Minimum</td><td>{data['timing'].get('min', 0)}</td></tr>\n"
-            html += f"<tr><td>Maximum</td><td>{data['timing'].get('max', 0)}</td></tr>\n"
-            html += f"<tr><td>Average</td><td>{data['timing'].get('avg', 0)}</td></tr>\n"
-            html += f"<tr><td>Total</td><td>{data['timing'].get('total', 0)}</td></tr>\n"
-            html += "</table>\n"
-    
-    # Handle detailed format
-    elif "entries" in data:
-        entries = data["entries"]
-        html += "<h2>Detailed Report</h2>\n"
-        html += f"<p>Total Entries: {len(entries)}</p>\n"
-        
-        # Count status codes
-        status_counts = Counter()
-        host_counts = Counter()
-        methods = Counter()
-        durations = []
-        
-        for entry in entries:
-            # Status codes
-            status = str(entry.get("status", "Unknown"))
-            status_counts[status] += 1
-            
-            # Hosts
-            host = entry.get("host", "Unknown")
-            host_counts[host] += 1
-            
-            # Methods
-            method = entry.get("method", "Unknown")
-            methods[method] += 1
-            
-            # Durations
-            if "duration" in entry:
-                try:
-                    duration = float(entry["duration"])
-                    durations.append(duration)
-                except (ValueError, TypeError):
-                    pass
-        
-        # Status Codes
-        html += "<h3>Status Codes</h3>\n"
-        html += "<table>\n"
-        html += "<tr><th>Status</th><th>Count</th></tr>\n"
-        
-        for status, count in sorted(status_counts.items(), key=lambda x: int(x[0]) if x[0].isdigit() else 0):
-            html += f"<tr><td>{status}</td><td>{count}</td></tr>\n"
-        
-        html += "</table>\n"
-        
-        # Top Hosts
-        html += "<h3>Top Hosts</h3>\n"
-        html += "<table>\n"
-        html += "<tr><th>Host</th><th>Count</th></tr>\n"
-        
-        for host, count in host_counts.most_common(20):
-            html += f"<tr><td>{host}</td><td>{count}</td></tr>\n"
-        
-        html += "</table>\n"
-        
-        # Request Methods
-        html += "<h3>Request Methods</h3>\n"
-        html += "<table>\n"
-        html += "<tr><th>Method</th><th>Count</th></tr>\n"
-        
-        for method, count in methods.most_common():
-            html += f"<tr><td>{method}</td><td>{count}</td></tr>\n"
-        
-        html += "</table>\n"
-        
-        # Timing
-        if durations:
-            html += "<h3>Timing (ms)</h3>\n"
-            html += "<table>\n"
-            html += "<tr><th>Metric</th><th>Value</th></tr>\n"
-            html += f"<tr><td>Minimum</td><td>{min(durations)}</td></tr>\n"
-            html += f"<tr><td>Maximum</td><td>{max(durations)}</td></tr>\n"
-            html += f"<tr><td>Average</td><td>{sum(durations) / len(durations):.2f}</td></tr>\n"
-            html += f"<tr><td>Total</td><td>{sum(durations)}</td></tr>\n"
-            html += "</table>\n"
-    
-    # Close HTML
-    html += """</body>
-</html>
-"""
-    
-    # Write to file
-    with open(output_file, 'w') as f:
-        f.write(html)
-    
+def generate_html_report(data, output_file, input_file, compress=None, layout_file=None):
+    """Generate a HTML report from the parsed data, streamed section by section"""
+    layout = load_layout(layout_file)
+    with ReportWriter(output_file, compress=compress, layout=layout,
+                      title="Charles Log Analysis", heading="Charles Proxy Log Analysis",
+                      generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                      source=os.path.basename(input_file)) as report:
+        # Handle summary format
+        if isinstance(data, dict) and "total_entries" in data:
+            write_summary_sections(report, data)
+        # Handle detailed format
+        elif "entries" in data:
+            write_detailed_sections(report, data["entries"])
+
     return output_file
 
+def write_summary_sections(report, data):
+    """Write the sections of a pre-computed summary"""
+    report.heading(2, "Summary")
+    report.paragraph(f"Total Entries: {data.get('total_entries', 0)}")
+
+    # Request Methods
+    if "request_methods" in data:
+        report.heading(3, "Request Methods")
+        report.table(("Method", "Count"),
+                     sorted(data["request_methods"].items(), key=lambda x: x[1], reverse=True))
+
+    # Status Codes
+    if "status_codes" in data:
+        report.heading(3, "Status Codes")
+        report.table(("Status", "Count"),
+                     sorted(data["status_codes"].items(), key=lambda x: int(x[0]) if x[0].isdigit() else 0))
+
+    # Hosts
+    if "hosts" in data:
+        report.heading(3, "Top Hosts")
+        report.table(("Host", "Count"),
+                     sorted(data["hosts"].items(), key=lambda x: x[1], reverse=True)[:20])
+
+    # Timing
+    if "timing" in data:
+        report.heading(3, "Timing (ms)")
+        report.metrics_table(OrderedDict([
+            ("Minimum", data['timing'].get('min', 0)),
+            ("Maximum", data['timing'].get('max', 0)),
+            ("Average", data['timing'].get('avg', 0)),
+            ("Total", data['timing'].get('total', 0)),
+        ]))
+
+def write_detailed_sections(report, entries):
+    """Write the sections of a list of parsed entries"""
+    report.heading(2, "Detailed Report")
+    report.paragraph(f"Total Entries: {len(entries)}")
+
+    # Counts and timing in one vectorized pass over the entry columns
+    stats = stats_from_entries(entries)
+
+    # Status Codes
+    report.heading(3, "Status Codes")
+    report.table(("Status", "Count"),
+                 sorted(stats.status_counts.items(), key=lambda x: int(x[0]) if x[0].isdigit() else 0))
+
+    # Top Hosts
+    report.heading(3, "Top Hosts")
+    report.table(("Host", "Count"), islice(stats.host_counts.items(), 20))
+
+    # Request Methods
+    report.heading(3, "Request Methods")
+    report.table(("Method", "Count"), stats.method_counts.items())
+
+    # Timing
+    if stats.duration_count:
+        report.heading(3, "Timing (ms)")
+        metrics = OrderedDict([
+            ("Minimum", stats.duration_min),
+            ("Maximum", stats.duration_max),
+            ("Average", f"{stats.duration_mean:.2f}"),
+        ])
+        for p, value in stats.latency.overall.percentiles().items():
+            metrics[f"p{p}"] = f"{value:.0f}"
+        metrics["Total"] = stats.duration_sum
+        report.metrics_table(metrics)
+
+        # Tail latency per host
+        report.heading(3, "Latency by Host (ms)")
+        report.table(("Host", "Count") + tuple(f"p{p}" for p in PERCENTILES),
+                     ((row["host"], row["count"]) + tuple(f"{row[f'p{p}']:.0f}" for p in PERCENTILES)
+                      for row in islice(stats.latency.table("host"), 20)))
+
+def export_formatted_bodies(data, output_file, workers=None):
+    """Write the pretty-printed request/response bodies of all entries to a text file"""
+    entries = data.get("entries", []) if isinstance(data, dict) else data
+    entries = [entry for entry in entries if isinstance(entry, dict)]
+
+    def report(done, total):
+        print(f"\r  {done}/{total} bodies", end="", flush=True)
+
+    formatted = OrderedDict()
+    for field in ("request_body", "response_body"):
+        print(f"Formatting {field}...")
+        bodies = (decode_base64_body(entry.get(field)) if entry.get(field + "_base64") else entry.get(field)
+                  for entry in entries)
+        formatted[field] = format_bodies(bodies, workers=workers, progress=report)
+        print()
+
+    labels = [f"{i} {entry.get('method', '')} {entry.get('url', entry.get('host', ''))}"
+              for i, entry in enumerate(entries)]
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.writelines(render_bodies_export(labels, formatted))
+    return output_file
+
+def report_path_for(capture_path, output_dir, compress=False):
+    """Return where a batch run writes the report of a capture"""
+    # Other formats keep their extension so x.chlsj and x.json get separate reports
+    name = os.path.basename(capture_path)
+    name = (name[:-len(".json")] if name.lower().endswith(".json") else name) + ".html"
+    return os.path.join(output_dir, name + (".gz" if compress else ""))
+
+def is_report_current(capture_path, report_path):
+    """Whether a report exists and is newer than its capture"""
+    try:
+        return os.stat(report_path).st_mtime_ns >= os.stat(capture_path).st_mtime_ns
+    except OSError:
+        return False
+
+def build_report(capture_path, report_path, layout_file=None):
+    """Generate the report of one capture in a batch worker; returns an error message or None"""
+    data = load_data(capture_path)
+    if not data:
+        return "No data found or invalid JSON format"
+    try:
+        generate_html_report(data, report_path, capture_path, layout_file=layout_file)
+    except Exception as e:
+        return str(e)
+    return None
+
+def batch_reports(input_dir, output_dir, workers=None, compress=False, layout_file=None, force=False):
+    """Write a report for every capture in a directory, in parallel, plus an index page
+
+    Captures whose report is newer than the capture are skipped unless
+    `force` is set. Returns the index path and the number of failed reports.
+    """
+    # Fail on a bad layout before any worker starts
+    load_layout(layout_file)
+    os.makedirs(output_dir, exist_ok=True)
+    captures = sorted(entry.path for entry in os.scandir(input_dir)
+                      if entry.is_file() and is_capture_name(entry.name))
+    reports = OrderedDict((path, report_path_for(path, output_dir, compress)) for path in captures)
+
+    status = {}
+    pending = []
+    for path, report in reports.items():
+        if not force and is_report_current(path, report):
+            status[path] = "up to date"
+        else:
+            pending.append(path)
+    print(f"{len(captures)} captures in {input_dir}, {len(pending)} to report")
+
+    failed = 0
+    if pending:
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(build_report, path, reports[path], layout_file): path for path in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    error = future.result()
+                except Exception as e:
+                    # The worker itself died (out of memory, killed, ...)
+                    error = str(e) or type(e).__name__
+                status[path] = f"failed: {error}" if error else "generated"
+                failed += bool(error)
+                print(f"  [{done}/{len(pending)}] {os.path.basename(path)}: {status[path]}")
+
+    index_path = os.path.join(output_dir, BATCH_INDEX)
+    write_batch_index(index_path, input_dir, reports, status, layout_file)
+    return index_path, failed
+
+def write_batch_index(index_path, input_dir, reports, status, layout_file=None):
+    """Write the page linking the reports of a batch run"""
+    rows = []
+    for path, report in reports.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Removed while the batch ran
+            continue
+        name = os.path.basename(path)
+        if os.path.exists(report) and not status[path].startswith("failed"):
+            name = link(pathname2url(os.path.relpath(report, os.path.dirname(index_path))), name)
+        rows.append((name, f"{stat.st_size / 1024:.1f} KB",
+                     datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'), status[path]))
+
+    with ReportWriter(index_path, compress=False, layout=load_layout(layout_file),
+                      title="Charles Log Reports", heading="Charles Proxy Log Reports",
+                      generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                      source=os.path.abspath(input_dir)) as page:
+        page.paragraph(f"Captures: {len(rows)}")
+        page.table(("Capture", "Size", "Modified", "Report"), rows)
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python simple_dashboard.py <json_file>")
-        return
+    parser = argparse.ArgumentParser(description="Generate an HTML report from a parsed Charles log")
+    parser.add_argument("json_file", help="Parsed Charles log (JSON), Charles session (.chlsj) or HAR archive, "
+                                          "optionally .gz/.xz/.zst compressed, "
+                                          "or a directory of them to report in batch")
+    parser.add_argument("--export-bodies", metavar="FILE",
+                        help="Also write all request/response bodies, pretty-printed, to FILE")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes used to format bodies, or to build reports in batch "
+                             "(default: all CPU cores)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Where to write the report (default: charles_log_report.html in the temp directory); "
+                             "a name ending in .gz is gzip-compressed")
+    parser.add_argument("--gzip", action="store_true", help="Gzip-compress the report")
+    parser.add_argument("--layout", metavar="FILE",
+                        help="HTML layout template for the report (default: templates/report.html)")
+    parser.add_argument("--output-dir", metavar="DIR",
+                        help="Batch only: where to write the reports and index.html (default: DIR/reports)")
+    parser.add_argument("--force", action="store_true",
+                        help="Batch only: regenerate reports that are newer than their capture")
+    parser.add_argument("--no-browser", action="store_true", help="Do not open the report in a browser")
+    args = parser.parse_args()
     
-    file_path = sys.argv[1]
+    file_path = args.json_file
     if not os.path.exists(file_path):
         print(f"Error: File '{file_path}' not found.")
         return
+
+    # Batch mode: headless, one report per capture plus an index page
+    if os.path.isdir(file_path):
+        if args.export_bodies:
+            print("Warning: --export-bodies is ignored for a directory")
+        output_dir = args.output_dir or os.path.join(file_path, "reports")
+        try:
+            index_path, failed = batch_reports(file_path, output_dir, workers=args.workers, compress=args.gzip,
+                                               layout_file=args.layout, force=args.force)
+        except Exception as e:
+            print(f"Error generating reports: {str(e)}")
+            raise SystemExit(1)
+        print(f"Index written to: {index_path}")
+        if failed:
+            print(f"{failed} report(s) failed")
+            raise SystemExit(1)
+        return
     
     print(f"Loading data from {file_path}...")
     data = load_data(file_path)
@@ -196,16 +280,25 @@ def main():
         return
     
     # Create output HTML file
-    output_file = os.path.join(tempfile.gettempdir(), "charles_log_report.html")
+    output_file = args.output or os.path.join(tempfile.gettempdir(), "charles_log_report.html")
+    if args.gzip and not is_compressed_path(output_file):
+        output_file += ".gz"
     
     # Generate report
     try:
-        report_path = generate_html_report(data, output_file, file_path)
+        report_path = generate_html_report(data, output_file, file_path, layout_file=args.layout)
         print(f"Report generated at: {report_path}")
-        print("Opening in browser...")
-        
-        # Open in browser
-        webbrowser.open('file://' + os.path.abspath(report_path))
+
+        if args.export_bodies:
+            export_path = export_formatted_bodies(data, args.export_bodies, workers=args.workers)
+            print(f"Formatted bodies written to: {export_path}")
+
+        # Browsers do not render a gzip-compressed file opened from disk
+        if not args.no_browser and not is_compressed_path(report_path):
+            print("Opening in browser...")
+
+            # Open in browser
+            webbrowser.open('file://' + os.path.abspath(report_path))
     except Exception as e:
         print(f"Error generating report: {str(e)}")
 